@@ -1,3 +1,4 @@
+import json
 import os
 from pathlib import Path
 from platform import platform, python_version
@@ -94,6 +95,39 @@ def test(session):
             *args)
 
 
+def compare_benchmarks(session, baseline_report, report):
+    with open(baseline_report) as f:
+        baseline = json.load(f)
+    with open(report) as f:
+        current = json.load(f)
+    session.log(f'Comparing {current.get("commit")} against {baseline.get("commit")}')
+    for stage, sizes in current['results'].items():
+        for size, result in sizes.items():
+            previous = baseline['results'].get(stage, {}).get(size)
+            if previous is None:
+                continue
+            time_change = (result['time'] - previous['time'])/previous['time']*100 if previous['time'] else 0
+            memory_change = (result['peak_memory'] - previous['peak_memory'])/previous['peak_memory']*100 if previous['peak_memory'] else 0
+            session.log(f'{stage} [{size}]: time {result["time"]:.4f}s ({time_change:+.1f}%), peak memory {result["peak_memory"]/1024:.1f} KiB ({memory_change:+.1f}%)')
+
+
+@nox.session(reuse_venv=True, tags=['benchmark'])
+def benchmark(session):
+    # Optionally pass a baseline report to compare against, e.g. nox -s benchmark -- reports/benchmark-main.json
+    Path('reports').mkdir(exist_ok=True)
+    session.install('.[dev,dev-test]')
+    report = 'reports/benchmark.json'
+    session.run(
+        'pytest',
+        '-s',
+        '--log-level=WARNING',
+        'tests/benchmarks',
+        env={'MKDOCS_LICENSEINFO_BENCHMARK': '1', 'MKDOCS_LICENSEINFO_BENCHMARK_REPORT': report}
+    )
+    if session.posargs:
+        compare_benchmarks(session, session.posargs[0], report)
+
+
 @nox.session(reuse_venv=True, tags=['docs'])
 def docs(session):
     session.install('.[dev,dev-docs]')
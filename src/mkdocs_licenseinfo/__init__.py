@@ -4,6 +4,7 @@ mkdocs extension to visualise package dependencies license information.
 """
 from __future__ import annotations
 
+from functools import lru_cache
 import logging
 from typing import Any, MutableMapping
 
@@ -27,7 +28,7 @@ def __get_version() -> str:
     # try loading from file
     if version == default_version:
         try:
-            from mkdocs_licenseinfo._version import __version__  # noqa: F401
+            from mkdocs_licenseinfo._version import __version__ as version
         except ImportError:
             pass
     # Development installation without setuptools_scm
@@ -48,7 +49,17 @@ def __get_version() -> str:
     return version
 
 
-__version__ = __get_version()
+@lru_cache(maxsize=None)
+def get_version() -> str:
+    """Get the version, looked up on first use (rather than on import) and cached."""
+    return __get_version()
+
+
+def __getattr__(name: str) -> Any:
+    """Get ``__version__`` lazily."""
+    if name == '__version__':
+        return get_version()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 class _PluginLogger(logging.LoggerAdapter):
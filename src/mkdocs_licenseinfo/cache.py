@@ -0,0 +1,314 @@
+"""Persistent on-disk caches for resolved license information.
+
+The [`LicenseCache`][mkdocs_licenseinfo.cache.LicenseCache] stores each resolution as a JSON file named after a
+fingerprint of everything that can change the result of
+[`get_package_licenses`][mkdocs_licenseinfo.get_licenses.get_package_licenses]: the ``using`` spec, the
+package/license filters, the contents of the requirement sources (``pyproject.toml``, ``requirements*.txt``,
+lock files) and the set of installed distributions.
+
+The [`MetadataCache`][mkdocs_licenseinfo.cache.MetadataCache] stores the metadata for each installed distribution,
+keyed on its ``name==version``, in a single SQLite file (in the user cache dir by default), so it is shared by
+the blocks and resolutions of a build, and by the projects (and builds) on the same machine.
+"""
+from __future__ import annotations
+
+import hashlib
+from importlib import metadata
+import json
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Any, Iterable, TYPE_CHECKING
+
+from mkdocs_licenseinfo import get_version, logger
+
+if TYPE_CHECKING:
+    import sqlite3
+
+DEFAULT_CACHE_DIR = Path('.cache', 'mkdocs_licenseinfo')
+METADATA_CACHE_FILE = 'metadata.sqlite3'
+# The package metadata stored for each distribution
+METADATA_FIELDS = ('name', 'version', 'homePage', 'author', 'size', 'license')
+# The maximum number of parameters to use in a query (older SQLite versions allow 999)
+_QUERY_CHUNK_SIZE = 500
+REQUIREMENT_SOURCE_PATTERNS = ('pyproject.toml', 'setup.cfg', 'requirements*.txt', '*.lock')
+
+
+def get_requirement_sources(using: str | None = 'PEP631', path: str | Path | None = None) -> list[Path]:
+    """Get the files that the requirements for a ``using`` spec are read from.
+
+    Arguments:
+        using: The licensecheck ``using`` spec (e.g. ``requirements:requirements.txt;requirements-dev.txt``).
+        path: The directory the requirements are resolved in (defaults to the working directory).
+
+    Returns:
+        The sorted, existing requirement source files.
+    """
+    base_path = Path(path) if path else Path.cwd()
+    sources: set[Path] = set()
+    for pattern in REQUIREMENT_SOURCE_PATTERNS:
+        sources.update(base_path.glob(pattern))
+    if using and using.startswith('requirements:'):
+        sources.update(base_path / u for u in using.split(':', 1)[1].split(';'))
+    return sorted(u.resolve() for u in sources if u.is_file())
+
+
+def get_installed_distributions() -> list[str]:
+    """Get the ``name==version`` strings for the installed distributions."""
+    distributions = set()
+    for distribution in metadata.distributions():
+        name = distribution.metadata['Name']
+        if name:
+            distributions.add(f'{name}=={distribution.version}')
+    return sorted(distributions)
+
+
+def fingerprint(
+    using: str | None = 'PEP631',
+    ignore_packages: list[str] | None = None,
+    fail_packages: list[str] | None = None,
+    skip_packages: list[str] | None = None,
+    ignore_licenses: list[str] | None = None,
+    fail_licenses: list[str] | None = None,
+    path: str | Path | None = None,
+    include_environment: bool = True,
+    backend: str | None = None,
+    portable: bool = False,
+    graph: bool = False,
+) -> str:
+    """Get a stable hash of the inputs to a license resolution.
+
+    Arguments:
+        using: The licensecheck ``using`` spec.
+        ignore_packages: Packages to ignore.
+        fail_packages: Packages to fail on.
+        skip_packages: Packages to skip.
+        ignore_licenses: Licenses to ignore.
+        fail_licenses: Licenses to fail on.
+        path: The directory the requirements are resolved in.
+        include_environment: Include the installed distributions in the fingerprint.
+        backend: The backend used to resolve the licenses.
+        portable: Use the requirement source paths relative to the requirements path (and leave out the plugin
+            version), so the fingerprint is the same for another checkout of the project.
+        graph: The licenses are resolved from the dependency graph rather than the ``licensecheck`` CLI (the
+            other backends always use the graph).
+
+    Returns:
+        The hex digest of the fingerprint.
+    """
+    base_path = Path(path).resolve() if path else Path.cwd()
+    sources = {}
+    for source in get_requirement_sources(using, path):
+        name = Path(os.path.relpath(source, base_path)).as_posix() if portable else str(source)
+        sources[name] = hashlib.sha256(source.read_bytes()).hexdigest()
+    payload: dict[str, Any] = {
+        'using': using or 'PEP631',
+        'ignore_packages': sorted(ignore_packages or []),
+        'fail_packages': sorted(fail_packages or []),
+        'skip_packages': sorted(skip_packages or []),
+        'ignore_licenses': sorted(ignore_licenses or []),
+        'fail_licenses': sorted(fail_licenses or []),
+        'backend': backend or 'licensecheck',
+        'sources': sources,
+    }
+    if graph and (backend or 'licensecheck') == 'licensecheck':
+        payload['graph'] = True
+    if not portable:
+        payload.update({'version': get_version(), 'path': str(base_path)})
+    if include_environment:
+        payload['distributions'] = get_installed_distributions()
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class LicenseCache:
+    """On-disk cache of resolved packages with age and size based eviction."""
+
+    def __init__(self, directory: str | Path = DEFAULT_CACHE_DIR, max_age: float = 7, max_entries: int = 64):
+        """Initialise the cache.
+
+        Arguments:
+            directory: The directory to store the cache entries in.
+            max_age: The maximum age of an entry in days.
+            max_entries: The maximum number of entries to keep.
+        """
+        self.directory = Path(directory)
+        self.max_age = max_age
+        self.max_entries = max_entries
+
+    def key(self, **kwargs: Any) -> str:
+        """Get the cache key for the [`get_package_licenses`][mkdocs_licenseinfo.get_licenses.get_package_licenses] arguments."""
+        return fingerprint(**kwargs)
+
+    def _entry(self, key: str) -> Path:
+        return self.directory / f'{key}.json'
+
+    def _expired(self, entry: Path) -> bool:
+        return time.time() - entry.stat().st_mtime > self.max_age * 86400
+
+    def get(self, key: str) -> list[dict[str, Any]] | None:
+        """Get the cached packages for a key, or ``None`` if there is no (valid) entry."""
+        entry = self._entry(key)
+        try:
+            if self._expired(entry):
+                entry.unlink()
+                return None
+            packages: list[dict[str, Any]] = json.loads(entry.read_text(encoding='utf-8'))['packages']
+        except (OSError, ValueError, KeyError):
+            return None
+        # Touch the entry so eviction is least recently used
+        os.utime(entry)
+        logger.debug(f'License cache hit: {key}')
+        return packages
+
+    def set(self, key: str, packages: list[dict[str, Any]]) -> None:
+        """Store the packages for a key and evict old entries."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entry = self._entry(key)
+        tmp_entry = entry.with_suffix(f'.{os.getpid()}.tmp')
+        tmp_entry.write_text(json.dumps({'packages': packages}), encoding='utf-8')
+        os.replace(tmp_entry, entry)
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove entries that are too old, or the least recently used entries over ``max_entries``."""
+        if not self.directory.exists():
+            return
+        entries = []
+        for entry in self.directory.glob('*.json'):
+            try:
+                if self._expired(entry):
+                    entry.unlink()
+                else:
+                    entries.append((entry.stat().st_mtime, entry))
+            except OSError:
+                pass
+        entries.sort(reverse=True)
+        for _, entry in entries[self.max_entries:]:
+            logger.debug(f'Evicting license cache entry: {entry.stem}')
+            entry.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        for entry in self.directory.glob('*.json'):
+            entry.unlink(missing_ok=True)
+
+
+def get_user_cache_dir() -> Path:
+    """Get the user cache dir for mkdocs_licenseinfo (``$XDG_CACHE_HOME/mkdocs_licenseinfo`` or ``~/.cache/mkdocs_licenseinfo``)."""
+    return Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'mkdocs_licenseinfo'
+
+
+def metadata_key(name: str, version: str) -> str:
+    """Get the ``name==version`` key for a distribution (with the PEP 503 normalized name)."""
+    from packaging.utils import canonicalize_name
+
+    return f'{canonicalize_name(name)}=={version}'
+
+
+class MetadataCache:
+    """SQLite cache of the package metadata for each distribution, with least recently used eviction.
+
+    The database is only opened (and created) when it is first used, in WAL mode, so builds (and threads) can
+    read it while another writes. Errors reading or writing the database are logged and treated as cache misses.
+
+    It is only used by the [`DependencyGraph`][mkdocs_licenseinfo.get_licenses.DependencyGraph] lookups, as
+    the ``licensecheck`` CLI looks up the packages itself.
+    """
+
+    def __init__(self, path: str | Path | None = None, max_entries: int = 10000):
+        """Initialise the cache.
+
+        Arguments:
+            path: The path of the SQLite file (defaults to ``metadata.sqlite3`` in the user cache dir).
+            max_entries: The maximum number of distributions to keep.
+        """
+        self.path = Path(path) if path else get_user_cache_dir() / METADATA_CACHE_FILE
+        self.max_entries = max_entries
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            import sqlite3
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, record TEXT NOT NULL, accessed REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS metadata_accessed ON metadata (accessed)')
+            self._connection = connection
+        return self._connection
+
+    def get(self, keys: Iterable[str]) -> dict[str, dict[str, Any]]:
+        """Get the cached metadata for the ``name==version`` keys.
+
+        Returns:
+            The metadata for each key that is in the cache.
+        """
+        import sqlite3
+
+        keys = list(dict.fromkeys(keys))
+        records: dict[str, dict[str, Any]] = {}
+        if not keys:
+            return records
+        try:
+            with self._lock:
+                connection = self._connect()
+                for start in range(0, len(keys), _QUERY_CHUNK_SIZE):
+                    chunk = keys[start:start+_QUERY_CHUNK_SIZE]
+                    rows = connection.execute(
+                        f'SELECT key, record FROM metadata WHERE key IN ({",".join("?"*len(chunk))})', chunk
+                    ).fetchall()
+                    records.update((key, json.loads(record)) for key, record in rows)
+                if records:
+                    # Touch the entries so eviction is least recently used
+                    now = time.time()
+                    connection.executemany('UPDATE metadata SET accessed = ? WHERE key = ?', [(now, u) for u in records])
+        except (sqlite3.Error, OSError, ValueError) as error:
+            logger.warning(f'Unable to read the metadata cache {self.path}: {error}')
+            return {}
+        logger.debug(f'Metadata cache hits: {len(records)} of {len(keys)}')
+        return records
+
+    def set(self, records: dict[str, dict[str, Any]]) -> None:
+        """Store the metadata for the ``name==version`` keys, and evict the least recently used entries."""
+        import sqlite3
+
+        if not records:
+            return
+        now = time.time()
+        rows = [(key, json.dumps({u: record.get(u) for u in METADATA_FIELDS}), now) for key, record in records.items()]
+        try:
+            with self._lock:
+                connection = self._connect()
+                with connection:
+                    connection.execute('BEGIN')
+                    connection.executemany('INSERT OR REPLACE INTO metadata (key, record, accessed) VALUES (?, ?, ?)', rows)
+                    connection.execute(
+                        'DELETE FROM metadata WHERE key NOT IN (SELECT key FROM metadata ORDER BY accessed DESC LIMIT ?)',
+                        (self.max_entries,)
+                    )
+        except (sqlite3.Error, OSError) as error:
+            logger.warning(f'Unable to write the metadata cache {self.path}: {error}')
+
+    def __len__(self) -> int:
+        """Get the number of cached distributions."""
+        with self._lock:
+            count: int = self._connect().execute('SELECT COUNT(*) FROM metadata').fetchone()[0]
+            return count
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._connect().execute('DELETE FROM metadata')
+
+    def close(self) -> None:
+        """Close the database connection (it is opened again when needed)."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,116 @@
+"""Command line interface to resolve the licenses for the docs before building them.
+
+This resolves the licenses for all the ``::licenseinfo`` blocks in the ``docs_dir`` of an ``mkdocs.yml`` (and for
+the manifest and license pages, if they are enabled), with the same options and
+[`LicenseResolver`][mkdocs_licenseinfo.resolver.LicenseResolver] as the plugin uses when rendering the blocks,
+and writes them to the plugin's cache (and optionally its snapshot), so the licenses can be resolved in parallel
+with other CI steps and ``mkdocs build`` only needs to render them:
+
+```bash
+mkdocs-licenseinfo -f mkdocs.yml --workers 4
+```
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from typing import Any, Mapping, Sequence, TYPE_CHECKING
+
+from mkdocs_licenseinfo.snapshot import select_snapshot_specs, write_snapshot
+
+if TYPE_CHECKING:
+    from mkdocs.structure.files import Files
+
+
+def get_build_resolution_specs(files: Files, config: Mapping[str, Any]) -> list[dict[str, Any]]:
+    """Get the license resolutions for a build with the plugin config (the blocks, manifest and license pages)."""
+    from mkdocs_licenseinfo.plugin import get_docs_resolution_specs, get_project_resolution_spec
+
+    specs = get_docs_resolution_specs(files, config)
+    if config['manifest']:
+        specs.append(get_project_resolution_spec(config, config['manifest_using']))
+    if config['pages']:
+        specs.append(get_project_resolution_spec(config, config['pages_using']))
+    return specs
+
+
+def main(args: Sequence[str] | None = None) -> int:
+    """Resolve the licenses for the docs of an ``mkdocs.yml``, and write them to the plugin's cache (and snapshot).
+
+    Returns:
+        The exit code (1 if any of the resolutions failed).
+    """
+    from mkdocs.config import load_config
+    from mkdocs.structure.files import get_files
+
+    from mkdocs_licenseinfo.extension import get_block_options
+
+    parser = argparse.ArgumentParser(
+        prog='mkdocs-licenseinfo',
+        description='Resolve the licenses for the licenseinfo blocks in the docs, and write them to the cache.'
+    )
+    parser.add_argument('-f', '--config-file', default='mkdocs.yml', help='The mkdocs config file.')
+    parser.add_argument(
+        '-w', '--workers', type=int, help="The number of workers to resolve the licenses with (defaults to the plugin's workers)."
+    )
+    parser.add_argument(
+        '--worker-pool', choices=('process', 'thread'), help="The type of worker pool to use (defaults to the plugin's worker_pool)."
+    )
+    parser.add_argument('--snapshot', action='store_true', help="Also write the licenses to the plugin's snapshot_path.")
+    parser.add_argument('-o', '--output', help="The snapshot path to write to (implies --snapshot).")
+    options = parser.parse_args(args)
+    config = load_config(options.config_file)
+    plugin = config.plugins.get('mkdocs_licenseinfo')
+    if plugin is None:
+        parser.error(f'The mkdocs_licenseinfo plugin is not configured in {options.config_file}')
+    if not plugin.config.enabled:
+        parser.error(f'The mkdocs_licenseinfo plugin is disabled in {options.config_file}')
+    plugin.on_config(config)
+    # As for a build (the plugin instance is reused if the config is loaded again in the same process)
+    plugin.on_pre_build(config)
+    resolver = plugin.resolver
+    snapshot_path = None
+    plugin_snapshot_path = get_block_options('', plugin.config)['snapshot_path']
+    if options.snapshot or options.output:
+        snapshot_path = options.output or plugin_snapshot_path
+        if not snapshot_path:
+            parser.error('No --output given and snapshot_path is not set for the plugin')
+    elif resolver.cache is None:
+        parser.error('The plugin cache is disabled (cache: false), use --snapshot to write the licenses to the snapshot instead')
+    specs = get_build_resolution_specs(get_files(config), plugin.config)
+    workers = options.workers or plugin.config.workers
+    try:
+        if workers > 1:
+            resolver.prefetch(specs, workers=workers, pool=options.worker_pool or plugin.config.worker_pool)
+        # The prefetched resolutions are memoized, so this only resolves the rest (and reports any failures)
+        resolutions: dict[tuple[Any, ...], Exception | None] = {}
+        for spec in specs:
+            key = resolver.key(**{u: v for u, v in spec.items() if u != 'snapshot_path'})
+            if key in resolutions:
+                continue
+            resolutions[key] = None
+            try:
+                resolver.get_package_licenses(**spec)
+            except Exception as error:
+                resolutions[key] = error
+                print(f'Unable to resolve licenses for: {spec["using"] or "PEP631"} in path: {spec["path"]} ({error})', file=sys.stderr)
+        failed = sum(u is not None for u in resolutions.values())
+        print(f'Resolved the licenses for {len(resolutions) - failed} of {len(resolutions)} resolutions')
+        if resolver.cache is not None:
+            print(f'License cache: {resolver.cache.directory}')
+        if snapshot_path and not failed:
+            snapshot_path = write_snapshot(
+                snapshot_path, select_snapshot_specs(specs, plugin_snapshot_path), resolve=resolver.get_package_licenses,
+                graph=resolver.use_graph
+            )
+            print(f'License snapshot written to: {snapshot_path}')
+        elif snapshot_path:
+            print('License snapshot not written, as not all the licenses could be resolved', file=sys.stderr)
+    finally:
+        if resolver.metadata_cache is not None:
+            resolver.metadata_cache.close()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
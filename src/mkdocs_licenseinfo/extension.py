@@ -10,7 +10,7 @@ The specifics can be configured with YAML configuration in the block, and includ
 
     # The information on what to use for requirments (see the [licensecheck docs](https://pypi.org/project/licensecheck/#configuration-example)) - default is PEP631 (pyproject.toml)
     using: <PEP631:dev;dev-test>
-    # Packages to remove (see the [licensecheck docs](https://pypi.org/project/licensecheck/#configuration-example)) - default is None, the packages in this are not shown in the section
+    # Packages to remove (see the [licensecheck docs](https://pypi.org/project/licensecheck/#configuration-example)) - default is None, the packages in this (or any of a list of specs) are not shown in the section
     diff: <PEP631>
     # A list of packages to ignore
     ignore_packages: <list of packages>
@@ -28,27 +28,53 @@ The specifics can be configured with YAML configuration in the block, and includ
     package_template: "{{package.name}}"
     # Path to requirements containing folder relative to docs_dir - if not set the working dir is used
     requirements_path: <path string>
+    # Path to a license snapshot to use instead of resolving the licenses, relative to docs_dir (optional)
+    snapshot_path: <path string>
+    # Build the elements for the default package template directly (tree) rather than parsing its markdown, or
+    # write the packages as JSON to be loaded into a sortable, filterable table in the browser (table-json)
+    render: <markdown, tree or table-json>
+    # Sort the packages on a key (name, license, author or license_family) - default is the order they are resolved in
+    sort_by: <name>
+    # Group the packages on a key (name, license, author or license_family), with a heading for each group
+    group_by: <license_family>
+    # Set the group heading template as a Jinja2 template (optional) (the group, with its name and packages, is passed in as group)
+    group_template: "# {{group.name}}"
 ```
 """
 
 from __future__ import annotations
 
+from itertools import count
 from pathlib import Path
 import re
-from typing import Any, MutableSequence, TYPE_CHECKING
-from xml.etree.ElementTree import Element  # nosec: B405
+from typing import Any, Iterator, Mapping, MutableSequence, TYPE_CHECKING
+from xml.etree.ElementTree import Element, SubElement  # nosec: B405
 
 from markdown.blockprocessors import BlockProcessor
 from markdown.extensions import Extension
 from mkdocs.utils.yaml import get_yaml_loader, yaml_load
 
 from mkdocs_licenseinfo import logger
-from mkdocs_licenseinfo.render_markdown import get_licenses_as_markdown
+from mkdocs_licenseinfo.profiler import NULL_PROFILER
 
 if TYPE_CHECKING:
     from markdown import Markdown
     from markdown.blockparser import BlockParser
 
+    from mkdocs_licenseinfo.profiler import Profiler
+    from mkdocs_licenseinfo.resolver import LicenseResolver
+    from mkdocs_licenseinfo.table import LicenseTables
+
+
+# The marker for a block (a page without it has no blocks to process)
+LICENSEINFO_MARKER = '::licenseinfo'
+_FENCED_CODE = re.compile(r'^ *(`{3,}|~{3,}).*?^ *\1', flags=re.MULTILINE | re.DOTALL)
+# Marks where the next chunk of a block's rendered packages should be inserted
+_CONTINUATION = '\x02licenseinfo-continue:'
+# The number of packages to render and insert into the blocks at a time
+RENDER_CHUNK_SIZE = 100
+RENDER_MODES = ('markdown', 'tree', 'table-json')
+
 
 class LicenseInfoProcessor(BlockProcessor):
     """License info Markdown block processor."""
@@ -59,19 +85,37 @@ class LicenseInfoProcessor(BlockProcessor):
         self,
         parser: BlockParser,
         config: dict,
+        resolver: LicenseResolver | None = None,
+        profiler: Profiler | None = None,
+        tables: LicenseTables | None = None,
     ) -> None:
         """Initialize the processor."""
         super().__init__(parser=parser)
         self._config = config
+        self._resolver = resolver
+        self._profiler = profiler or NULL_PROFILER
+        self._tables = tables
+        self._pending: dict[str, Iterator[str]] = {}
+        self._chunk_ids = count()
 
     def test(self, parent: Element, block: str) -> bool:  # noqa: U100
-        """Match the extension instructions."""
-        logger.debug(f'Checking block: {block}')
+        """Match the extension instructions (or the continuation of a block being rendered).
+
+        This is called for every block on the page, so the regex is only run for blocks containing the marker.
+        """
+        if block.startswith(_CONTINUATION):
+            return True
+        if LICENSEINFO_MARKER not in block:
+            return False
+        logger.debug('Checking block: %.100s', block)
         return bool(self.regex.search(block))
 
     def run(self, parent: Element, blocks: MutableSequence[str]) -> None:
         """Run code on the matched blocks to get the markdown."""
         block = blocks.pop(0)
+        if block.startswith(_CONTINUATION):
+            self._insert_next_chunk(block, blocks)
+            return
         match = self.regex.search(block)
 
         if match:
@@ -88,66 +132,164 @@ class LicenseInfoProcessor(BlockProcessor):
             blocks.insert(0, the_rest)
 
         if match:
+            # Imported when the first block is processed (rather than when mkdocs loads the plugin), as this
+            # imports licensecheck and Jinja2
+            from mkdocs_licenseinfo.render_markdown import (
+                get_licenses_as_elements,
+                get_licenses_as_table,
+                GROUP_TEMPLATE,
+                PACKAGE_TEMPLATE
+            )
+
             heading_level = match["heading"].count("#")
-            # We are going to process the markdown from the releases and then
-            # insert it back into the blocks to be processed as markdown
-            block = self._process_block(block, heading_level)
-            blocks.insert(0, block)
+            options = self._get_options(block, heading_level)
+            render = options.pop('render')
+            if render == 'table-json':
+                if self._tables is not None:
+                    # Only the table container is in the page, the packages are loaded from the JSON in the browser
+                    options.pop('package_template')
+                    options.pop('base_indent')
+                    options.pop('group_template')
+                    if options.pop('group_by'):
+                        logger.warning('group_by is not used with render: table-json, the table can be sorted instead')
+                    html = get_licenses_as_table(self._tables, **options, resolver=self._resolver, profiler=self._profiler)
+                    SubElement(parent, 'p').text = self.parser.md.htmlStash.store(html)
+                    return
+                logger.warning('render: table-json needs the mkdocs_licenseinfo plugin, rendering as markdown')
+            default_templates = (
+                options['package_template'] in (None, PACKAGE_TEMPLATE) and options['group_template'] in (None, GROUP_TEMPLATE)
+            )
+            if render == 'tree' and default_templates:
+                # Build the elements for the default templates directly, rather than parsing their markdown
+                options.pop('package_template')
+                options.pop('group_template')
+                parent.extend(get_licenses_as_elements(**options, resolver=self._resolver, profiler=self._profiler))
+                return
+            # We are going to render the markdown for the packages and insert it back into the blocks to be
+            # processed as markdown, a chunk at a time (followed by a marker to insert the next chunk)
+            key = f'{_CONTINUATION}{next(self._chunk_ids)}'
+            self._pending[key] = self._iter_markdown(options)
+            self._insert_next_chunk(key, blocks)
 
-    def _process_block(
-        self,
-        yaml_block: str,
-        heading_level: int = 0,
-    ) -> str:
-        """Process a block."""
-        config = yaml_load(yaml_block, loader=get_yaml_loader()) or {}
-        if heading_level is None:
-            heading_level = 0
-        base_indent = config.get('base_indent', heading_level)
-        using = config.get('using', None)
-        diff = config.get('diff', None)
-        ignore_packages = config.get('ignore_packages', self._config.get('ignore_packages', None))
-        fail_packages = config.get('fail_packages', self._config.get('fail_packages', None))
-        skip_packages = config.get('skip_packages', self._config.get('skip_packages', None))
-        ignore_licenses = config.get('ignore_licenses', self._config.get('ignore_licenses', None))
-        fail_licenses = config.get('fail_licenses', self._config.get('fail_licenses', None))
-        package_template = config.get('package_template', self._config.get('package_template', None))
-        requirements_path = config.get('requirements_path', self._config.get('requirements_path', None))
-        if requirements_path:
-            requirements_path = (Path(self._config.get('docs_dir', '.')) / Path(requirements_path)).resolve()
-        block = '\n\n'.join(get_licenses_as_markdown(
-            using=using,
-            ignore_packages=ignore_packages,
-            fail_packages=fail_packages,
-            skip_packages=skip_packages,
-            ignore_licenses=ignore_licenses,
-            fail_licenses=fail_licenses,
-            diff=diff,
-            package_template=package_template,
-            path=requirements_path
-            ))
-        # We need to decrease/increase the base indent level
-        if base_indent > 0:
-            block = block.replace('# ', ('#'*base_indent)+'# ')
-        return block
+    def _insert_next_chunk(self, key: str, blocks: MutableSequence[str]) -> None:
+        """Insert the next rendered chunk of a block (and the marker for the one after) into the blocks."""
+        chunk = next(self._pending[key], None)
+        if chunk is None:
+            del self._pending[key]
+            return
+        blocks[0:0] = [*chunk.split('\n\n'), key]
+
+    def _get_options(self, yaml_block: str, heading_level: int = 0) -> dict[str, Any]:
+        """Get the options for a block."""
+        self._profiler.block()
+        with self._profiler.stage('parse'):
+            options = get_block_options(yaml_block, self._config, heading_level)
+        self._profiler.label_block(options['using'])
+        return options
+
+    def _iter_markdown(self, options: dict[str, Any]) -> Iterator[str]:
+        """Render the markdown for the packages in chunks as they are needed."""
+        from mkdocs_licenseinfo.render_markdown import iter_licenses_as_markdown
+
+        return iter_licenses_as_markdown(
+            **options,
+            resolver=self._resolver,
+            profiler=self._profiler,
+            chunk_size=RENDER_CHUNK_SIZE
+        )
+
+
+def get_block_options(
+    yaml_block: str,
+    config: Mapping[str, Any],
+    heading_level: int | None = 0,
+) -> dict[str, Any]:
+    """Get the options for a block from its YAML configuration, falling back to the global config.
+
+    Returns:
+        The keyword arguments (including the ``base_indent``) for
+            [`iter_licenses_as_markdown`][mkdocs_licenseinfo.render_markdown.iter_licenses_as_markdown].
+    """
+    block_config = yaml_load(yaml_block, loader=get_yaml_loader()) or {}
+    if heading_level is None:
+        heading_level = 0
+    requirements_path = block_config.get('requirements_path', config.get('requirements_path', None))
+    if requirements_path:
+        requirements_path = (Path(config.get('docs_dir', '.')) / Path(requirements_path)).resolve()
+    snapshot_path = block_config.get('snapshot_path', config.get('snapshot_path', None))
+    if snapshot_path:
+        snapshot_path = (Path(config.get('docs_dir', '.')) / Path(snapshot_path)).resolve()
+    return {
+        'base_indent': block_config.get('base_indent', heading_level),
+        'using': block_config.get('using', None),
+        'ignore_packages': block_config.get('ignore_packages', config.get('ignore_packages', None)),
+        'fail_packages': block_config.get('fail_packages', config.get('fail_packages', None)),
+        'skip_packages': block_config.get('skip_packages', config.get('skip_packages', None)),
+        'ignore_licenses': block_config.get('ignore_licenses', config.get('ignore_licenses', None)),
+        'fail_licenses': block_config.get('fail_licenses', config.get('fail_licenses', None)),
+        'diff': block_config.get('diff', None),
+        'package_template': block_config.get('package_template', config.get('package_template', None)),
+        'path': requirements_path,
+        'backend': block_config.get('backend', config.get('backend', None)),
+        'snapshot_path': snapshot_path,
+        'render': block_config.get('render', config.get('render', None)) or 'markdown',
+        'sort_by': block_config.get('sort_by', config.get('sort_by', None)),
+        'group_by': block_config.get('group_by', config.get('group_by', None)),
+        'group_template': block_config.get('group_template', config.get('group_template', None)),
+    }
+
+
+def find_blocks(markdown: str) -> list[tuple[str, int]]:
+    """Find the licenseinfo blocks in a markdown source (ignoring fenced code).
+
+    Returns:
+        The (YAML configuration, heading level) for each block.
+    """
+    markdown = _FENCED_CODE.sub('', markdown)
+    blocks = []
+    for match in LicenseInfoProcessor.regex.finditer(markdown):
+        lines = []
+        for line in markdown[match.end():].split('\n')[1:]:
+            if line.startswith('    '):
+                lines.append(line[4:])
+            elif line.startswith('\t'):
+                lines.append(line[1:])
+            else:
+                break
+        blocks.append(('\n'.join(lines), match['heading'].count('#')))
+    return blocks
 
 
 class LicenseInfoExtension(Extension):
     """The Markdown extension."""
 
-    def __init__(self, config: dict, **kwargs: Any) -> None:
+    def __init__(
+        self,
+        config: dict,
+        resolver: LicenseResolver | None = None,
+        profiler: Profiler | None = None,
+        tables: LicenseTables | None = None,
+        **kwargs: Any
+    ) -> None:
         """Initialize the object."""
         super().__init__(**kwargs)
         self._config = config
+        self._resolver = resolver
+        self._profiler = profiler
+        self._tables = tables
+        # Set by the plugin for each page, so the processor is only added for pages with blocks
+        self.active = True
 
     def extendMarkdown(self, md: Markdown) -> None:
         """Register the extension.
 
         Add an instance of [`LicenseInfoProcessor`][mkdocs_licenseinfo.extension.LicenseInfoProcessor]
-        to the Markdown parser.
+        to the Markdown parser (unless the extension is not ``active`` for the page).
         """
+        if not self.active:
+            return
         md.parser.blockprocessors.register(
-            LicenseInfoProcessor(md.parser, self._config),
+            LicenseInfoProcessor(md.parser, self._config, self._resolver, self._profiler, self._tables),
             "license_check",
             priority=75,  # Right before markdown.blockprocessors.HashHeaderProcessor
         )
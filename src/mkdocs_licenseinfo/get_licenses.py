@@ -1,126 +1,338 @@
-"""Get licenseinfo."""
+"""Get licenseinfo.
+
+The licenses are returned as [`PackageLicense`][mkdocs_licenseinfo.get_licenses.PackageLicense] records by
+[`get_package_licenses`][mkdocs_licenseinfo.get_licenses.get_package_licenses] and
+[`resolve_package_licenses`][mkdocs_licenseinfo.get_licenses.resolve_package_licenses], with
+[`get_licenses`][mkdocs_licenseinfo.get_licenses.get_licenses] and
+[`resolve_licenses`][mkdocs_licenseinfo.get_licenses.resolve_licenses] providing the same results as dicts.
+
+There are two ways of resolving the licenses:
+
+* [`get_package_licenses`][mkdocs_licenseinfo.get_licenses.get_package_licenses] uses ``licensecheck`` in the
+  same way as its CLI, which reads the config and requirements from the working directory (so calls are
+  serialised with a lock).
+* [`resolve_package_licenses`][mkdocs_licenseinfo.get_licenses.resolve_package_licenses] calls the
+  ``licensecheck`` library functions with an explicit base path, so it does not change any global state and can
+  be run concurrently. A [`PackageInfoLookup`][mkdocs_licenseinfo.get_licenses.PackageInfoLookup] can be shared
+  between concurrent calls so that the metadata for packages in several resolutions is only looked up once.
+
+[`resolve_package_licenses`][mkdocs_licenseinfo.get_licenses.resolve_package_licenses] also supports an
+``importlib`` backend, which reads the requirements and package metadata from the installed distributions only
+(using a [`DistributionIndex`][mkdocs_licenseinfo.get_licenses.DistributionIndex]) rather than ``licensecheck``.
+
+A [`DependencyGraph`][mkdocs_licenseinfo.get_licenses.DependencyGraph] holds the requirement edges and package
+metadata for a project path, so resolutions with different ``using`` specs for the same project only need to
+traverse it. Its lookups can read the metadata for the installed distributions from a
+[`MetadataCache`][mkdocs_licenseinfo.cache.MetadataCache].
+"""
 from __future__ import annotations
 
-from contextlib import ContextDecorator
-from io import StringIO
-import json
+import configparser
+from contextlib import contextmanager
+import copy
+from dataclasses import dataclass
+from functools import lru_cache
+from importlib import metadata
 import os
 from pathlib import Path
+import re
 import sys
+import threading
+from typing import Any, Callable, Iterable, Iterator, TYPE_CHECKING
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
 
-import licensecheck
+from fhconfparser import FHConfParser, SimpleConf
+# These are licensecheck internals rather than a public API (getDepsWithLicenses gains arguments in 2024.1, and
+# get_deps is removed in 2025), as are the license_matrix, packageinfo and types functions used by the graph path,
+# so licensecheck is pinned to the 2024.0 releases in the pyproject.toml
+from licensecheck import get_deps, license_matrix, packageinfo
+from licensecheck.types import JOINS, PackageInfo, ucstr, UNKNOWN
+from packaging.requirements import Requirement
+from packaging.utils import canonicalize_name
 
 from mkdocs_licenseinfo import logger
+from mkdocs_licenseinfo.licenses import normalize_licenses
+
+if TYPE_CHECKING:
+    from mkdocs_licenseinfo.cache import LicenseCache, MetadataCache
+
+USINGS = ['requirements', 'poetry', 'PEP631']
+BACKENDS = ['licensecheck', 'importlib']
+# licensecheck reads its config and requirements from the working directory so calls to it must be serialised
+_LICENSECHECK_LOCK = threading.RLock()
 
 
-class UnclosableIO(StringIO):
-    """StringIO object that cannot be closed."""
+def normalize_package_name(name: str) -> str:
+    """Get the PEP 503 normalized name of a package (e.g. ``Foo_Bar.baz`` is ``foo-bar-baz``)."""
+    return canonicalize_name(name)
 
-    def close(self):
-        """Don't close it."""
-        pass
 
-    def force_close(self):
-        """Force close it."""
-        super().close()
+def _package_key(name: str) -> ucstr:
+    """Get the ``licensecheck`` (upper case) key for a package name, after PEP 503 normalization."""
+    return ucstr(normalize_package_name(name))
 
-    def __del__(self, *args, **kwargs):
-        """Make sure it closes."""
-        self.force_close()
-        super().__del__(*args, **kwargs)
 
+def _split_license(license: str) -> tuple[str, ...]:
+    return tuple(u.strip() for u in license.split(';;'))
 
-class LicenseCheckArgs(ContextDecorator):
-    """Context manager for setting licensecheck args."""
 
-    def __init__(
-        self,
-        using='PEP631',
-        format='json',
-        ignore_packages=None,
-        fail_packages=None,
-        skip_packages=None,
-        ignore_licenses=None,
-        fail_licenses=None,
-        output=None,
-        path=None
-    ):
-        """Initialise the context manager.
+@lru_cache(maxsize=1024)
+def _license_types(license: ucstr, ignore_licenses: tuple[ucstr, ...]) -> tuple[license_matrix.L, ...]:
+    """Get the licensecheck license types for a license string (each distinct license is only matched once)."""
+    return tuple(license_matrix.licenseType(license, list(ignore_licenses)))
 
-        Keyword Args:
-            target_dir (Optional[Path]): the target directory
+
+@dataclass
+class PackageLicense:
+    """The license information for a package.
+
+    The attributes match the keys of the package dicts used by the templates (and the ``licensecheck``
+    ``PackageInfo``), with the licenses already split into ``licenses``, and normalized (see
+    [`normalize_licenses`][mkdocs_licenseinfo.licenses.normalize_licenses]) into the ``spdx`` identifier for each
+    license and the ``license_family`` of the package. Templates can use the records
+    directly, and [`as_dict`][mkdocs_licenseinfo.get_licenses.PackageLicense.as_dict] provides the dict view.
+    """
+    __slots__ = (
+        'name', 'version', 'namever', 'size', 'homePage', 'author', 'license', 'licenses', 'licenseCompat', 'errorCode',
+        'spdx', 'license_family'
+    )
+    name: str
+    version: str
+    namever: str
+    size: int
+    homePage: str
+    author: str
+    license: str
+    licenses: tuple[str, ...]
+    licenseCompat: bool
+    errorCode: int
+    spdx: tuple[str, ...]
+    license_family: str
+
+    @classmethod
+    def from_package_info(cls, package_info: PackageInfo) -> PackageLicense:
+        """Create the record from a ``licensecheck`` ``PackageInfo``."""
+        licenses = _split_license(package_info.license)
+        spdx, license_family = normalize_licenses(licenses)
+        return cls(
+            name=package_info.name,
+            version=package_info.version,
+            namever=package_info.namever,
+            size=package_info.size,
+            homePage=package_info.homePage,
+            author=package_info.author,
+            license=package_info.license,
+            licenses=licenses,
+            licenseCompat=package_info.licenseCompat,
+            errorCode=package_info.errorCode,
+            spdx=spdx,
+            license_family=license_family,
+        )
+
+    @classmethod
+    def from_dict(cls, package: dict[str, Any]) -> PackageLicense:
+        """Create the record from a package dict (e.g. from the cache).
+
+        The ``spdx`` and ``license_family`` are normalized from the licenses again (rather than read from the
+        dict), so they match the current lookup table.
         """
-        self._original_args = None
-        if output is None:
-            output = UnclosableIO()
-        self._output = output
-        self._stdout = None
-        self._using = using
-        self._format = format
-        if ignore_packages is None:
-            ignore_packages = []
-        self._ignore_packages = ignore_packages
-        if fail_packages is None:
-            fail_packages = []
-        self._fail_packages = fail_packages
-        if skip_packages is None:
-            skip_packages = []
-        self._skip_packages = skip_packages
-        if ignore_licenses is None:
-            ignore_licenses = []
-        self._ignore_licenses = ignore_licenses
-        if fail_licenses is None:
-            fail_licenses = []
-        self._fail_licenses = fail_licenses
-        self._original_path = None
-        if path:
-            path = Path(path)
-        self._path = path
-
-    def __enter__(self):
-        """Change to the set argv."""
-        self._original_args = sys.argv[:]
-        new_args = [
-            'licensecheck',
-            '-u',
-            self._using,
-            '--format',
-            self._format]
-        for package in self._ignore_packages:
-            new_args.append('--ignore-packages')
-            new_args.append(package)
-        for package in self._fail_packages:
-            new_args.append('--fail-packages')
-            new_args.append(package)
-        for package in self._skip_packages:
-            new_args.append('--skip-dependencies')
-            new_args.append(package)
-        for package in self._ignore_licenses:
-            new_args.append('--ignore-licenses')
-            new_args.append(package)
-        for package in self._fail_licenses:
-            new_args.append('--fail-licenses')
-            new_args.append(package)
-        self._stdout = licensecheck.stdout
-        licensecheck.stdout = self._output
-        sys.argv = new_args
-        if self._path:
-            self._original_path = Path.cwd()
-            os.chdir(str(self._path))
-
-    def __exit__(self, exc_type, exc_val, exc_tb):  # noqa: U100
-        """Reset to the original argv."""
-        sys.argv = self._original_args[:]
-        licensecheck.stdout = self._stdout
-        if self._path:
-            os.chdir(str(self._original_path))
-        # Handle SystemExit
-        if isinstance(exc_val, SystemExit) and exc_val.code == 0:
-            return True
-
-
-def _split_licenses(package):
-    package['licenses'] = [u.strip() for u in package['license'].split(';;')]
+        version = package.get('version', UNKNOWN)
+        license = package.get('license', UNKNOWN)
+        licenses = tuple(package['licenses']) if 'licenses' in package else _split_license(license)
+        spdx, license_family = normalize_licenses(licenses)
+        return cls(
+            name=package['name'],
+            version=version,
+            namever=package.get('namever', f'{package["name"]}-{version}'),
+            size=package.get('size', -1),
+            homePage=package.get('homePage', UNKNOWN),
+            author=package.get('author', UNKNOWN),
+            license=license,
+            licenses=licenses,
+            licenseCompat=package.get('licenseCompat', False),
+            errorCode=package.get('errorCode', 0),
+            spdx=spdx,
+            license_family=license_family,
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Get the package dict (with ``licenses`` and ``spdx`` as lists)."""
+        package = {u: getattr(self, u) for u in self.__slots__}
+        package['licenses'] = list(self.licenses)
+        package['spdx'] = list(self.spdx)
+        return package
+
+
+def select_packages(
+    packages: Iterable[PackageLicense],
+    exclude: Iterable[Iterable[PackageLicense]] = (),
+) -> list[PackageLicense]:
+    """Select the packages that aren't in any of the ``exclude`` lists (e.g. the ``diff`` packages).
+
+    The package names are compared after PEP 503 normalization using a set, so selection is linear in the number of
+    packages. The first record for each package is kept, in the original order.
+
+    Arguments:
+        packages: The package license records.
+        exclude: The package license records to remove, for each ``diff`` spec.
+
+    Returns:
+        The selected package license records.
+    """
+    seen = {normalize_package_name(u.name) for excluded in exclude for u in excluded}
+    selected = []
+    for package in packages:
+        name = normalize_package_name(package.name)
+        if name not in seen:
+            seen.add(name)
+            selected.append(package)
+    return selected
+
+
+@contextmanager
+def _working_directory(path: str | Path | None) -> Iterator[None]:
+    if not path:
+        yield
+        return
+    original_path = Path.cwd()
+    os.chdir(str(path))
+    try:
+        yield
+    finally:
+        os.chdir(str(original_path))
+
+
+def _get_licensecheck_package_infos(
+    using: str,
+    ignore_packages: list[str] | None = None,
+    fail_packages: list[str] | None = None,
+    skip_packages: list[str] | None = None,
+    ignore_licenses: list[str] | None = None,
+    fail_licenses: list[str] | None = None,
+    path: str | Path | None = None,
+) -> set[PackageInfo]:
+    """Get the package information using ``licensecheck`` in the same way as its CLI.
+
+    The options override those in the ``licensecheck`` config files (in the path and home directory). The package
+    names are compared after PEP 503 normalization, as for
+    [`resolve_package_licenses`][mkdocs_licenseinfo.get_licenses.resolve_package_licenses].
+    """
+    options: dict[str, Any] = {'using': using}
+    for key, value in [
+        ('ignore_packages', ignore_packages),
+        ('fail_packages', fail_packages),
+        ('skip_dependencies', skip_packages),
+        ('ignore_licenses', ignore_licenses),
+        ('fail_licenses', fail_licenses),
+    ]:
+        if value:
+            options[key] = value
+    with _LICENSECHECK_LOCK, _working_directory(path):
+        logger.info(f'Getting licenses for: {using} in path: {path}')
+        config_parser = FHConfParser()
+        namespace = ['tool']
+        config_parser.parseConfigList(
+            [('pyproject.toml', 'toml'), ('setup.cfg', 'ini')] + [
+                (f'{directory}/licensecheck.{ext}', ext)
+                for ext in ('toml', 'json', 'ini')
+                for directory in ['.', str(Path.home())]
+            ],
+            namespace,
+            namespace,
+        )
+        config = SimpleConf(config_parser, 'licensecheck', options)
+        ignore_packages = [_package_key(u) for u in config.get('ignore_packages', [])]
+        fail_packages = [_package_key(u) for u in config.get('fail_packages', [])]
+        package_infos: set[PackageInfo]
+        _, package_infos = get_deps.getDepsWithLicenses(
+            config.get('using', 'poetry'),
+            ignore_packages,
+            fail_packages,
+            [ucstr(u) for u in config.get('ignore_licenses', [])],
+            [ucstr(u) for u in config.get('fail_licenses', [])],
+            [_package_key(u) for u in config.get('skip_dependencies', [])],
+        )
+    for package_info in package_infos:
+        # licensecheck compares the package names without normalizing them
+        package_name = _package_key(package_info.name)
+        if package_name in ignore_packages:
+            package_info.licenseCompat = True
+        elif package_name in fail_packages:
+            package_info.licenseCompat = False
+    return package_infos
+
+
+def get_package_licenses(
+    using: str | None = 'PEP631',
+    ignore_packages: list[str] | None = None,
+    fail_packages: list[str] | None = None,
+    skip_packages: list[str] | None = None,
+    ignore_licenses: list[str] | None = None,
+    fail_licenses: list[str] | None = None,
+    path: str | Path | None = None,
+    cache: LicenseCache | None = None,
+    lookup: PackageInfoLookup | None = None,
+    backend: str | None = None,
+    graph: DependencyGraph | None = None
+) -> list[PackageLicense]:
+    """Get the licenses using licensecheck.
+
+    If a [`LicenseCache`][mkdocs_licenseinfo.cache.LicenseCache] is provided, licensecheck is only run when
+    there is no cached result for the fingerprint of the arguments and requirements.
+
+    If a [`PackageInfoLookup`][mkdocs_licenseinfo.get_licenses.PackageInfoLookup] is provided, the licenses are
+    resolved with [`resolve_package_licenses`][mkdocs_licenseinfo.get_licenses.resolve_package_licenses]
+    (sharing the package lookups), so the call can run concurrently with others. The ``importlib`` ``backend``
+    is also resolved with it, as are calls with a
+    [`DependencyGraph`][mkdocs_licenseinfo.get_licenses.DependencyGraph].
+
+    Returns:
+        The (sorted) package license records.
+    """
+    if using is None:
+        using = 'PEP631'
+    backend = backend or 'licensecheck'
+    if cache is not None:
+        key = cache.key(
+            using=using,
+            ignore_packages=ignore_packages,
+            fail_packages=fail_packages,
+            skip_packages=skip_packages,
+            ignore_licenses=ignore_licenses,
+            fail_licenses=fail_licenses,
+            path=path,
+            backend=backend,
+            graph=lookup is not None or graph is not None
+        )
+        cached_packages = cache.get(key)
+        if cached_packages is not None:
+            logger.info(f'Using cached licenses for: {using} in path: {path}')
+            return [PackageLicense.from_dict(u) for u in cached_packages]
+    if lookup is not None or graph is not None or backend != 'licensecheck':
+        packages = resolve_package_licenses(
+            using,
+            ignore_packages,
+            fail_packages,
+            skip_packages,
+            ignore_licenses,
+            fail_licenses,
+            path=path,
+            lookup=lookup,
+            backend=backend,
+            graph=graph
+        )
+    else:
+        package_infos = _get_licensecheck_package_infos(
+            using, ignore_packages, fail_packages, skip_packages, ignore_licenses, fail_licenses, path
+        )
+        packages = [PackageLicense.from_package_info(u) for u in sorted(package_infos)]
+    if cache is not None:
+        cache.set(key, [u.as_dict() for u in packages])
+    return packages
 
 
 def get_licenses(
@@ -130,29 +342,533 @@ def get_licenses(
     skip_packages=None,
     ignore_licenses=None,
     fail_licenses=None,
-    path=None
+    path=None,
+    cache: LicenseCache | None = None,
+    lookup: PackageInfoLookup | None = None,
+    backend: str | None = None,
+    graph: DependencyGraph | None = None
 ):
-    """Get the licenses using licensecheck."""
-    output = UnclosableIO()
-    if using is None:
-        using = 'PEP631'
-    with LicenseCheckArgs(
-        using=using,
-        format='json',
-        ignore_packages=ignore_packages,
-        fail_packages=fail_packages,
-        skip_packages=skip_packages,
-        ignore_licenses=ignore_licenses,
-        fail_licenses=fail_licenses,
-        output=output,
-        path=path
-    ):
-        logger.info(f'Getting licenses for: {using} in path: {path}')
-        licensecheck.cli()
-    result = json.loads(output.getvalue())
-    output.force_close()
-    # Loop over the results and clean the licenses
-    packages = result['packages']
-    for package in packages:
-        _split_licenses(package)
-    return packages
+    """Get the licenses using licensecheck as dicts.
+
+    See [`get_package_licenses`][mkdocs_licenseinfo.get_licenses.get_package_licenses].
+    """
+    packages = get_package_licenses(
+        using,
+        ignore_packages,
+        fail_packages,
+        skip_packages,
+        ignore_licenses,
+        fail_licenses,
+        path=path,
+        cache=cache,
+        lookup=lookup,
+        backend=backend,
+        graph=graph
+    )
+    return [u.as_dict() for u in packages]
+
+
+def _read_pyproject(base_path: Path) -> dict[str, Any]:
+    pyproject_path = base_path / 'pyproject.toml'
+    if pyproject_path.exists():
+        return tomllib.loads(pyproject_path.read_text(encoding='utf-8'))
+    return {}
+
+
+def _get_requires_dist(requirement: str) -> list[str]:
+    """Get the Requires-Dist for a requirement from the installed metadata or PyPI.
+
+    As for licensecheck, a requirement with an extra (e.g. ``FOO[BAR]``) isn't found in the installed metadata,
+    so it is read from PyPI.
+    """
+    try:
+        return metadata.metadata(requirement).get_all('Requires-Dist') or []
+    except metadata.PackageNotFoundError:
+        response = packageinfo.session.get(f'https://pypi.org/pypi/{requirement.split("[")[0]}/json', timeout=60)
+        try:
+            return response.json()['info']['requires_dist'] or []
+        except (KeyError, TypeError, ValueError):
+            return []
+
+
+@lru_cache(maxsize=None)
+def _parse_requirement(requirement: str) -> Requirement:
+    """Parse a requirement string (cached as the same requirements are parsed for each resolution)."""
+    return Requirement(requirement)
+
+
+_EXTRA_MARKER = re.compile(r"extra\s*==\s*[\"'](.*?)[\"']")
+
+
+def _get_extra(requirement: str) -> ucstr | None:
+    """Get the extra a ``Requires-Dist`` requirement is for (matching licensecheck, other markers are ignored)."""
+    match = _EXTRA_MARKER.search(requirement)
+    if match is None:
+        return None
+    return ucstr(match.group(1))
+
+
+def get_requirements(
+    using: str = 'PEP631',
+    skip_packages: list[str] | None = None,
+    path: str | Path | None = None,
+    pyproject: dict[str, Any] | None = None,
+    requires_dist: Callable[[str], list[str]] | None = None,
+) -> set[str]:
+    """Get the requirements (and their direct dependencies) for a ``using`` spec.
+
+    This gives the same requirements as ``licensecheck.get_deps.getReqs``, but reads the files relative to the
+    path rather than the working directory. As for licensecheck, environment markers are not evaluated: the
+    project requirements are all included, and their dependencies are included unless they are for an ``extra``
+    that wasn't requested.
+
+    Arguments:
+        using: The licensecheck ``using`` spec (e.g. ``PEP631:dev;dev-test``).
+        skip_packages: Packages to skip.
+        path: The directory containing the requirements (defaults to the working directory).
+        pyproject: The parsed ``pyproject.toml`` if it has already been loaded.
+        requires_dist: Get the ``Requires-Dist`` for a requirement, which is given with its first extra if it has
+            any, e.g. ``FOO[BAR]`` (defaults to the installed metadata, then PyPI).
+
+    Returns:
+        The uppercase canonical names of the requirements.
+    """
+    if requires_dist is None:
+        requires_dist = _get_requires_dist
+    base_path = Path(path) if path else Path.cwd()
+    if pyproject is None:
+        pyproject = _read_pyproject(base_path)
+    using, _, extras = using.partition(':')
+    if using not in USINGS:
+        using = 'poetry'
+    requirement_lists: list[Any] = []
+    if using == 'requirements':
+        for requirements_path in [base_path / u for u in (extras or 'requirements.txt').split(';')]:
+            if not requirements_path.exists():
+                raise RuntimeError(f'Could not find specification of requirements ({requirements_path}).')
+            lines = [u.strip() for u in requirements_path.read_text(encoding='utf-8').splitlines()]
+            requirement_lists.append([u for u in lines if u and u[0] not in {'#', '-'}])
+    else:
+        try:
+            if using == 'poetry':
+                project = pyproject['tool']['poetry']
+                requirement_lists.append(project['dependencies'])
+                if extras:
+                    requirement_lists.extend(
+                        project.get('group', {}).get(u, {}).get('dependencies', {}) for u in extras.split(';')
+                    )
+                    requirement_lists.append(project.get('dev-dependencies', {}))
+            else:
+                project = pyproject['project']
+                requirement_lists.append(project['dependencies'])
+                if extras:
+                    requirement_lists.extend(project['optional-dependencies'][u] for u in extras.split(';'))
+        except KeyError as error:
+            raise RuntimeError('Could not find specification of requirements (pyproject.toml).') from error
+    # The requirements are keyed as in licensecheck, with the first extra if they have any (e.g. FOO[BAR])
+    requirements = set()
+    requirement_extras: dict[str, set[ucstr]] = {}
+    for requirement_list in requirement_lists:
+        for requirement_string in requirement_list:
+            requirement = _parse_requirement(requirement_string)
+            name = _package_key(requirement.name)
+            if requirement.extras:
+                requirement_extras[name] = {ucstr(u) for u in requirement.extras}
+                requirements.add(ucstr(f'{name}[{min(requirement_extras[name])}]'))
+            else:
+                requirements.add(name)
+    requirements.discard('PYTHON')
+    # Only the requirements without extras can be skipped (as in licensecheck)
+    requirements -= {_package_key(u) for u in skip_packages or []}
+    # Get Dependencies (1 deep)
+    requirements_with_dependencies = {ucstr(u.split('[')[0]) for u in requirements}
+    for requirement_key in requirements:
+        name = requirement_key.split('[')[0]
+        for dependency_string in requires_dist(requirement_key):
+            extra = _get_extra(dependency_string)
+            if extra is None or extra in requirement_extras.get(name, set()):
+                requirements_with_dependencies.add(_package_key(_parse_requirement(dependency_string).name))
+    return requirements_with_dependencies
+
+
+def _get_project_license(base_path: Path, pyproject: dict[str, Any]) -> str:
+    """Get the project license from the ``setup.cfg`` or ``pyproject.toml`` without prompting."""
+    project_metadata: Any = {}
+    setup_cfg = base_path / 'setup.cfg'
+    if setup_cfg.exists():
+        config = configparser.ConfigParser()
+        config.read(setup_cfg)
+        if 'metadata' in config.sections() and 'license' in config['metadata']:
+            project_metadata = config['metadata']
+    if not project_metadata:
+        tool = pyproject.get('tool', {})
+        if 'poetry' in tool:
+            project_metadata = tool['poetry']
+        elif 'flit' in tool:
+            project_metadata = tool['flit']['metadata']
+        else:
+            project_metadata = pyproject.get('project', {})
+    project_license: str = packageinfo.licenseFromClassifierlist(project_metadata.get('classifiers', []))
+    if project_license != UNKNOWN:
+        return project_license
+    project_license = project_metadata.get('license', UNKNOWN)
+    if isinstance(project_license, dict):
+        project_license = project_license.get('text', UNKNOWN)
+    project_license = ucstr(f'{project_license}')
+    return project_license
+
+
+def _installed_versions() -> dict[str, str]:
+    """Get the versions of the installed distributions by normalized name (from a single walk)."""
+    versions: dict[str, str] = {}
+    for distribution in metadata.distributions():
+        package_metadata = distribution.metadata
+        if package_metadata['Name']:
+            versions.setdefault(_package_key(package_metadata['Name']), package_metadata['Version'])
+    return versions
+
+
+def _package_info_from_record(record: dict[str, Any]) -> PackageInfo:
+    """Create the package information from a metadata cache record."""
+    return PackageInfo(
+        name=record['name'],
+        version=record['version'],
+        homePage=record['homePage'],
+        author=record['author'],
+        size=record['size'],
+        license=ucstr(record['license']),
+    )
+
+
+def _cached_package_infos(
+    metadata_cache: MetadataCache,
+    requirements: Iterable[str],
+    versions: dict[str, str],
+    get_package_info: Callable[[str], PackageInfo]
+) -> Iterator[tuple[str, PackageInfo]]:
+    """Yield the package information for the requirements, using the metadata cache for the installed versions.
+
+    The package information for installed distributions that are not in the cache are then added to it.
+    """
+    from mkdocs_licenseinfo.cache import METADATA_FIELDS, metadata_key
+
+    keys = {}
+    for requirement in requirements:
+        version = versions.get(_package_key(requirement))
+        keys[requirement] = None if version is None else metadata_key(requirement, version)
+    cached = metadata_cache.get(u for u in keys.values() if u is not None)
+    records = {}
+    for requirement, key in keys.items():
+        if key in cached:
+            yield requirement, _package_info_from_record(cached[key])
+            continue
+        package_info = get_package_info(requirement)
+        if key is not None and package_info.version == key.split('==', 1)[1]:
+            # Only the installed distribution's metadata is stored for its name==version
+            records[key] = {u: getattr(package_info, u) for u in METADATA_FIELDS}
+        yield requirement, package_info
+    metadata_cache.set(records)
+
+
+class PackageInfoLookup:
+    """Thread-safe lookup of package metadata that can be shared between resolutions.
+
+    Each package is only looked up once, even if it is requested by concurrent resolutions (later requests
+    wait for the first lookup to finish). Copies are returned, as the resolutions set ``licenseCompat``.
+
+    If a [`MetadataCache`][mkdocs_licenseinfo.cache.MetadataCache] is provided, the metadata for installed
+    distributions is read from it (keyed on their installed ``name==version``) rather than looked up.
+    """
+
+    def __init__(self, metadata_cache: MetadataCache | None = None):
+        """Initialise the lookup.
+
+        Arguments:
+            metadata_cache: The (optional) cache of the metadata for each distribution.
+        """
+        self._lock = threading.Lock()
+        self._package_infos: dict[str, PackageInfo] = {}
+        self._pending: dict[str, threading.Event] = {}
+        self.metadata_cache = metadata_cache
+        self._versions: dict[str, str] | None = None
+
+    @staticmethod
+    def _get_package_info(requirement: str) -> PackageInfo:
+        # getPackages always returns a single package info for a single requirement
+        package_info, = packageinfo.getPackages({requirement})
+        return package_info
+
+    def _iter_package_infos(self, requirements: set[ucstr]) -> Iterator[tuple[str, PackageInfo]]:
+        if self.metadata_cache is None:
+            for requirement in requirements:
+                yield requirement, self._get_package_info(requirement)
+            return
+        if self._versions is None:
+            self._versions = _installed_versions()
+        yield from _cached_package_infos(self.metadata_cache, requirements, self._versions, self._get_package_info)
+
+    def get(self, requirements: set[ucstr]) -> set[PackageInfo]:
+        """Get the package information for the requirements.
+
+        Arguments:
+            requirements: The requirement names to look up.
+
+        Returns:
+            A copy of the package information for each requirement.
+        """
+        with self._lock:
+            waiting = {u: self._pending[u] for u in requirements if u in self._pending}
+            missing = {u for u in requirements if u not in self._package_infos and u not in waiting}
+            done = threading.Event()
+            for requirement in missing:
+                self._pending[requirement] = done
+        try:
+            if missing:
+                logger.debug(f'Looking up {len(missing)} packages')
+                for requirement, package_info in self._iter_package_infos(missing):
+                    with self._lock:
+                        self._package_infos[requirement] = package_info
+        finally:
+            with self._lock:
+                for requirement in missing:
+                    self._pending.pop(requirement, None)
+            done.set()
+        for event in waiting.values():
+            event.wait()
+        with self._lock:
+            # If a concurrent lookup failed, the package info is missing so look it up here
+            failed = {u for u in waiting if u not in self._package_infos}
+        if failed:
+            return self.get(requirements)
+        with self._lock:
+            return {copy.copy(self._package_infos[u]) for u in requirements}
+
+
+class DistributionIndex:
+    """Index of the installed distributions by name, from a single walk of ``importlib.metadata``.
+
+    This provides the same interface as [`PackageInfoLookup`][mkdocs_licenseinfo.get_licenses.PackageInfoLookup],
+    but only uses the installed metadata (packages that are not installed have an ``errorCode`` of 1).
+    """
+
+    def __init__(self, metadata_cache: MetadataCache | None = None):
+        """Initialise the index from the installed distributions.
+
+        Arguments:
+            metadata_cache: The (optional) cache of the metadata for each distribution.
+        """
+        self.metadata_cache = metadata_cache
+        self._distributions: dict[str, metadata.Distribution] = {}
+        self._versions: dict[str, str] = {}
+        for distribution in metadata.distributions():
+            package_metadata = distribution.metadata
+            name = package_metadata['Name']
+            if name:
+                # The first distribution on the path takes precedence (as for importlib.metadata.distribution)
+                key = _package_key(name)
+                if key not in self._distributions:
+                    self._distributions[key] = distribution
+                    self._versions[key] = package_metadata['Version']
+
+    def requires_dist(self, requirement: str) -> list[str]:
+        """Get the ``Requires-Dist`` for an installed requirement (ignoring any extra, e.g. ``FOO[BAR]``)."""
+        distribution = self._distributions.get(_package_key(requirement.split('[')[0]))
+        if distribution is None:
+            return []
+        return distribution.metadata.get_all('Requires-Dist') or []
+
+    def _get_package_info(self, requirement: str) -> PackageInfo:
+        distribution = self._distributions.get(_package_key(requirement))
+        if distribution is None:
+            return PackageInfo(name=requirement, errorCode=1)
+        # The metadata is an email.message.Message (PackageMetadata doesn't include get)
+        package_metadata: Any = distribution.metadata
+        package_license = packageinfo.licenseFromClassifierlist(package_metadata.get_all('Classifier') or [])
+        if package_license == UNKNOWN:
+            package_license = package_metadata.get('License', UNKNOWN)
+        files = distribution.files
+        return PackageInfo(
+            name=package_metadata.get('Name', UNKNOWN),
+            version=package_metadata.get('Version', UNKNOWN),
+            homePage=package_metadata.get('Home-page', UNKNOWN),
+            author=package_metadata.get('Author', UNKNOWN),
+            size=sum(u.size for u in files if u.size is not None) if files is not None else 0,
+            license=ucstr(package_license),
+        )
+
+    def get(self, requirements: set[ucstr]) -> set[PackageInfo]:
+        """Get the package information for the requirements (matching the licensecheck local lookup).
+
+        If the index has a [`MetadataCache`][mkdocs_licenseinfo.cache.MetadataCache], the metadata is read from
+        it for the distributions it has, and added to it for the others.
+        """
+        if self.metadata_cache is None:
+            return {self._get_package_info(u) for u in requirements}
+        return {
+            u for _, u in _cached_package_infos(self.metadata_cache, requirements, self._versions, self._get_package_info)
+        }
+
+
+class DependencyGraph:
+    """In-memory dependency graph for a project path.
+
+    The nodes are the packages (with their metadata looked up once using a shared
+    [`PackageInfoLookup`][mkdocs_licenseinfo.get_licenses.PackageInfoLookup], or a
+    [`DistributionIndex`][mkdocs_licenseinfo.get_licenses.DistributionIndex] for the ``importlib`` backend), and
+    the edges are the ``Requires-Dist`` requirements (with their extras and markers) which are also only read
+    once. Each ``using`` spec is then selected by traversing the graph from the project requirements.
+    """
+
+    def __init__(self, path: str | Path | None = None, backend: str | None = None, metadata_cache: MetadataCache | None = None):
+        """Initialise the graph.
+
+        Arguments:
+            path: The project directory (defaults to the working directory).
+            backend: The backend to look up the packages with.
+            metadata_cache: The (optional) cache of the metadata for each distribution, for the package lookups.
+        """
+        self.path = Path(path).resolve() if path else Path.cwd()
+        self.backend = backend or 'licensecheck'
+        if self.backend not in BACKENDS:
+            raise ValueError(f'Unknown backend: {backend}, expected one of {BACKENDS}')
+        self.pyproject = _read_pyproject(self.path)
+        self.lookup: PackageInfoLookup | DistributionIndex
+        if self.backend == 'importlib':
+            self.lookup = DistributionIndex(metadata_cache)
+            self._get_requires_dist = self.lookup.requires_dist
+        else:
+            self.lookup = PackageInfoLookup(metadata_cache)
+            self._get_requires_dist = _get_requires_dist
+        self._edges: dict[str, list[str]] = {}
+        self._lock = threading.Lock()
+
+    def requires_dist(self, requirement: str) -> list[str]:
+        """Get the ``Requires-Dist`` edges for a package (only read once)."""
+        with self._lock:
+            if requirement in self._edges:
+                return self._edges[requirement]
+        edges = self._get_requires_dist(requirement)
+        with self._lock:
+            return self._edges.setdefault(requirement, edges)
+
+    def select(self, using: str = 'PEP631', skip_packages: list[str] | None = None) -> set[str]:
+        """Select the requirements for a ``using`` spec by traversing the graph.
+
+        See [`get_requirements`][mkdocs_licenseinfo.get_licenses.get_requirements].
+        """
+        return get_requirements(using, skip_packages, self.path, self.pyproject, self.requires_dist)
+
+
+def resolve_package_licenses(
+    using: str | None = 'PEP631',
+    ignore_packages: list[str] | None = None,
+    fail_packages: list[str] | None = None,
+    skip_packages: list[str] | None = None,
+    ignore_licenses: list[str] | None = None,
+    fail_licenses: list[str] | None = None,
+    path: str | Path | None = None,
+    lookup: PackageInfoLookup | DistributionIndex | None = None,
+    backend: str | None = None,
+    graph: DependencyGraph | None = None
+) -> list[PackageLicense]:
+    """Get the licenses using the licensecheck library functions.
+
+    Unlike [`get_package_licenses`][mkdocs_licenseinfo.get_licenses.get_package_licenses] this does not change
+    the working directory, so it can be called concurrently. Options that are not
+    set are read from the ``[tool.licensecheck]`` table in the ``pyproject.toml`` (as the CLI does).
+
+    A shared [`PackageInfoLookup`][mkdocs_licenseinfo.get_licenses.PackageInfoLookup] can be provided so that
+    concurrent resolutions only look up each package once.
+
+    With the ``importlib`` ``backend``, the installed distributions are indexed once and used for both the
+    ``Requires-Dist`` of the requirements and the package metadata, so nothing is fetched from PyPI.
+
+    If a [`DependencyGraph`][mkdocs_licenseinfo.get_licenses.DependencyGraph] is provided, the requirements are
+    selected from it and it is used for the package lookups (its path and backend are used).
+
+    Returns:
+        The (sorted) package license records.
+    """
+    if graph is not None:
+        base_path, pyproject, lookup, backend = graph.path, graph.pyproject, graph.lookup, graph.backend
+    else:
+        base_path = Path(path).resolve() if path else Path.cwd()
+        pyproject = _read_pyproject(base_path)
+    tool_config = pyproject.get('tool', {}).get('licensecheck', {})
+
+    def _option(value: list[str] | None, key: str) -> list[ucstr]:
+        return [ucstr(u) for u in (tool_config.get(key, []) if value is None else value)]
+
+    def _package_names(value: list[str] | None, key: str) -> set[ucstr]:
+        return {_package_key(u) for u in (tool_config.get(key, []) if value is None else value)}
+
+    ignore_package_names = _package_names(ignore_packages, 'ignore_packages')
+    fail_package_names = _package_names(fail_packages, 'fail_packages')
+    skip_packages = _option(skip_packages, 'skip_dependencies')
+    ignore_licenses = _option(ignore_licenses, 'ignore_licenses')
+    fail_licenses = _option(fail_licenses, 'fail_licenses')
+    requires_dist = None
+    if (backend or 'licensecheck') == 'importlib':
+        if not isinstance(lookup, DistributionIndex):
+            lookup = DistributionIndex()
+        requires_dist = lookup.requires_dist
+    elif backend not in BACKENDS + [None]:
+        raise ValueError(f'Unknown backend: {backend}, expected one of {BACKENDS}')
+    logger.info(f'Resolving licenses for: {using} in path: {base_path} (backend: {backend or "licensecheck"})')
+    if graph is not None:
+        requirements = graph.select(using or 'PEP631', skip_packages)
+    else:
+        requirements = get_requirements(using or 'PEP631', skip_packages, base_path, pyproject, requires_dist)
+    project_license = license_matrix.licenseType(_get_project_license(base_path, pyproject))[0]
+    ignore_licenses_key = tuple(ignore_licenses)
+    ignore_licenses_type = list(_license_types(ucstr(JOINS.join(ignore_licenses)), ignore_licenses_key))
+    fail_licenses_type = list(_license_types(ucstr(JOINS.join(fail_licenses)), ignore_licenses_key))
+    if lookup is None:
+        package_infos = packageinfo.getPackages(requirements)
+    else:
+        package_infos = lookup.get(requirements)
+    for package_info in package_infos:
+        package_name = _package_key(package_info.name)
+        if package_name in ignore_package_names:
+            package_info.licenseCompat = True
+        elif package_name in fail_package_names:
+            package_info.licenseCompat = False
+        else:
+            package_info.licenseCompat = license_matrix.depCompatWMyLice(
+                project_license,
+                list(_license_types(package_info.license, ignore_licenses_key)),
+                ignore_licenses_type,
+                fail_licenses_type,
+            )
+    return [PackageLicense.from_package_info(u) for u in sorted(package_infos)]
+
+
+def resolve_licenses(
+    using: str | None = 'PEP631',
+    ignore_packages: list[str] | None = None,
+    fail_packages: list[str] | None = None,
+    skip_packages: list[str] | None = None,
+    ignore_licenses: list[str] | None = None,
+    fail_licenses: list[str] | None = None,
+    path: str | Path | None = None,
+    lookup: PackageInfoLookup | DistributionIndex | None = None,
+    backend: str | None = None,
+    graph: DependencyGraph | None = None
+) -> list[dict[str, Any]]:
+    """Get the licenses using the licensecheck library functions as dicts.
+
+    See [`resolve_package_licenses`][mkdocs_licenseinfo.get_licenses.resolve_package_licenses].
+    """
+    packages = resolve_package_licenses(
+        using,
+        ignore_packages,
+        fail_packages,
+        skip_packages,
+        ignore_licenses,
+        fail_licenses,
+        path=path,
+        lookup=lookup,
+        backend=backend,
+        graph=graph
+    )
+    return [u.as_dict() for u in packages]
@@ -0,0 +1,108 @@
+"""Sort and group the resolved packages.
+
+The packages can be ordered (``sort_by``) or grouped (``group_by``) on one of the ``ORDER_KEYS``:
+
+* ``name`` - the package name (sorted on its PEP 503 normalized form)
+* ``license`` - the package licenses (a package with several licenses is in a group for each of them)
+* ``author`` - the package author
+* ``license_family`` - the family of the package licenses (see
+  [`normalize_licenses`][mkdocs_licenseinfo.licenses.normalize_licenses])
+
+The order only depends on the keys (casefolded, with ties broken by the normalized package name), not on the order
+the packages were resolved in, so the output is the same across builds (and cached resolutions) for the same packages.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from mkdocs_licenseinfo.get_licenses import PackageLicense
+
+ORDER_KEYS = ('name', 'license', 'author', 'license_family')
+UNKNOWN = 'UNKNOWN'
+
+
+def _normalized_name(package: PackageLicense) -> str:
+    """Get the PEP 503 normalized name of a package."""
+    # get_licenses imports licensecheck, so it is only imported when the packages are sorted
+    from mkdocs_licenseinfo.get_licenses import normalize_package_name
+
+    return normalize_package_name(package.name)
+
+
+def _licenses(package: PackageLicense) -> list[str]:
+    return list(dict.fromkeys(u for u in package.licenses if u)) or [UNKNOWN]
+
+
+_KEYS: dict[str, Callable[[PackageLicense], list[str]]] = {
+    'name': lambda package: [package.name],
+    'license': _licenses,
+    'author': lambda package: [package.author or UNKNOWN],
+    'license_family': lambda package: [package.license_family],
+}
+
+
+def _get_key(order_key: str) -> Callable[[PackageLicense], list[str]]:
+    try:
+        return _KEYS[order_key]
+    except KeyError:
+        raise ValueError(f'Unknown order key: {order_key}, expected one of {ORDER_KEYS}') from None
+
+
+@dataclass
+class PackageGroup:
+    """A group of packages with the same value for the ``group_by`` key."""
+    name: str
+    """The key value for the group (e.g. the license name)."""
+    packages: list[PackageLicense] = field(default_factory=list)
+    """The packages in the group."""
+
+    def __len__(self) -> int:
+        """Get the number of packages in the group."""
+        return len(self.packages)
+
+
+def sort_packages(packages: Iterable[PackageLicense], sort_by: str | None = None) -> list[PackageLicense]:
+    """Sort the packages on a key.
+
+    Arguments:
+        packages: The package license records.
+        sort_by: The key to sort on (one of ``ORDER_KEYS``), or ``None`` to keep the order.
+
+    Returns:
+        The sorted packages.
+    """
+    if not sort_by:
+        return list(packages)
+    if sort_by == 'name':
+        return sorted(packages, key=_normalized_name)
+    key = _get_key(sort_by)
+    return sorted(packages, key=lambda u: ([v.casefold() for v in key(u)], _normalized_name(u)))
+
+
+def group_packages(
+        packages: Iterable[PackageLicense],
+        group_by: str,
+        sort_by: str | None = None
+) -> list[PackageGroup]:
+    """Group the packages on a key, in one pass over the packages.
+
+    Arguments:
+        packages: The package license records.
+        group_by: The key to group on (one of ``ORDER_KEYS``). For ``license``, a package with several licenses is
+            in each of their groups.
+        sort_by: The key to sort the packages in each group on, or ``None`` to keep their order.
+
+    Returns:
+        The groups, in (casefolded) name order.
+    """
+    key = _get_key(group_by)
+    index: dict[str, PackageGroup] = {}
+    for package in sort_packages(packages, sort_by):
+        for value in key(package):
+            group = index.get(value)
+            if group is None:
+                group = index[value] = PackageGroup(value)
+            group.packages.append(package)
+    return sorted(index.values(), key=lambda u: (u.name.casefold(), u.name))
@@ -0,0 +1,147 @@
+/* Sortable, filterable license tables for mkdocs_licenseinfo (render: table-json). */
+(function () {
+  'use strict';
+
+  var HEADINGS = {name: 'Package', version: 'Version', licenses: 'Licenses', author: 'Author'};
+
+  function text(value) {
+    if (Array.isArray(value)) {
+      return value.join(', ');
+    }
+    return value === null || value === undefined ? '' : String(value);
+  }
+
+  function element(tag, className, content) {
+    var node = document.createElement(tag);
+    if (className) {
+      node.className = className;
+    }
+    if (content !== undefined) {
+      node.textContent = content;
+    }
+    return node;
+  }
+
+  function render(container, data) {
+    var fields = data.fields;
+    var homePage = fields.indexOf('homePage');
+    var columns = Object.keys(HEADINGS).map(function (field) { return fields.indexOf(field); })
+      .filter(function (index) { return index >= 0; });
+    var rows = data.rows.map(function (row) {
+      return {row: row, search: row.map(text).join(' ').toLowerCase()};
+    });
+    var pageSize = parseInt(container.dataset.pageSize, 10) || 100;
+    // The rows are in the order they were written (e.g. sort_by) until a column is sorted
+    var state = {filter: '', sort: -1, descending: false, shown: pageSize};
+
+    var filter = element('input', 'licenseinfo-table-filter');
+    filter.type = 'search';
+    filter.placeholder = 'Filter ' + rows.length + ' packages';
+    var table = element('table', 'licenseinfo-table-rows');
+    var head = table.appendChild(element('thead')).appendChild(element('tr'));
+    var body = table.appendChild(element('tbody'));
+    var more = element('button', 'licenseinfo-table-more');
+    more.type = 'button';
+
+    columns.forEach(function (index) {
+      var th = head.appendChild(element('th', null, HEADINGS[fields[index]]));
+      th.style.cursor = 'pointer';
+      th.addEventListener('click', function () {
+        state.descending = state.sort === index ? !state.descending : false;
+        state.sort = index;
+        state.shown = pageSize;
+        update();
+      });
+    });
+
+    function selected() {
+      var matches = rows.filter(function (entry) { return entry.search.indexOf(state.filter) >= 0; });
+      if (state.sort < 0) {
+        return matches;
+      }
+      matches.sort(function (a, b) {
+        var order = text(a.row[state.sort]).localeCompare(text(b.row[state.sort]), undefined, {sensitivity: 'base'});
+        return state.descending ? -order : order;
+      });
+      return matches;
+    }
+
+    function cell(row, index) {
+      var td = element('td');
+      if (fields[index] === 'name' && homePage >= 0 && /^https?:\/\//.test(text(row[homePage]))) {
+        var link = td.appendChild(element('a', null, text(row[index])));
+        link.href = row[homePage];
+      } else {
+        td.textContent = text(row[index]);
+      }
+      return td;
+    }
+
+    function update() {
+      var matches = selected();
+      var fragment = document.createDocumentFragment();
+      matches.slice(0, state.shown).forEach(function (entry) {
+        var tr = fragment.appendChild(element('tr'));
+        columns.forEach(function (index) { tr.appendChild(cell(entry.row, index)); });
+      });
+      body.replaceChildren(fragment);
+      more.hidden = matches.length <= state.shown;
+      more.textContent = 'Show more (' + Math.max(matches.length - state.shown, 0) + ' remaining)';
+    }
+
+    filter.addEventListener('input', function () {
+      state.filter = filter.value.trim().toLowerCase();
+      state.shown = pageSize;
+      update();
+    });
+    more.addEventListener('click', function () {
+      state.shown += pageSize;
+      update();
+    });
+
+    container.replaceChildren(filter, table, more);
+    update();
+  }
+
+  function load(container) {
+    if (container.dataset.loaded) {
+      return;
+    }
+    container.dataset.loaded = 'true';
+    fetch(container.dataset.src)
+      .then(function (response) {
+        if (!response.ok) {
+          throw new Error(response.status + ' ' + response.statusText);
+        }
+        return response.json();
+      })
+      .then(function (data) { render(container, data); })
+      .catch(function (error) {
+        container.textContent = 'Unable to load the license table: ' + error.message;
+      });
+  }
+
+  function init() {
+    var containers = document.querySelectorAll('.licenseinfo-table[data-src]');
+    if (!('IntersectionObserver' in window)) {
+      containers.forEach(load);
+      return;
+    }
+    // Only fetch the rows for a table when it is (nearly) in view
+    var observer = new IntersectionObserver(function (entries) {
+      entries.forEach(function (entry) {
+        if (entry.isIntersecting) {
+          observer.unobserve(entry.target);
+          load(entry.target);
+        }
+      });
+    }, {rootMargin: '200px'});
+    containers.forEach(function (container) { observer.observe(container); });
+  }
+
+  if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', init);
+  } else {
+    init();
+  }
+})();
@@ -0,0 +1,226 @@
+"""Normalize and classify license names.
+
+The license names reported for packages are free text (e.g. ``MIT LICENSE``, ``BSD-3-CLAUSE`` or
+``GNU LESSER GENERAL PUBLIC LICENSE V3 (LGPLV3)``). [`spdx_id`][mkdocs_licenseinfo.licenses.spdx_id] maps them to
+[SPDX license identifiers](https://spdx.org/licenses/) with a lookup table (built once, from the identifiers and
+the common aliases and trove classifier names), and [`license_family`][mkdocs_licenseinfo.licenses.license_family]
+classifies them by the terms they contain into a family:
+
+* ``Public Domain`` - e.g. the Unlicense, CC0 or WTFPL
+* ``Permissive`` - e.g. MIT, BSD, ISC, Apache, PSF
+* ``Weak Copyleft`` - e.g. LGPL, MPL, EPL
+* ``Copyleft`` - e.g. GPL, AGPL, EUPL
+* ``Proprietary``
+* ``Unknown`` - anything else
+
+Both are memoized on the license name, so each distinct name is only looked up once however many packages (and
+builds, when serving) use it. Generic names that don't identify a license version (e.g. ``BSD LICENSE``) don't have
+an SPDX identifier, and are given as ``NOASSERTION``.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+import re
+from typing import Iterable, Iterator
+
+NOASSERTION = 'NOASSERTION'
+SPDX_IDS = (
+    '0BSD', 'AFL-3.0', 'AGPL-3.0-only', 'AGPL-3.0-or-later', 'Apache-1.1', 'Apache-2.0', 'BSD-2-Clause',
+    'BSD-3-Clause', 'BSL-1.0', 'CC0-1.0', 'EPL-1.0', 'EPL-2.0', 'EUPL-1.1', 'EUPL-1.2', 'GPL-2.0-only',
+    'GPL-2.0-or-later', 'GPL-3.0-only', 'GPL-3.0-or-later', 'HPND', 'ISC', 'LGPL-2.0-only', 'LGPL-2.0-or-later',
+    'LGPL-2.1-only', 'LGPL-2.1-or-later', 'LGPL-3.0-only', 'LGPL-3.0-or-later', 'MIT', 'MIT-0', 'MPL-1.1', 'MPL-2.0',
+    'NCSA', 'PSF-2.0', 'Python-2.0', 'Unlicense', 'UPL-1.0', 'WTFPL', 'X11', 'Zlib', 'ZPL-2.1',
+)
+# Other names for the identifiers (as normalized by _normalize)
+_SPDX_ALIASES = {
+    'MIT LICENSE': 'MIT',
+    'THE MIT LICENSE': 'MIT',
+    'MIT NO ATTRIBUTION': 'MIT-0',
+    'APACHE 2': 'Apache-2.0',
+    'APACHE 2.0': 'Apache-2.0',
+    'APACHE2': 'Apache-2.0',
+    'APACHE LICENSE 2.0': 'Apache-2.0',
+    'APACHE LICENSE VERSION 2.0': 'Apache-2.0',
+    'APACHE SOFTWARE LICENSE 2.0': 'Apache-2.0',
+    'ASL 2.0': 'Apache-2.0',
+    'NEW BSD': 'BSD-3-Clause',
+    'NEW BSD LICENSE': 'BSD-3-Clause',
+    'MODIFIED BSD': 'BSD-3-Clause',
+    'BSD 3 CLAUSE LICENSE': 'BSD-3-Clause',
+    'SIMPLIFIED BSD': 'BSD-2-Clause',
+    'BSD 2 CLAUSE LICENSE': 'BSD-2-Clause',
+    'ISC LICENSE': 'ISC',
+    'ISCL': 'ISC',
+    'PYTHON SOFTWARE FOUNDATION LICENSE': 'PSF-2.0',
+    'UNLICENSE': 'Unlicense',
+    'THE UNLICENSE': 'Unlicense',
+    'UPL': 'UPL-1.0',
+    'GPLV2': 'GPL-2.0-only',
+    'GPLV2+': 'GPL-2.0-or-later',
+    'GPLV3': 'GPL-3.0-only',
+    'GPLV3+': 'GPL-3.0-or-later',
+    'GPL 2.0': 'GPL-2.0-only',
+    'GPL 3.0': 'GPL-3.0-only',
+    'LGPLV2': 'LGPL-2.0-only',
+    'LGPLV2+': 'LGPL-2.0-or-later',
+    'LGPLV3': 'LGPL-3.0-only',
+    'LGPLV3+': 'LGPL-3.0-or-later',
+    'LGPL 2.1': 'LGPL-2.1-only',
+    'LGPL 3.0': 'LGPL-3.0-only',
+    'AGPLV3': 'AGPL-3.0-only',
+    'AGPLV3+': 'AGPL-3.0-or-later',
+    'MPL 2.0': 'MPL-2.0',
+    'MPL 1.1': 'MPL-1.1',
+    # Trove classifier names that don't include an abbreviation (or whose abbreviation isn't an identifier)
+    'APACHE SOFTWARE LICENSE': 'Apache-2.0',
+    'GNU AFFERO GENERAL PUBLIC LICENSE V3': 'AGPL-3.0-only',
+    'UNIVERSITY OF ILLINOIS NCSA OPEN SOURCE LICENSE': 'NCSA',
+    'ZLIB LIBPNG LICENSE': 'Zlib',
+}
+_NOT_NAME = re.compile(r'[^A-Z0-9.+]+')
+# The abbreviation in a trove classifier name, e.g. GNU LESSER GENERAL PUBLIC LICENSE V3 (LGPLV3)
+_ABBREVIATION = re.compile(r'^(?P<name>[^()]*?)\s*\((?P<abbreviation>[^()]+)\)')
+# Splits an SPDX expression into words and parentheses
+_EXPRESSION_TOKENS = re.compile(r'[()]|[^\s()]+')
+_EXPRESSION_OPERATORS = ('AND', 'OR', 'WITH')
+
+
+def _normalize(license: str) -> str:
+    return _NOT_NAME.sub(' ', license.upper()).strip()
+
+
+# The lookup table from the normalized names to the SPDX identifiers
+_SPDX_LOOKUP = {**{_normalize(u): u for u in SPDX_IDS}, **_SPDX_ALIASES}
+
+
+def _lookup(license: str) -> str | None:
+    spdx = _SPDX_LOOKUP.get(_normalize(license))
+    if spdx is None:
+        match = _ABBREVIATION.search(license.strip())
+        if match:
+            spdx = _SPDX_LOOKUP.get(_normalize(match['abbreviation'])) or _SPDX_LOOKUP.get(_normalize(match['name']))
+    return spdx
+
+
+def _iter_expression(expression: str) -> Iterator[tuple[str | None, str | None, str | None]]:
+    """Yield the (operator, parenthesis, operand) tokens of an SPDX expression."""
+    operand: list[str] = []
+    for token in _EXPRESSION_TOKENS.findall(expression):
+        if token in _EXPRESSION_OPERATORS or token in '()':
+            if operand:
+                yield None, None, ' '.join(operand)
+                operand = []
+            yield (token, None, None) if token in _EXPRESSION_OPERATORS else (None, token, None)
+        else:
+            operand.append(token)
+    if operand:
+        yield None, None, ' '.join(operand)
+
+
+@lru_cache(maxsize=None)
+def spdx_id(license: str | None) -> str:
+    """Get the SPDX identifier (or expression) for a license name.
+
+    Arguments:
+        license: The license name, which can also be an SPDX expression of identifiers joined with ``AND`` or
+            ``OR`` (e.g. ``MIT OR APACHE-2.0``).
+
+    Returns:
+        The SPDX identifier, or ``NOASSERTION`` if the name isn't known.
+    """
+    if not license:
+        return NOASSERTION
+    spdx = _lookup(license)
+    if spdx is not None:
+        return spdx
+    expression = []
+    for operator, parenthesis, operand in _iter_expression(license.strip().upper()):
+        if operand is not None:
+            operand = _lookup(operand)
+            if operand is None:
+                return NOASSERTION
+        expression.append(operand or parenthesis or f' {operator} ')
+    if len(expression) > 1:
+        return ''.join(expression)
+    return NOASSERTION
+
+
+LICENSE_FAMILIES = ('Public Domain', 'Permissive', 'Weak Copyleft', 'Copyleft', 'Proprietary', 'Unknown')
+UNKNOWN_FAMILY = 'Unknown'
+# The terms for each family, checked in order (so e.g. LGPL is matched before GPL)
+_FAMILY_TERMS = (
+    ('Public Domain', ('PUBLIC DOMAIN', 'UNLICENSE', 'CC0', 'WTFPL', '0BSD')),
+    ('Weak Copyleft', ('LGPL', 'LESSER GENERAL PUBLIC', 'LIBRARY GENERAL PUBLIC', 'MPL', 'MOZILLA', 'EPL', 'ECLIPSE')),
+    ('Copyleft', ('AGPL', 'AFFERO', 'GPL', 'GENERAL PUBLIC', 'EUPL')),
+    ('Permissive', (
+        'MIT', 'BSD', 'ISC', 'ISCL', 'APACHE', 'PSF', 'PYTHON SOFTWARE', 'BOOST', 'BSL', 'ZLIB', 'NCSA', 'AFL', 'HPND',
+        'UNIVERSAL PERMISSIVE', 'UPL', 'ZPL', 'ZOPE', 'X11', 'PYTHON'
+    )),
+    ('Proprietary', ('PROPRIETARY', 'COMMERCIAL', 'UNLICENSED')),
+)
+_WORD = re.compile(r'[A-Z0-9]+')
+# A version at the end of a word, e.g. GPLV3, BSD3
+_WORD_VERSION = re.compile(r'V?[0-9]+$')
+
+
+def _most_permissive(families: Iterable[str]) -> str:
+    """Get the most permissive of the (known) families, for a choice of licenses."""
+    families = set(families)
+    return next((u for u in LICENSE_FAMILIES if u in families), UNKNOWN_FAMILY)
+
+
+def _or_operands(license: str) -> list[str]:
+    """Split a license name on the ``OR`` operators that aren't in parentheses."""
+    operands: list[list[str]] = [[]]
+    depth = 0
+    for token in _EXPRESSION_TOKENS.findall(license.upper()):
+        depth += (token == '(') - (token == ')')
+        if token == 'OR' and not depth:
+            operands.append([])
+        else:
+            operands[-1].append(token)
+    return [' '.join(u) for u in operands if u]
+
+
+@lru_cache(maxsize=None)
+def license_family(license: str | None) -> str:
+    """Get the family of a license name.
+
+    A choice of licenses (joined with ``OR``) takes the most permissive of their families, as for the licenses of
+    a package in [`normalize_licenses`][mkdocs_licenseinfo.licenses.normalize_licenses].
+
+    Arguments:
+        license: The license name.
+
+    Returns:
+        The license family (one of ``LICENSE_FAMILIES``).
+    """
+    if not license:
+        return UNKNOWN_FAMILY
+    operands = _or_operands(license)
+    if len(operands) > 1:
+        return _most_permissive(license_family(u) for u in operands)
+    name = ' '.join(_WORD.findall(license.upper()))
+    words = set(name.split())
+    words.update(_WORD_VERSION.sub('', u) for u in list(words))
+    for family, terms in _FAMILY_TERMS:
+        for term in terms:
+            # Single word terms match whole words (with or without a version, e.g. GPLV3, BSD3), phrases match
+            # anywhere
+            if (' ' in term and term in name) or term in words:
+                return family
+    return UNKNOWN_FAMILY
+
+
+def normalize_licenses(licenses: tuple[str, ...]) -> tuple[tuple[str, ...], str]:
+    """Get the SPDX identifiers and family for the licenses of a package.
+
+    A package with several licenses (usually a choice of them) takes the most permissive of their (known) families.
+
+    Arguments:
+        licenses: The license names.
+
+    Returns:
+        The SPDX identifier for each license, and the family of the package.
+    """
+    return tuple(spdx_id(u) for u in licenses), _most_permissive(license_family(u) for u in licenses)
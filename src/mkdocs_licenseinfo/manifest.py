@@ -0,0 +1,173 @@
+"""Build-wide license manifest.
+
+The [`LicenseManifest`][mkdocs_licenseinfo.manifest.LicenseManifest] holds the licenses for the project's
+dependencies, resolved once per build by the plugin (when the ``manifest`` option is set), and writes them to the
+``site_dir`` as machine-readable files:
+
+* ``json`` - ``licenseinfo.json``, the package records as used by the templates
+* ``cyclonedx`` - ``licenseinfo.cdx.json``, a CycloneDX 1.5 JSON BOM
+* ``spdx`` - ``licenseinfo.spdx.json``, a minimal SPDX 2.3 JSON document (packages only)
+
+The licenses are given by their SPDX identifiers where they are known (see
+[`spdx_id`][mkdocs_licenseinfo.licenses.spdx_id]), and by name otherwise.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import json
+from pathlib import Path
+import re
+from typing import Any, Iterable, TYPE_CHECKING
+import uuid
+
+from mkdocs_licenseinfo import get_version
+from mkdocs_licenseinfo.licenses import NOASSERTION
+
+if TYPE_CHECKING:
+    from mkdocs_licenseinfo.get_licenses import PackageLicense
+
+MANIFEST_FORMATS = ('json', 'cyclonedx', 'spdx')
+MANIFEST_FILENAMES = {
+    'json': 'licenseinfo.json',
+    'cyclonedx': 'licenseinfo.cdx.json',
+    'spdx': 'licenseinfo.spdx.json',
+}
+_SPDX_ID_INVALID = re.compile(r'[^A-Za-z0-9.\-]+')
+_UNKNOWN = 'UNKNOWN'
+
+
+def _purl(package: PackageLicense) -> str:
+    """Get the package URL for a PyPI package."""
+    from mkdocs_licenseinfo.get_licenses import normalize_package_name
+
+    return f'pkg:pypi/{normalize_package_name(package.name)}@{package.version}'
+
+
+def _known(value: Any) -> bool:
+    return bool(value) and value != _UNKNOWN
+
+
+def _cyclonedx_licenses(package: PackageLicense) -> list[dict[str, Any]]:
+    if len(package.spdx) == 1 and ' ' in package.spdx[0]:
+        # An expression can't be combined with other licenses
+        return [{'expression': package.spdx[0]}]
+    return [
+        {'license': {'name': license} if spdx == NOASSERTION or ' ' in spdx else {'id': spdx}}
+        for license, spdx in zip(package.licenses, package.spdx) if _known(license)
+    ]
+
+
+class LicenseManifest:
+    """The resolved licenses for a build, with the JSON, CycloneDX and SPDX views."""
+
+    def __init__(self, packages: Iterable[PackageLicense], name: str = 'licenseinfo'):
+        """Initialise the manifest.
+
+        Arguments:
+            packages: The package license records.
+            name: The name of the documented project (e.g. the ``site_name``).
+        """
+        from mkdocs_licenseinfo.get_licenses import normalize_package_name
+
+        self.packages = sorted(packages, key=lambda u: normalize_package_name(u.name))
+        self.name = name
+        self.created = datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace('+00:00', 'Z')
+
+    def as_json(self) -> dict[str, Any]:
+        """Get the manifest as the package dicts."""
+        return {
+            'name': self.name,
+            'created': self.created,
+            'tool': {'name': 'mkdocs_licenseinfo', 'version': get_version()},
+            'packages': [u.as_dict() for u in self.packages],
+        }
+
+    def as_cyclonedx(self) -> dict[str, Any]:
+        """Get the manifest as a CycloneDX 1.5 JSON BOM."""
+        components = []
+        for package in self.packages:
+            component: dict[str, Any] = {
+                'type': 'library',
+                'bom-ref': package.namever,
+                'name': package.name,
+                'version': package.version,
+                'purl': _purl(package),
+                'licenses': _cyclonedx_licenses(package),
+            }
+            if _known(package.author):
+                component['author'] = package.author
+            if _known(package.homePage):
+                component['externalReferences'] = [{'type': 'website', 'url': package.homePage}]
+            components.append(component)
+        return {
+            'bomFormat': 'CycloneDX',
+            'specVersion': '1.5',
+            'serialNumber': f'urn:uuid:{uuid.uuid4()}',
+            'version': 1,
+            'metadata': {
+                'timestamp': self.created,
+                'tools': [{'name': 'mkdocs_licenseinfo', 'version': get_version()}],
+                'component': {'type': 'application', 'name': self.name},
+            },
+            'components': components,
+        }
+
+    def as_spdx(self) -> dict[str, Any]:
+        """Get the manifest as a minimal SPDX 2.3 JSON document.
+
+        The license names are given as the ``licenseComments``. The declared license is the SPDX identifier (or
+        expression) if the package has a single license with a known identifier, and ``NOASSERTION`` otherwise (as
+        several licenses may be a choice of them or all apply).
+        """
+        packages = []
+        for package in self.packages:
+            spdx_package: dict[str, Any] = {
+                'SPDXID': f'SPDXRef-Package-{_SPDX_ID_INVALID.sub("-", package.namever)}',
+                'name': package.name,
+                'versionInfo': package.version,
+                'downloadLocation': 'NOASSERTION',
+                'licenseConcluded': 'NOASSERTION',
+                'licenseDeclared': package.spdx[0] if len(package.spdx) == 1 else NOASSERTION,
+                'copyrightText': 'NOASSERTION',
+                'externalRefs': [
+                    {'referenceCategory': 'PACKAGE-MANAGER', 'referenceType': 'purl', 'referenceLocator': _purl(package)}
+                ],
+            }
+            licenses = [u for u in package.licenses if _known(u)]
+            if licenses:
+                spdx_package['licenseComments'] = ', '.join(licenses)
+            if _known(package.homePage):
+                spdx_package['homepage'] = package.homePage
+            if _known(package.author):
+                spdx_package['supplier'] = f'Person: {package.author}'
+            packages.append(spdx_package)
+        return {
+            'spdxVersion': 'SPDX-2.3',
+            'dataLicense': 'CC0-1.0',
+            'SPDXID': 'SPDXRef-DOCUMENT',
+            'name': self.name,
+            'documentNamespace': f'https://spdx.org/spdxdocs/{_SPDX_ID_INVALID.sub("-", self.name)}-{uuid.uuid4()}',
+            'creationInfo': {'created': self.created, 'creators': [f'Tool: mkdocs_licenseinfo-{get_version()}']},
+            'packages': packages,
+        }
+
+    def write(self, directory: str | Path, formats: Iterable[str] = MANIFEST_FORMATS) -> list[Path]:
+        """Write the manifest files to a directory.
+
+        Arguments:
+            directory: The directory to write to (e.g. the ``site_dir``).
+            formats: The formats to write (from ``json``, ``cyclonedx`` and ``spdx``).
+
+        Returns:
+            The paths of the written files.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for manifest_format in formats:
+            if manifest_format not in MANIFEST_FORMATS:
+                raise ValueError(f'Unknown manifest format: {manifest_format}, expected one of {MANIFEST_FORMATS}')
+            path = directory / MANIFEST_FILENAMES[manifest_format]
+            path.write_text(json.dumps(getattr(self, f'as_{manifest_format}')(), indent=2), encoding='utf-8')
+            paths.append(path)
+        return paths
@@ -0,0 +1,166 @@
+"""Paginated license pages.
+
+When the ``pages`` option is set, the plugin resolves the project's licenses once per build and adds a page for
+each group of packages (and an index page linking them) to the documentation files, so that each page only renders
+(and serves) part of a large dependency list:
+
+* ``letter`` - a page for each initial letter of the package names (and an ``Other`` page for names that don't start with a letter)
+* ``license`` - a page for each license (a package with several licenses is listed on each of their pages)
+* ``license_family`` - a page for each license family (see
+  [`normalize_licenses`][mkdocs_licenseinfo.licenses.normalize_licenses])
+* ``count`` - a page for each ``pages_size`` packages (in name order)
+
+The pages are generated in memory (with ``File.generated``) on mkdocs 1.6 and later, or written to a temporary
+directory for earlier versions.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+import re
+from typing import TYPE_CHECKING
+
+from mkdocs.structure.files import File
+
+from mkdocs_licenseinfo.licenses import LICENSE_FAMILIES
+
+if TYPE_CHECKING:
+    from mkdocs.config.defaults import MkDocsConfig
+
+    from mkdocs_licenseinfo.get_licenses import PackageLicense
+    from mkdocs_licenseinfo.profiler import Profiler
+
+PAGE_SPLITS = ('letter', 'license', 'license_family', 'count')
+_SLUG_INVALID = re.compile(r'[^a-z0-9]+')
+_OTHER = 'other'
+# The title of the page for the names that don't start with a letter
+_OTHER_TITLE = 'Other'
+
+
+def _slugify(value: str) -> str:
+    return _SLUG_INVALID.sub('-', value.lower()).strip('-') or _OTHER
+
+
+def _slug_pages(groups: dict[str, list[PackageLicense]]) -> dict[str, tuple[str, list[PackageLicense]]]:
+    """Get a unique slug for each page title (in order), adding a numeric suffix if the slugs collide."""
+    pages: dict[str, tuple[str, list[PackageLicense]]] = {}
+    # The index page is index.md
+    used = {'index'}
+    for page_title, page_packages in groups.items():
+        slug = base_slug = _slugify(page_title)
+        suffix = 1
+        while slug in used:
+            suffix += 1
+            slug = f'{base_slug}-{suffix}'
+        used.add(slug)
+        pages[slug] = (page_title, page_packages)
+    return pages
+
+
+def split_packages(
+        packages: list[PackageLicense],
+        split_by: str = 'letter',
+        page_size: int = 200
+) -> dict[str, tuple[str, list[PackageLicense]]]:
+    """Split the packages into pages.
+
+    Arguments:
+        packages: The package license records.
+        split_by: How to split the packages (``letter``, ``license``, ``license_family`` or ``count``).
+        page_size: The number of packages on each page (for ``count``).
+
+    Returns:
+        The title and packages (in name order) for each (unique) page slug, in page order.
+    """
+    packages = sorted(packages, key=lambda u: u.name.lower())
+    pages: dict[str, tuple[str, list[PackageLicense]]] = {}
+    groups: dict[str, list[PackageLicense]] = {}
+    if split_by == 'count':
+        page_size = max(page_size, 1)
+        for index, start in enumerate(range(0, len(packages), page_size)):
+            chunk = packages[start:start+page_size]
+            pages[f'page-{index+1}'] = (f'Packages {start+1}-{start+len(chunk)}', chunk)
+    elif split_by == 'letter':
+        for package in packages:
+            letter = package.name[:1].upper()
+            if not letter.isalpha():
+                letter = _OTHER_TITLE
+            groups.setdefault(letter, []).append(package)
+        # Non-alphabetic names after the letters
+        pages = _slug_pages(dict(sorted(groups.items(), key=lambda u: (u[0] == _OTHER_TITLE, u[0]))))
+    elif split_by == 'license':
+        for package in packages:
+            for license in dict.fromkeys([u for u in package.licenses if u] or ['UNKNOWN']):
+                groups.setdefault(license, []).append(package)
+        pages = _slug_pages(dict(sorted(groups.items(), key=lambda u: (u[0].lower(), u[0]))))
+    elif split_by == 'license_family':
+        for package in packages:
+            groups.setdefault(package.license_family, []).append(package)
+        # From the most to the least permissive
+        pages = _slug_pages(dict(sorted(groups.items(), key=lambda u: LICENSE_FAMILIES.index(u[0]))))
+    else:
+        raise ValueError(f'Unknown page split: {split_by}, expected one of {PAGE_SPLITS}')
+    return pages
+
+
+def render_pages(
+        packages: list[PackageLicense],
+        split_by: str = 'letter',
+        page_size: int = 200,
+        title: str = 'Licenses',
+        package_template: str | None = None,
+        profiler: Profiler | None = None,
+        sort_by: str | None = None
+) -> dict[str, str]:
+    """Render the markdown for the license pages and their index.
+
+    Arguments:
+        packages: The package license records.
+        split_by: How to split the packages (``letter``, ``license``, ``license_family`` or ``count``).
+        page_size: The number of packages on each page (for ``count``).
+        title: The title of the index page.
+        package_template: The Jinja2 template for each package (its headings are nested under the page title),
+            defaults to ``PACKAGE_TEMPLATE``.
+        profiler: The profiler to time the rendering with.
+        sort_by: The key to sort the packages on each page on (see
+            [`sort_packages`][mkdocs_licenseinfo.grouping.sort_packages]), otherwise they are in name order.
+
+    Returns:
+        The markdown for each page file name (including ``index.md``), with the index first.
+    """
+    from mkdocs_licenseinfo.grouping import sort_packages
+    from mkdocs_licenseinfo.render_markdown import iter_packages_as_markdown
+
+    pages = split_packages(packages, split_by, page_size)
+    index = [f'# {title}', '']
+    index.extend(
+        f'* [{page_title}]({slug}.md) ({len(page_packages)} package{"" if len(page_packages) == 1 else "s"})'
+        for slug, (page_title, page_packages) in pages.items()
+    )
+    rendered = {'index.md': '\n'.join(index) + '\n'}
+    for slug, (page_title, page_packages) in pages.items():
+        page_packages = sort_packages(page_packages, sort_by)
+        body = '\n\n'.join(iter_packages_as_markdown(page_packages, package_template, profiler=profiler, base_indent=1))
+        rendered[f'{slug}.md'] = f'# {page_title}\n\n{body}\n'
+    return rendered
+
+
+def generated_file(config: MkDocsConfig, src_uri: str, content: str, fallback_dir: str | Path | None = None) -> File:
+    """Create a documentation file for generated markdown.
+
+    Arguments:
+        config: The mkdocs config.
+        src_uri: The path of the file relative to the docs dir.
+        content: The markdown content.
+        fallback_dir: The directory to write the file to if ``File.generated`` is not available (mkdocs < 1.6).
+
+    Returns:
+        The file to add to the documentation files.
+    """
+    if hasattr(File, 'generated'):
+        return File.generated(config, src_uri, content=content)
+    if fallback_dir is None:
+        raise ValueError('A fallback_dir is needed to generate files with mkdocs < 1.6')
+    path = Path(fallback_dir) / src_uri
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding='utf-8')
+    return File(src_uri, str(fallback_dir), config.site_dir, config.use_directory_urls)
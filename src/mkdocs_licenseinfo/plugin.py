@@ -2,20 +2,44 @@
 
 It creates a Markdown extension ([`LicenseInfoExtension`][mkdocs_licenseinfo.extension.LicenseInfoExtension]),
 and adds it to `mkdocs` during the [`on_config` event hook](https://www.mkdocs.org/user-guide/plugins/#on_config).
+
+The plugin defines the [`on_startup` event hook](https://www.mkdocs.org/user-guide/plugins/#on_startup) so that
+it is kept across rebuilds when using `mkdocs serve`, allowing the resolved licenses to be reused until the
+requirement sources change.
 """
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from pathlib import Path
+import tempfile
+from typing import Any, Callable, Literal, Mapping, TYPE_CHECKING
 
 from mkdocs.config import Config
 from mkdocs.config import config_options as opt
 from mkdocs.plugins import BasePlugin
+from mkdocs.structure.files import File
 
-from mkdocs_licenseinfo.extension import LicenseInfoExtension
+from mkdocs_licenseinfo import logger
+from mkdocs_licenseinfo.cache import DEFAULT_CACHE_DIR, LicenseCache, MetadataCache
+from mkdocs_licenseinfo.extension import (
+    find_blocks,
+    get_block_options,
+    LICENSEINFO_MARKER,
+    LicenseInfoExtension,
+    RENDER_MODES
+)
+from mkdocs_licenseinfo.grouping import ORDER_KEYS
+from mkdocs_licenseinfo.manifest import LicenseManifest, MANIFEST_FORMATS
+from mkdocs_licenseinfo.pages import generated_file, PAGE_SPLITS, render_pages
+from mkdocs_licenseinfo.profiler import Profiler
+from mkdocs_licenseinfo.resolver import LicenseResolver
+from mkdocs_licenseinfo.table import LicenseTables
 
 if TYPE_CHECKING:
     from mkdocs.config.defaults import MkDocsConfig
+    from mkdocs.livereload import LiveReloadServer
+    from mkdocs.structure.files import Files
+    from mkdocs.structure.pages import Page
 
 
 class PluginConfig(Config):
@@ -36,15 +60,269 @@ class PluginConfig(Config):
     """Jinja2 template string to override the default."""
     enabled = opt.Type(bool, default=True)
     """Enable or disable the plugin."""
+    cache = opt.Type(bool, default=True)
+    """Cache the resolved licenses on disk between builds."""
+    cache_dir = opt.Optional(opt.Type(str))
+    """Path to the cache dir relative to the config file (defaults to .cache/mkdocs_licenseinfo)."""
+    cache_max_age = opt.Type(int, default=7)
+    """Maximum age of a cache entry in days."""
+    cache_max_entries = opt.Type(int, default=64)
+    """Maximum number of cache entries to keep."""
+    metadata_cache = opt.Type(bool, default=True)
+    """Cache the metadata for each installed distribution (by name==version) in a SQLite file shared between projects, for the resolutions that use the dependency graph (only used if cache is set, and the file is only created when one of these resolutions uses it)."""
+    metadata_cache_path = opt.Optional(opt.Type(str))
+    """Path to the metadata cache file relative to the config file (defaults to metadata.sqlite3 in the user cache dir)."""
+    metadata_cache_max_entries = opt.Type(int, default=10000)
+    """Maximum number of distributions to keep in the metadata cache."""
+    workers = opt.Type(int, default=1)
+    """Number of workers to resolve the licenses for all blocks before rendering (1 resolves each block as it renders)."""
+    worker_pool = opt.Choice(('process', 'thread'), default='process')
+    """The type of worker pool to use."""
+    backend = opt.Choice(('licensecheck', 'importlib'), default='licensecheck')
+    """Resolve the licenses with licensecheck, or only from the installed distributions with importlib.metadata."""
+    profile = opt.Type(bool, default=False)
+    """Time each stage of rendering the blocks and log a summary after the build."""
+    profile_report = opt.Optional(opt.Type(str))
+    """Path to write the profile as JSON to, relative to the config file (only used if profile is set)."""
+    manifest = opt.Type(bool, default=False)
+    """Resolve the project's licenses once per build, and write them as a manifest to the site dir."""
+    manifest_using = opt.Optional(opt.Type(str))
+    """The requirements to use for the manifest (defaults to PEP631)."""
+    manifest_formats = opt.ListOfItems(opt.Choice(MANIFEST_FORMATS), default=['json', 'cyclonedx'])
+    """The manifest formats to write."""
+    snapshot_path = opt.Optional(opt.Type(str))
+    """Path to a license snapshot to use instead of resolving the licenses, relative to docs dir."""
+    render = opt.Choice(RENDER_MODES, default='markdown')
+    """Render the package template as markdown, build the elements for the default template directly (tree), or load the packages into a table in the browser (table-json)."""
+    table_page_size = opt.Type(int, default=100)
+    """The number of rows to show at a time in the table-json tables."""
+    scan_pages = opt.Type(bool, default=True)
+    """Only add the block processor for pages whose markdown contains ::licenseinfo (disable if blocks are added to the markdown later, e.g. with snippets)."""
+    sort_by = opt.Optional(opt.Choice(ORDER_KEYS))
+    """Sort the packages on a key (name, license, author or license_family), otherwise they are in the order they are resolved in."""
+    group_by = opt.Optional(opt.Choice(ORDER_KEYS))
+    """Group the packages on a key (name, license, author or license_family), with a heading for each group."""
+    group_template = opt.Optional(opt.Type(str))
+    """Jinja2 template string for the group headings to override the default."""
+    pages = opt.Optional(opt.Choice(PAGE_SPLITS))
+    """Generate license pages for the project's packages, split by initial letter, license, license family, or count."""
+    pages_size = opt.Type(int, default=200)
+    """The number of packages on each page (when pages is count)."""
+    pages_dir = opt.Type(str, default='licenses')
+    """The docs path to generate the license pages under."""
+    pages_using = opt.Optional(opt.Type(str))
+    """The requirements to use for the license pages (defaults to PEP631)."""
+    pages_title = opt.Type(str, default='Licenses')
+    """The title of the license pages index."""
 
 
 class MkdocsLicenseInfoPlugin(BasePlugin[PluginConfig]):
     """`mkdocs` plugin to provide the licenseinfo."""
 
+    def __init__(self) -> None:
+        """Initialise the plugin and its license resolver."""
+        self._resolver = LicenseResolver()
+        self._profiler = Profiler(enabled=False)
+        self._profile_report: Path | None = None
+        self._manifest: LicenseManifest | None = None
+        self._tables = LicenseTables()
+        self._extension: LicenseInfoExtension | None = None
+        self._generated_dir: tempfile.TemporaryDirectory[str] | None = None
+        self._server: LiveReloadServer | None = None
+        self._watched: set[Path] = set()
+        self._unwatched_dirs: list[Path] = []
+
+    @property
+    def resolver(self) -> LicenseResolver:
+        """Get the license resolver, which is kept across rebuilds when serving."""
+        return self._resolver
+
+    def on_startup(self, *, command: Literal['build', 'gh-deploy', 'serve'], dirty: bool) -> None:  # noqa: U100
+        """Keep the plugin (and resolved licenses) across rebuilds when serving."""
+
     def on_config(self, config: MkDocsConfig) -> MkDocsConfig | None:
         """Initialises the extension if the plugin is enabled."""
         self.config.docs_dir = config.docs_dir
+        # The docs dir and config file are already watched when serving
+        self._unwatched_dirs = [Path(config.docs_dir).resolve()]
+        if config.config_file_path:
+            self._unwatched_dirs.append(Path(config.config_file_path).resolve())
+        self._profiler.enabled = self.config.enabled and self.config.profile
+        self._extension = None
         if self.config.enabled:
-            licenseinfo_extension = LicenseInfoExtension(self.config)
+            config_dir = Path(config.config_file_path).parent if config.config_file_path else Path.cwd()
+            cache = None
+            if self.config.cache:
+                cache = LicenseCache(
+                    config_dir / (self.config.cache_dir or DEFAULT_CACHE_DIR),
+                    max_age=self.config.cache_max_age,
+                    max_entries=self.config.cache_max_entries
+                )
+            self._resolver.cache = cache
+            if self._resolver.metadata_cache is not None:
+                self._resolver.metadata_cache.close()
+            metadata_cache = None
+            if self.config.cache and self.config.metadata_cache:
+                metadata_cache = MetadataCache(
+                    config_dir / self.config.metadata_cache_path if self.config.metadata_cache_path else None,
+                    max_entries=self.config.metadata_cache_max_entries
+                )
+            self._resolver.metadata_cache = metadata_cache
+            # Blocks are resolved from the same dependency graph (and package lookups) as the manifest, and the
+            # graph is used with thread workers, as the licensecheck CLI can only run in one thread at a time
+            self._resolver.use_graph = self.config.manifest or (self.config.workers > 1 and self.config.worker_pool == 'thread')
+            self._profile_report = config_dir / self.config.profile_report if self.config.profile_report else None
+            self._tables.page_size = self.config.table_page_size
+            licenseinfo_extension = LicenseInfoExtension(
+                self.config, resolver=self._resolver, profiler=self._profiler, tables=self._tables
+            )
+            self._extension = licenseinfo_extension
+            # Make sure we don't have a stale extension from a previous build
+            config.markdown_extensions[:] = [
+                u for u in config.markdown_extensions if not isinstance(u, LicenseInfoExtension)
+            ]
             config.markdown_extensions.append(licenseinfo_extension)  # type: ignore[arg-type]
         return config
+
+    def on_pre_build(self, config: MkDocsConfig) -> None:  # noqa: U100
+        """Clear the resolved licenses, tables and profile from any previous build."""
+        self._resolver.clear()
+        self._profiler.clear()
+        self._tables.clear()
+        self._manifest = None
+
+    def on_files(self, files: Files, config: MkDocsConfig) -> Files | None:
+        """Resolve the licenses for the manifest and license pages, and for all the blocks in the documentation pages concurrently."""
+        if self.config.enabled and self.config.manifest:
+            spec = get_project_resolution_spec(self.config, self.config.manifest_using)
+            with self._profiler.stage('manifest'):
+                self._manifest = LicenseManifest(self._resolver.get_package_licenses(**spec), name=config.site_name)
+        if self.config.enabled and self.config.pages:
+            self._add_pages(files, config, self.config.pages)
+        if self.config.enabled and self.config.workers > 1:
+            specs = get_docs_resolution_specs(files, self.config)
+            with self._profiler.stage('prefetch'):
+                self._resolver.prefetch(specs, workers=self.config.workers, pool=self.config.worker_pool)
+        return files
+
+    def _add_pages(self, files: Files, config: MkDocsConfig, split_by: str) -> None:
+        """Resolve the project's licenses once, and add the license pages for them to the files."""
+        spec = get_project_resolution_spec(self.config, self.config.pages_using)
+        with self._profiler.stage('pages'):
+            packages = self._resolver.get_package_licenses(**spec)
+        pages = render_pages(
+            packages,
+            split_by=split_by,
+            page_size=self.config.pages_size,
+            title=self.config.pages_title,
+            package_template=self.config.package_template,
+            profiler=self._profiler,
+            sort_by=self.config.sort_by
+        )
+        if self._generated_dir is None and not hasattr(File, 'generated'):
+            # mkdocs < 1.6 can only add files from disk
+            self._generated_dir = tempfile.TemporaryDirectory(prefix='mkdocs_licenseinfo')
+        fallback_dir = self._generated_dir.name if self._generated_dir is not None else None
+        pages_dir = self.config.pages_dir.strip('/')
+        for name, markdown in pages.items():
+            src_uri = f'{pages_dir}/{name}' if pages_dir else name
+            if files.get_file_from_path(src_uri) is not None:
+                logger.warning(f'Not generating license page: {src_uri} as it is already in the docs')
+                continue
+            files.append(generated_file(config, src_uri, markdown, fallback_dir))
+        logger.debug(f'Generated {len(pages)} license pages in: {pages_dir or "."}')
+
+    def on_page_markdown(
+        self,
+        markdown: str,
+        page: Page,
+        config: MkDocsConfig,  # noqa: U100
+        files: Files,  # noqa: U100
+    ) -> str | None:
+        """Only process blocks on pages that have them, and attribute the profile and table links to the page."""
+        if self._extension is not None and self.config.scan_pages:
+            self._extension.active = LICENSEINFO_MARKER in markdown
+        self._profiler.page = page.file.src_uri
+        self._tables.page_url = page.url
+        return markdown
+
+    def on_post_build(self, config: MkDocsConfig) -> None:
+        """Write the manifest and tables, and log the license resolution memo statistics (and profile summary if profiling)."""
+        if self._manifest is not None:
+            for path in self._manifest.write(config.site_dir, self.config.manifest_formats):
+                logger.info(f'License manifest written to: {path}')
+        if len(self._tables):
+            self._tables.write(config.site_dir)
+            logger.debug(f'{len(self._tables)} license tables written to: {config.site_dir}')
+        logger.debug(f'License resolution memo: {self._resolver.hits} hits, {self._resolver.misses} misses')
+        if self._profiler.enabled:
+            logger.info(f'Build profile:\n{self._profiler.summary()}')
+            if self._profile_report is not None:
+                self._profiler.write(self._profile_report)
+                logger.info(f'Build profile written to: {self._profile_report}')
+        self._watch_requirement_sources()
+
+    def on_serve(
+        self,
+        server: LiveReloadServer,
+        config: MkDocsConfig,  # noqa: U100
+        builder: Callable[..., Any],  # noqa: U100
+    ) -> LiveReloadServer | None:
+        """Watch the requirement sources so that changing the dependencies triggers a rebuild."""
+        self._server = server
+        self._watch_requirement_sources()
+        return server
+
+    def _watch_requirement_sources(self) -> None:
+        """Add any newly used requirement sources to the live-reload server."""
+        if self._server is None:
+            return
+        for source in sorted(self._resolver.requirement_sources - self._watched):
+            self._watched.add(source)
+            if any(source == u or u in source.parents for u in self._unwatched_dirs):
+                continue
+            logger.debug(f'Watching requirement source: {source}')
+            self._server.watch(str(source), recursive=False)
+
+
+def _get_resolution_specs(options: dict[str, Any]) -> list[dict[str, Any]]:
+    """Get the license resolutions needed to render a block from its options."""
+    spec = {
+        'ignore_packages': options['ignore_packages'],
+        'fail_packages': options['fail_packages'],
+        'skip_packages': options['skip_packages'],
+        'ignore_licenses': options['ignore_licenses'],
+        'fail_licenses': options['fail_licenses'],
+        'path': options['path'],
+        'backend': options['backend'],
+    }
+    if 'snapshot_path' in options:
+        spec['snapshot_path'] = options['snapshot_path']
+    specs = [{**spec, 'using': options['using']}]
+    diff = options['diff']
+    for diff_using in [diff] if isinstance(diff, str) else diff or []:
+        specs.append({**spec, 'using': diff_using})
+    return specs
+
+
+def get_project_resolution_spec(config: Mapping[str, Any], using: str | None = None) -> dict[str, Any]:
+    """Get the license resolution for the project (e.g. for the manifest or license pages) with the global config."""
+    spec = _get_resolution_specs(get_block_options('', config))[0]
+    spec['using'] = using
+    return spec
+
+
+def get_docs_resolution_specs(files: Files, config: Mapping[str, Any]) -> list[dict[str, Any]]:
+    """Get the license resolutions needed to render all the blocks in the documentation pages."""
+    specs = []
+    for file in files.documentation_pages():
+        if file.abs_src_path is None:
+            continue
+        for yaml_block, heading_level in find_blocks(Path(file.abs_src_path).read_text(encoding='utf-8-sig')):
+            try:
+                options = get_block_options(yaml_block, config, heading_level)
+            except Exception as error:
+                logger.debug(f'Unable to parse licenseinfo block in {file.src_uri}: {error}')
+                continue
+            specs.extend(_get_resolution_specs(options))
+    return specs
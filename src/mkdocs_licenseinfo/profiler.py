@@ -0,0 +1,167 @@
+"""Per-stage build time profiling.
+
+The [`Profiler`][mkdocs_licenseinfo.profiler.Profiler] is owned by the plugin (when the ``profile`` option is set)
+and times each stage of rendering a ``::licenseinfo`` block, aggregated per page and across the build:
+
+* ``manifest`` - resolving the licenses for the build manifest (when using ``manifest``)
+* ``pages`` - resolving the licenses for the generated license pages (when using ``pages``)
+* ``prefetch`` - resolving the licenses for all blocks up front (when using ``workers``)
+* ``parse`` - parsing the YAML block options
+* ``resolve`` - resolving the licenses (including the ``diff`` licenses)
+* ``diff`` - removing the ``diff`` packages
+* ``render`` - rendering the Jinja2 template (for each chunk of packages)
+
+Each block is also recorded on its own (with its page and ``using`` spec, and the time for each of its stages), so
+a slow block can be found on a page with several.
+
+When profiling is disabled, [`Profiler.stage`][mkdocs_licenseinfo.profiler.Profiler.stage] returns a shared no-op
+context manager, so the overhead is a single attribute check per stage.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager, nullcontext
+import json
+from pathlib import Path
+import threading
+import time
+from typing import Any, ContextManager, Iterator
+
+STAGES = ('manifest', 'pages', 'prefetch', 'parse', 'resolve', 'diff', 'render')
+# The number of blocks (slowest first) in the summary
+SUMMARY_BLOCKS = 5
+_NULL_CONTEXT = nullcontext()
+
+
+class Profiler:
+    """Time the stages of rendering the licenseinfo blocks for a build."""
+
+    def __init__(self, enabled: bool = True):
+        """Initialise the profiler.
+
+        Arguments:
+            enabled: Record the stage timings.
+        """
+        self.enabled = enabled
+        self.page: str | None = None
+        self._timings: dict[str, dict[str, list[float]]] = {}
+        self._blocks: dict[str, int] = {}
+        # The timings for each block, in the order they were rendered (the last is the current block)
+        self._block_timings: list[dict[str, Any]] = []
+        # The primary and diff licenses for a block are resolved concurrently
+        self._lock = threading.Lock()
+
+    def stage(self, name: str) -> ContextManager[None]:
+        """Time a stage for the current page (a no-op if the profiler is disabled)."""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._time(name, self.page)
+
+    @contextmanager
+    def _time(self, name: str, page: str | None) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, page)
+
+    def record(self, name: str, duration: float, page: str | None = None) -> None:
+        """Record the duration (in seconds) of a stage for a page (and the current block, if it is on the page)."""
+        with self._lock:
+            self._timings.setdefault(page or '', {}).setdefault(name, []).append(duration)
+            if self._block_timings and self._block_timings[-1]['page'] == (page or ''):
+                stages = self._block_timings[-1]['stages']
+                stages[name] = stages.get(name, 0) + duration
+
+    def block(self, using: str | None = None) -> None:
+        """Count a block rendered on the current page, and record its stages until the next block starts."""
+        if self.enabled:
+            with self._lock:
+                self._blocks[self.page or ''] = self._blocks.get(self.page or '', 0) + 1
+                self._block_timings.append({'page': self.page or '', 'using': using, 'stages': {}})
+
+    def label_block(self, using: str | None) -> None:
+        """Set the ``using`` spec of the current block (once its options have been parsed)."""
+        if self.enabled and self._block_timings:
+            with self._lock:
+                self._block_timings[-1]['using'] = using
+
+    def clear(self) -> None:
+        """Clear the timings for a new build."""
+        with self._lock:
+            self._timings.clear()
+            self._blocks.clear()
+            self._block_timings.clear()
+        self.page = None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Get the timings aggregated per stage and per page.
+
+        Returns:
+            A dictionary with the ``stages`` (``count``, ``total``, ``mean`` and ``max`` seconds for each stage
+                across the build), the ``pages`` (the number of ``blocks`` and the ``total`` seconds for each
+                stage) and the ``blocks`` (the ``page``, ``using``, ``total`` seconds and seconds for each stage of
+                each block, in the order they were rendered).
+        """
+        with self._lock:
+            timings = {page: {name: list(durations) for name, durations in stages.items()} for page, stages in self._timings.items()}
+            blocks = dict(self._blocks)
+            block_timings = [{**u, 'stages': dict(u['stages'])} for u in self._block_timings]
+        stages: dict[str, list[float]] = {}
+        for page_timings in timings.values():
+            for name, durations in page_timings.items():
+                stages.setdefault(name, []).extend(durations)
+        return {
+            'stages': {
+                name: {
+                    'count': len(stages[name]),
+                    'total': sum(stages[name]),
+                    'mean': sum(stages[name])/len(stages[name]),
+                    'max': max(stages[name])
+                }
+                for name in _ordered(stages)
+            },
+            'pages': {
+                page: {
+                    'blocks': blocks.get(page, 0),
+                    'stages': {name: sum(timings[page][name]) for name in _ordered(timings[page])}
+                }
+                for page in sorted(timings)
+            },
+            'blocks': [
+                {
+                    'page': block['page'],
+                    'using': block['using'],
+                    'total': sum(block['stages'].values()),
+                    'stages': {name: block['stages'][name] for name in _ordered(block['stages'])}
+                }
+                for block in block_timings
+            ]
+        }
+
+    def summary(self) -> str:
+        """Get a summary table of the stage timings across the build."""
+        profile = self.as_dict()
+        lines = [f'{"Stage":<10} {"Count":>6} {"Total (s)":>10} {"Mean (ms)":>10} {"Max (ms)":>10}']
+        for name, stage in profile['stages'].items():
+            lines.append(f'{name:<10} {stage["count"]:>6} {stage["total"]:>10.4f} {stage["mean"]*1000:>10.2f} {stage["max"]*1000:>10.2f}')
+        blocks = sum(u['blocks'] for u in profile['pages'].values())
+        lines.append(f'{blocks} blocks on {len([u for u in profile["pages"].values() if u["blocks"]])} pages')
+        slowest = sorted(profile['blocks'], key=lambda u: u['total'], reverse=True)[:SUMMARY_BLOCKS]
+        if slowest:
+            lines.append('Slowest blocks:')
+            lines.extend(f'  {u["page"]} ({u["using"] or "PEP631"}): {u["total"]:.4f}s' for u in slowest)
+        return '\n'.join(lines)
+
+    def write(self, path: str | Path) -> None:
+        """Write the aggregated timings to a JSON file."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.as_dict(), indent=2), encoding='utf-8')
+
+
+def _ordered(names: Any) -> list[str]:
+    """Order the stage names by the order in the build, with any others after."""
+    return sorted(names, key=lambda u: (STAGES.index(u) if u in STAGES else len(STAGES), u))
+
+
+NULL_PROFILER = Profiler(enabled=False)
@@ -1,22 +1,53 @@
 """Get licenses and convert to markdown."""
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 import json
 import os
 from pathlib import Path
 import sys
+from typing import Any, Callable, Iterator, TYPE_CHECKING
+from xml.etree.ElementTree import Element, SubElement  # nosec: B405
 
 if sys.version_info.major >= 3 and sys.version_info.minor >= 10:
     from importlib.metadata import entry_points
 else:
     from backports.entry_points_selectable import entry_points
 
-from jinja2 import Environment
+from jinja2 import Environment, Template
+from markdown.util import AtomicString
 
 from mkdocs_licenseinfo import logger
-from mkdocs_licenseinfo.get_licenses import get_licenses
+from mkdocs_licenseinfo.get_licenses import (
+    DistributionIndex,
+    get_package_licenses,
+    PackageInfoLookup,
+    PackageLicense,
+    select_packages
+)
+from mkdocs_licenseinfo.grouping import group_packages, sort_packages
+from mkdocs_licenseinfo.profiler import NULL_PROFILER
+from mkdocs_licenseinfo.snapshot import resolve_with_snapshot
+
+if TYPE_CHECKING:
+    from mkdocs_licenseinfo.profiler import Profiler
+    from mkdocs_licenseinfo.resolver import LicenseResolver
+    from mkdocs_licenseinfo.table import LicenseTables
 
 PACKAGE_TEMPLATE = "# [{{package.name}}]({{package.homePage}})\n{% for license in package.licenses %}``{{license}}`` {% endfor %} \n*Version Checked: {{package.version}}*  \nAuthor: {{package.author}}"
+# The heading for each group of packages (with group_by)
+GROUP_TEMPLATE = "# {{group.name}}"
+# Renders all the packages in one pass, with the package template inserted in the loop
+LIST_TEMPLATE = "{{% for package in packages %}}{{% if not loop.first %}}{{{{separator}}}}{{% endif %}}{package_template}{{% endfor %}}"
+TEMPLATE_CACHE_SIZE = 128
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _compile_template(environment: Environment, source: str) -> Template:
+    """Compile a template, cached on the template source and environment identity."""
+    logger.debug('Compiling template')
+    return environment.from_string(source)
 
 
 class _EnvironmentFactory():
@@ -56,6 +87,20 @@ class _EnvironmentFactory():
         for ep in entry_points().select(group='mkdocs_licenseinfo.jinja_environment_factory', name=selected_method):
             return ep.load()()
 
+    def get_template(self, source: str) -> Template:
+        """Get the compiled template for the source (each distinct template is only compiled once)."""
+        return _compile_template(self.environment, source)
+
+    def get_list_template(self, package_template: str) -> Template:
+        """Get the compiled template to render a list of packages with the package template.
+
+        The template is rendered with ``packages`` and the ``separator`` to put between each package.
+        """
+        if not self.environment.keep_trailing_newline and package_template.endswith('\n'):
+            # Match rendering the package template on its own, which removes a single trailing newline
+            package_template = package_template[:-1]
+        return self.get_template(LIST_TEMPLATE.format(package_template=package_template))
+
     @staticmethod
     def default_environment():
         """Get the default environment object."""
@@ -65,6 +110,65 @@ class _EnvironmentFactory():
 JINJA_ENVIRONMENT_FACTORY = _EnvironmentFactory()
 
 
+def _select_packages(
+        using: str | None = 'PEP631',
+        *,
+        ignore_packages: list[str] | None = None,
+        fail_packages: list[str] | None = None,
+        skip_packages: list[str] | None = None,
+        ignore_licenses: list[str] | None = None,
+        fail_licenses: list[str] | None = None,
+        diff: str | list[str] | None = None,
+        path: str | Path | None = None,
+        resolver: LicenseResolver | None = None,
+        backend: str | None = None,
+        profiler: Profiler | None = None,
+        snapshot_path: str | Path | None = None,
+        sort_by: str | None = None
+) -> list[PackageLicense]:
+    """Get the packages for ``using`` that are not in any of the ``diff`` specs (sorted on ``sort_by`` if set)."""
+    profiler = profiler or NULL_PROFILER
+    resolve: Callable[..., list[PackageLicense]]
+    if resolver is not None:
+        resolve = partial(resolver.get_package_licenses, snapshot_path=snapshot_path)
+    elif snapshot_path:
+        resolve = partial(resolve_with_snapshot, snapshot_path)
+    else:
+        resolve = get_package_licenses
+    diffs = [diff] if isinstance(diff, str) else list(diff or [])
+    diff_packages: list[list[PackageLicense]] = []
+    if diffs:
+        logger.debug('Getting licenses and diff licenses')
+        lookup_kwargs: dict[str, Any] = {}
+        if resolver is None:
+            # The resolver shares the dependency graph (or the cached results) between the specs instead
+            lookup_kwargs['lookup'] = DistributionIndex() if backend == 'importlib' else PackageInfoLookup()
+
+        def resolve_spec(spec: str | None) -> list[PackageLicense]:
+            return resolve(
+                spec, ignore_packages, fail_packages, skip_packages, ignore_licenses, fail_licenses,
+                path=path, backend=backend, **lookup_kwargs
+            )
+
+        with profiler.stage('resolve'), ThreadPoolExecutor(max_workers=1+len(diffs)) as executor:
+            futures = [executor.submit(resolve_spec, spec) for spec in [using, *diffs]]
+            packages = futures[0].result()
+            diff_packages = [u.result() for u in futures[1:]]
+        logger.info(f'Found {len(packages)} packages')
+        logger.info(f'Found {sum(len(u) for u in diff_packages)} diff packages')
+    else:
+        logger.debug('Getting licenses')
+        with profiler.stage('resolve'):
+            packages = resolve(
+                using, ignore_packages, fail_packages, skip_packages, ignore_licenses, fail_licenses, path=path, backend=backend
+            )
+        logger.info(f'Found {len(packages)} packages')
+    with profiler.stage('diff'):
+        selected_packages = sort_packages(select_packages(packages, diff_packages), sort_by)
+    logger.info(f'Processing remaining {len(selected_packages)} packages')
+    return selected_packages
+
+
 def get_licenses_as_markdown(
         using='PEP631',
         ignore_packages: list[str] | None = None,
@@ -72,25 +176,286 @@ def get_licenses_as_markdown(
         skip_packages: list[str] | None = None,
         ignore_licenses: list[str] | None = None,
         fail_licenses: list[str] | None = None,
-        diff: str | None = None,
+        diff: str | list[str] | None = None,
         package_template: str | None = PACKAGE_TEMPLATE,
-        path: str | Path | None = None
+        path: str | Path | None = None,
+        resolver: LicenseResolver | None = None,
+        backend: str | None = None,
+        profiler: Profiler | None = None,
+        snapshot_path: str | Path | None = None,
+        sort_by: str | None = None
 ):
-    """Get the licenses and render them as markdown strings."""
-    jinja_environment = JINJA_ENVIRONMENT_FACTORY.environment
-    logger.debug('Getting licenses')
-    packages = get_licenses(using, ignore_packages, fail_packages, skip_packages, ignore_licenses, fail_licenses, path=path)
-    logger.info(f'Found {len(packages)} packages')
-
-    diff_packages = []
-    if diff:
-        logger.debug('Getting diff licenses')
-        diff_packages = get_licenses(diff, ignore_packages, fail_packages, skip_packages, ignore_licenses, fail_licenses, path=path)
-        logger.info(f'Found {len(diff_packages)} diff packages')
-    selected_package_names = list({u['name'] for u in packages} - {u['name'] for u in diff_packages})
-    selected_packages = [u for u in packages if u['name'] in selected_package_names]
-    logger.info(f'Processing remaining {len(selected_packages)} packages')
+    """Get the licenses and render them as markdown strings.
+
+    The licenses are resolved using the [`LicenseResolver`][mkdocs_licenseinfo.resolver.LicenseResolver] if
+    provided, otherwise [`get_package_licenses`][mkdocs_licenseinfo.get_licenses.get_package_licenses] is called
+    directly.
+
+    If ``diff`` is set (a ``using`` spec, or a list of them), the primary and diff licenses are resolved
+    concurrently. Without a resolver they share a
+    [`PackageInfoLookup`][mkdocs_licenseinfo.get_licenses.PackageInfoLookup] (or a
+    [`DistributionIndex`][mkdocs_licenseinfo.get_licenses.DistributionIndex] for the ``importlib`` ``backend``) so
+    the packages in all of them are only looked up once, otherwise each spec is resolved (or reused) by the
+    resolver as for any other block. The packages in any of the diffs are then removed with
+    [`select_packages`][mkdocs_licenseinfo.get_licenses.select_packages].
+
+    Each package is rendered with the same compiled template (cached on the
+    [`_EnvironmentFactory`][mkdocs_licenseinfo.render_markdown._EnvironmentFactory]).
+
+    If a ``snapshot_path`` is provided, the licenses are read from the snapshot (see
+    [`mkdocs_licenseinfo.snapshot`][mkdocs_licenseinfo.snapshot]) if it matches the current requirements.
+
+    If ``sort_by`` is set, the packages are sorted on that key (see
+    [`sort_packages`][mkdocs_licenseinfo.grouping.sort_packages]), otherwise they are in the order they were resolved.
+
+    If a [`Profiler`][mkdocs_licenseinfo.profiler.Profiler] is provided, the ``resolve``, ``diff`` and ``render``
+    stages are timed.
+    """
+    selected_packages = _select_packages(
+        using,
+        ignore_packages=ignore_packages,
+        fail_packages=fail_packages,
+        skip_packages=skip_packages,
+        ignore_licenses=ignore_licenses,
+        fail_licenses=fail_licenses,
+        diff=diff,
+        path=path,
+        resolver=resolver,
+        backend=backend,
+        profiler=profiler,
+        snapshot_path=snapshot_path,
+        sort_by=sort_by
+    )
     if package_template is None:
         package_template = PACKAGE_TEMPLATE
     logger.debug('Rendering licenses')
-    return [jinja_environment.from_string(package_template).render(package=package) for package in selected_packages]
+    with (profiler or NULL_PROFILER).stage('render'):
+        template = JINJA_ENVIRONMENT_FACTORY.get_template(package_template)
+        return [template.render(package=package) for package in selected_packages]
+
+
+def _offset_headings(package_template: str, base_indent: int = 0) -> str:
+    """Increase the level of the headings in the template by the base indent."""
+    if base_indent > 0:
+        return package_template.replace('# ', ('#'*base_indent)+'# ')
+    return package_template
+
+
+def iter_licenses_as_markdown(
+        using: str | None = 'PEP631',
+        ignore_packages: list[str] | None = None,
+        fail_packages: list[str] | None = None,
+        skip_packages: list[str] | None = None,
+        ignore_licenses: list[str] | None = None,
+        fail_licenses: list[str] | None = None,
+        diff: str | list[str] | None = None,
+        package_template: str | None = PACKAGE_TEMPLATE,
+        path: str | Path | None = None,
+        resolver: LicenseResolver | None = None,
+        separator: str = '\n\n',
+        backend: str | None = None,
+        profiler: Profiler | None = None,
+        snapshot_path: str | Path | None = None,
+        base_indent: int = 0,
+        chunk_size: int = 100,
+        sort_by: str | None = None,
+        group_by: str | None = None,
+        group_template: str | None = GROUP_TEMPLATE
+) -> Iterator[str]:
+    """Get the licenses and render them as markdown, yielding ``chunk_size`` packages at a time.
+
+    The packages are selected in the same way as
+    [`get_licenses_as_markdown`][mkdocs_licenseinfo.render_markdown.get_licenses_as_markdown], and each chunk is
+    rendered (with the list template) when it is needed, so the markdown for all the packages is never held at
+    once. Joining the chunks with the ``separator`` gives the markdown for all the packages.
+
+    The packages are rendered with
+    [`iter_packages_as_markdown`][mkdocs_licenseinfo.render_markdown.iter_packages_as_markdown].
+    """
+    selected_packages = _select_packages(
+        using,
+        ignore_packages=ignore_packages,
+        fail_packages=fail_packages,
+        skip_packages=skip_packages,
+        ignore_licenses=ignore_licenses,
+        fail_licenses=fail_licenses,
+        diff=diff,
+        path=path,
+        resolver=resolver,
+        backend=backend,
+        profiler=profiler,
+        snapshot_path=snapshot_path,
+        sort_by=sort_by
+    )
+    yield from iter_packages_as_markdown(
+        selected_packages, package_template, separator, profiler, base_indent, chunk_size, group_by, group_template
+    )
+
+
+def iter_packages_as_markdown(
+        packages: list[PackageLicense],
+        package_template: str | None = PACKAGE_TEMPLATE,
+        separator: str = '\n\n',
+        profiler: Profiler | None = None,
+        base_indent: int = 0,
+        chunk_size: int = 100,
+        group_by: str | None = None,
+        group_template: str | None = GROUP_TEMPLATE
+) -> Iterator[str]:
+    """Render the packages as markdown, yielding ``chunk_size`` packages at a time.
+
+    The headings in the template are increased by the ``base_indent`` levels before it is compiled.
+
+    If ``group_by`` is set, the packages are grouped (see [`group_packages`][mkdocs_licenseinfo.grouping.group_packages])
+    and the ``group_template`` is rendered (with the ``group``) before the packages in each group, which are nested a
+    level below it. The ``group`` is also passed to the package template.
+    """
+    if package_template is None:
+        package_template = PACKAGE_TEMPLATE
+    profiler = profiler or NULL_PROFILER
+    logger.debug('Rendering licenses')
+    chunk_size = max(chunk_size, 1)
+    if not group_by:
+        template = JINJA_ENVIRONMENT_FACTORY.get_list_template(_offset_headings(package_template, base_indent))
+        for start in range(0, len(packages), chunk_size):
+            with profiler.stage('render'):
+                chunk = template.render(packages=packages[start:start+chunk_size], separator=separator)
+            yield chunk
+        return
+    if group_template is None:
+        group_template = GROUP_TEMPLATE
+    heading_template = JINJA_ENVIRONMENT_FACTORY.get_template(_offset_headings(group_template, base_indent))
+    template = JINJA_ENVIRONMENT_FACTORY.get_list_template(_offset_headings(package_template, base_indent+1))
+    with profiler.stage('render'):
+        groups = group_packages(packages, group_by)
+    for group in groups:
+        with profiler.stage('render'):
+            heading = heading_template.render(group=group, group_by=group_by)
+        yield heading
+        for start in range(0, len(group.packages), chunk_size):
+            with profiler.stage('render'):
+                chunk = template.render(
+                    packages=group.packages[start:start+chunk_size], separator=separator, group=group, group_by=group_by
+                )
+            yield chunk
+
+
+def _package_elements(package: PackageLicense, heading_tag: str) -> tuple[Element, Element]:
+    """Build the heading and paragraph elements for a package, matching the default ``PACKAGE_TEMPLATE``."""
+    heading = Element(heading_tag)
+    link = SubElement(heading, 'a', {'href': package.homePage})
+    link.text = package.name
+    paragraph = Element('p')
+    code = None
+    for license in package.licenses:
+        if code is not None:
+            code.tail = ' '
+        code = SubElement(paragraph, 'code')
+        code.text = AtomicString(license)
+    # The line breaks are prettified (with a newline after them) by markdown
+    SubElement(paragraph, 'br')
+    emphasis = SubElement(paragraph, 'em')
+    emphasis.text = f'Version Checked: {package.version}'
+    SubElement(paragraph, 'br').tail = f'Author: {package.author}'
+    return heading, paragraph
+
+
+def get_licenses_as_elements(
+        using: str | None = 'PEP631',
+        ignore_packages: list[str] | None = None,
+        fail_packages: list[str] | None = None,
+        skip_packages: list[str] | None = None,
+        ignore_licenses: list[str] | None = None,
+        fail_licenses: list[str] | None = None,
+        diff: str | list[str] | None = None,
+        path: str | Path | None = None,
+        resolver: LicenseResolver | None = None,
+        backend: str | None = None,
+        profiler: Profiler | None = None,
+        snapshot_path: str | Path | None = None,
+        base_indent: int = 0,
+        sort_by: str | None = None,
+        group_by: str | None = None
+) -> list[Element]:
+    """Get the licenses and build the ``ElementTree`` elements for the default ``PACKAGE_TEMPLATE`` layout.
+
+    The packages are selected in the same way as
+    [`get_licenses_as_markdown`][mkdocs_licenseinfo.render_markdown.get_licenses_as_markdown], but instead of
+    rendering markdown to be parsed again, a heading (with the link) and a paragraph (with the license code spans,
+    version and author) are built for each package. The text is still processed by the inline patterns (except
+    for the licenses, as in code spans), so the result matches parsing the default template's markdown.
+
+    If ``group_by`` is set, a heading is built for each group (matching the default ``GROUP_TEMPLATE``), with the
+    packages in the group nested a level below it.
+    """
+    selected_packages = _select_packages(
+        using,
+        ignore_packages=ignore_packages,
+        fail_packages=fail_packages,
+        skip_packages=skip_packages,
+        ignore_licenses=ignore_licenses,
+        fail_licenses=fail_licenses,
+        diff=diff,
+        path=path,
+        resolver=resolver,
+        backend=backend,
+        profiler=profiler,
+        snapshot_path=snapshot_path,
+        sort_by=sort_by
+    )
+    logger.debug('Building license elements')
+    with (profiler or NULL_PROFILER).stage('render'):
+        if not group_by:
+            heading_tag = f'h{min(base_indent + 1, 6)}'
+            return [element for package in selected_packages for element in _package_elements(package, heading_tag)]
+        group_tag = f'h{min(base_indent + 1, 6)}'
+        heading_tag = f'h{min(base_indent + 2, 6)}'
+        elements = []
+        for group in group_packages(selected_packages, group_by):
+            elements.append(Element(group_tag))
+            elements[-1].text = group.name
+            elements.extend(element for package in group.packages for element in _package_elements(package, heading_tag))
+        return elements
+
+
+def get_licenses_as_table(
+        tables: LicenseTables,
+        using: str | None = 'PEP631',
+        ignore_packages: list[str] | None = None,
+        fail_packages: list[str] | None = None,
+        skip_packages: list[str] | None = None,
+        ignore_licenses: list[str] | None = None,
+        fail_licenses: list[str] | None = None,
+        diff: str | list[str] | None = None,
+        path: str | Path | None = None,
+        resolver: LicenseResolver | None = None,
+        backend: str | None = None,
+        profiler: Profiler | None = None,
+        snapshot_path: str | Path | None = None,
+        sort_by: str | None = None
+) -> str:
+    """Get the licenses and add them to the tables, returning the HTML for the table on the current page.
+
+    The packages are selected in the same way as
+    [`get_licenses_as_markdown`][mkdocs_licenseinfo.render_markdown.get_licenses_as_markdown], and are written as
+    JSON data (see [`LicenseTables`][mkdocs_licenseinfo.table.LicenseTables]) to be loaded in the browser rather
+    than rendered. The table shows the packages in their order (e.g. ``sort_by``) until a column is sorted.
+    """
+    selected_packages = _select_packages(
+        using,
+        ignore_packages=ignore_packages,
+        fail_packages=fail_packages,
+        skip_packages=skip_packages,
+        ignore_licenses=ignore_licenses,
+        fail_licenses=fail_licenses,
+        diff=diff,
+        path=path,
+        resolver=resolver,
+        backend=backend,
+        profiler=profiler,
+        snapshot_path=snapshot_path,
+        sort_by=sort_by
+    )
+    logger.debug('Adding license table')
+    with (profiler or NULL_PROFILER).stage('render'):
+        return tables.html(selected_packages)
@@ -0,0 +1,289 @@
+"""Build scoped license resolution.
+
+The [`LicenseResolver`][mkdocs_licenseinfo.resolver.LicenseResolver] is owned by the plugin and memoizes the
+results of [`get_package_licenses`][mkdocs_licenseinfo.get_licenses.get_package_licenses] so that identical ``::licenseinfo``
+blocks only resolve the licenses once per build.
+
+Between builds (e.g. when using ``mkdocs serve``) the results are kept along with the state of the requirement
+sources they were resolved from, and reused as long as those files are unchanged.
+
+The licenses for all the blocks can also be resolved up front, in a thread or process pool, using
+[`LicenseResolver.prefetch`][mkdocs_licenseinfo.resolver.LicenseResolver.prefetch].
+
+Resolutions that don't use the ``licensecheck`` CLI share a
+[`DependencyGraph`][mkdocs_licenseinfo.get_licenses.DependencyGraph] per project path (and backend) for the build,
+so blocks with different ``using`` extras for the same project only traverse it. The graphs can look up the
+package metadata through a shared [`MetadataCache`][mkdocs_licenseinfo.cache.MetadataCache], so only the
+distributions that have not been seen before (in any build or project) need their metadata reading.
+"""
+from __future__ import annotations
+
+from concurrent.futures import as_completed, ProcessPoolExecutor, ThreadPoolExecutor
+import hashlib
+from pathlib import Path
+import threading
+from typing import Any, Dict, Iterable, Tuple, TYPE_CHECKING
+
+from mkdocs_licenseinfo import logger
+from mkdocs_licenseinfo.cache import get_requirement_sources
+from mkdocs_licenseinfo.snapshot import get_snapshot_packages
+
+if TYPE_CHECKING:
+    from mkdocs_licenseinfo.cache import LicenseCache, MetadataCache
+    from mkdocs_licenseinfo.get_licenses import DependencyGraph, PackageLicense
+
+SourceStamps = Dict[str, Tuple[int, int, str]]
+ResolutionKey = Tuple[Any, ...]
+
+
+def _stamp_sources(sources: list[Path], previous: SourceStamps | None = None) -> SourceStamps:
+    """Get the (mtime, size, hash) stamps for the requirement sources.
+
+    The file is only hashed if the mtime or size differ from the previous stamp.
+    """
+    previous = previous or {}
+    stamps = {}
+    for source in sources:
+        stat = source.stat()
+        previous_stamp = previous.get(str(source))
+        if previous_stamp is not None and previous_stamp[:2] == (stat.st_mtime_ns, stat.st_size):
+            digest = previous_stamp[2]
+        else:
+            digest = hashlib.sha256(source.read_bytes()).hexdigest()
+        stamps[str(source)] = (stat.st_mtime_ns, stat.st_size, digest)
+    return stamps
+
+
+def _unchanged(previous: SourceStamps, current: SourceStamps) -> bool:
+    """Check if the requirement sources have the same files and contents."""
+    return previous.keys() == current.keys() and all(previous[u][2] == current[u][2] for u in current)
+
+
+class LicenseResolver:
+    """Memoize license resolution for a build, and across builds while the requirement sources are unchanged."""
+
+    def __init__(
+        self,
+        cache: LicenseCache | None = None,
+        use_graph: bool = False,
+        metadata_cache: MetadataCache | None = None
+    ):
+        """Initialise the resolver.
+
+        Arguments:
+            cache: The (optional) on-disk cache to use when the result is not memoized.
+            use_graph: Always resolve from the shared dependency graphs (so each package is only looked up once
+                per build), rather than running the ``licensecheck`` CLI.
+            metadata_cache: The (optional) cache of the metadata for each distribution, used by the dependency graphs.
+        """
+        self.cache = cache
+        self.use_graph = use_graph
+        self.metadata_cache = metadata_cache
+        self._results: dict[ResolutionKey, list[PackageLicense]] = {}
+        self._previous_results: dict[ResolutionKey, tuple[SourceStamps, list[PackageLicense]]] = {}
+        self._graphs: dict[tuple[str, str], DependencyGraph] = {}
+        self.hits = 0
+        self.misses = 0
+        # get_package_licenses can be called concurrently (e.g. for the primary and diff specs of a block)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(
+        using: str | None = 'PEP631',
+        ignore_packages: list[str] | None = None,
+        fail_packages: list[str] | None = None,
+        skip_packages: list[str] | None = None,
+        ignore_licenses: list[str] | None = None,
+        fail_licenses: list[str] | None = None,
+        path: str | Path | None = None,
+        backend: str | None = None,
+        graph: bool = False,
+    ) -> ResolutionKey:
+        """Get the normalised memo key for the arguments.
+
+        The key includes whether the licenses are resolved from the dependency graph (``graph``, which is always
+        the case for backends other than ``licensecheck``), as the ``licensecheck`` CLI also reads its own config.
+        """
+        return (
+            using or 'PEP631',
+            tuple(sorted(ignore_packages or [])),
+            tuple(sorted(fail_packages or [])),
+            tuple(sorted(skip_packages or [])),
+            tuple(sorted(ignore_licenses or [])),
+            tuple(sorted(fail_licenses or [])),
+            str(Path(path).resolve()) if path else None,
+            backend or 'licensecheck',
+            bool(graph) or (backend or 'licensecheck') != 'licensecheck',
+        )
+
+    def uses_graph(self, backend: str | None = None) -> bool:
+        """Whether a resolution uses the dependency graph for its path (rather than the ``licensecheck`` CLI).
+
+        This only depends on the resolver and the backend, so every call for the same spec (e.g. from
+        [`prefetch`][mkdocs_licenseinfo.resolver.LicenseResolver.prefetch], a diff or a snapshot) has the same key.
+        """
+        return self.use_graph or (backend or 'licensecheck') != 'licensecheck'
+
+    @property
+    def requirement_sources(self) -> set[Path]:
+        """The requirement sources that the resolved licenses depend on."""
+        return {Path(u) for stamps, _ in self._previous_results.values() for u in stamps}
+
+    def get_package_licenses(
+        self,
+        using: str | None = 'PEP631',
+        ignore_packages: list[str] | None = None,
+        fail_packages: list[str] | None = None,
+        skip_packages: list[str] | None = None,
+        ignore_licenses: list[str] | None = None,
+        fail_licenses: list[str] | None = None,
+        path: str | Path | None = None,
+        backend: str | None = None,
+        snapshot_path: str | Path | None = None,
+    ) -> list[PackageLicense]:
+        """Get the licenses, reusing the result of an identical call in this build.
+
+        Results from previous builds are reused if the requirement sources are unchanged. This can be called
+        concurrently.
+
+        If ``use_graph`` is set or the backend is not ``licensecheck``, the licenses are resolved from the
+        [`DependencyGraph`][mkdocs_licenseinfo.get_licenses.DependencyGraph] for the path, rather than running the
+        ``licensecheck`` CLI.
+
+        If a ``snapshot_path`` is provided and the snapshot has the licenses for the current requirements, they are
+        used instead of resolving them.
+        """
+        use_graph = self.uses_graph(backend)
+        key = self.key(
+            using, ignore_packages, fail_packages, skip_packages, ignore_licenses, fail_licenses, path, backend, use_graph
+        )
+        with self._lock:
+            if key in self._results:
+                self.hits += 1
+                return self._results[key]
+            self.misses += 1
+        stamps, packages = self._get_previous(key, path)
+        if packages is None and snapshot_path:
+            packages = get_snapshot_packages(
+                snapshot_path, using, ignore_packages, fail_packages, skip_packages, ignore_licenses, fail_licenses, path, backend,
+                graph=use_graph
+            )
+        if packages is None:
+            # licensecheck is only imported when the licenses need resolving
+            from mkdocs_licenseinfo.get_licenses import get_package_licenses
+
+            graph = self.get_graph(path, backend) if use_graph else None
+            packages = get_package_licenses(
+                using,
+                ignore_packages,
+                fail_packages,
+                skip_packages,
+                ignore_licenses,
+                fail_licenses,
+                path=path,
+                cache=self.cache,
+                backend=backend,
+                graph=graph
+            )
+        self._store(key, stamps, packages)
+        return packages
+
+    def prefetch(self, specs: Iterable[dict[str, Any]], workers: int = 2, pool: str = 'process') -> None:
+        """Resolve the licenses for the (de-duplicated) specs concurrently.
+
+        Each spec is resolved the same way as
+        [`get_package_licenses`][mkdocs_licenseinfo.resolver.LicenseResolver.get_package_licenses] would (so the results are the same
+        whichever resolves it first), and the ``pool`` only sets where it runs. The ``licensecheck`` CLI changes the
+        working directory, so only the ``process`` pool runs those resolutions in parallel. The resolutions from
+        the dependency graph run in parallel in either pool, sharing the graph for each path in the ``thread``
+        pool.
+
+        Failures are logged and left for the block to resolve (and raise) when it is rendered. Specs with a
+        ``snapshot_path`` use the snapshot if it has the licenses for the current requirements.
+
+        Arguments:
+            specs: The keyword arguments for each resolution.
+            workers: The number of workers to use.
+            pool: Either ``process`` or ``thread``.
+        """
+        from mkdocs_licenseinfo.get_licenses import get_package_licenses, PackageLicense, resolve_package_licenses
+
+        pending: dict[ResolutionKey, tuple[dict[str, Any], SourceStamps]] = {}
+        for spec in specs:
+            spec = {**spec, 'using': spec.get('using') or 'PEP631'}
+            snapshot_path = spec.pop('snapshot_path', None)
+            use_graph = self.uses_graph(spec.get('backend'))
+            key = self.key(**spec, graph=use_graph)
+            if key in self._results or key in pending:
+                continue
+            stamps, packages = self._get_previous(key, spec.get('path'))
+            if packages is None and snapshot_path:
+                packages = get_snapshot_packages(snapshot_path, **spec, graph=use_graph)
+            if packages is None and self.cache is not None:
+                cached_packages = self.cache.get(self.cache.key(**spec, graph=use_graph))
+                if cached_packages is not None:
+                    packages = [PackageLicense.from_dict(u) for u in cached_packages]
+            if packages is None:
+                pending[key] = (spec, stamps)
+            else:
+                self._store(key, stamps, packages)
+        if not pending:
+            return
+        self.misses += len(pending)
+        executor_class = ThreadPoolExecutor if pool == 'thread' else ProcessPoolExecutor
+        logger.info(f'Resolving licenses for {len(pending)} blocks using {workers} {pool} workers')
+        with executor_class(max_workers=workers) as executor:
+            futures = {}
+            for key, (spec, _) in pending.items():
+                if not self.uses_graph(spec.get('backend')):
+                    future = executor.submit(get_package_licenses, **spec)
+                elif pool == 'thread':
+                    future = executor.submit(
+                        resolve_package_licenses, **spec, graph=self.get_graph(spec.get('path'), spec.get('backend'))
+                    )
+                else:
+                    future = executor.submit(resolve_package_licenses, **spec)
+                futures[future] = key
+            for future in as_completed(futures):
+                key = futures[future]
+                spec, stamps = pending[key]
+                try:
+                    packages = future.result()
+                except Exception as error:
+                    logger.info(f'Unable to prefetch licenses for: {spec["using"]} in path: {spec.get("path")} ({error})')
+                    continue
+                if self.cache is not None:
+                    cache_key = self.cache.key(**spec, graph=self.uses_graph(spec.get('backend')))
+                    self.cache.set(cache_key, [u.as_dict() for u in packages])
+                self._store(key, stamps, packages)
+
+    def get_graph(self, path: str | Path | None = None, backend: str | None = None) -> DependencyGraph:
+        """Get the dependency graph for the path and backend, shared for the rest of the build."""
+        from mkdocs_licenseinfo.get_licenses import DependencyGraph
+
+        graph_key = (str(Path(path).resolve()) if path else str(Path.cwd()), backend or 'licensecheck')
+        with self._lock:
+            if graph_key not in self._graphs:
+                self._graphs[graph_key] = DependencyGraph(path, backend, metadata_cache=self.metadata_cache)
+            return self._graphs[graph_key]
+
+    def _get_previous(self, key: ResolutionKey, path: str | Path | None) -> tuple[SourceStamps, list[PackageLicense] | None]:
+        """Get the current source stamps, and the previous result if the sources are unchanged."""
+        previous_stamps, packages = self._previous_results.get(key, ({}, None))
+        stamps = _stamp_sources(get_requirement_sources(key[0], path), previous_stamps)
+        if packages is not None and _unchanged(previous_stamps, stamps):
+            logger.debug(f'Requirement sources unchanged, reusing licenses for: {key[0]} in path: {path}')
+            return stamps, packages
+        return stamps, None
+
+    def _store(self, key: ResolutionKey, stamps: SourceStamps, packages: list[PackageLicense]) -> None:
+        with self._lock:
+            self._previous_results[key] = (stamps, packages)
+            self._results[key] = packages
+
+    def clear(self) -> None:
+        """Clear the memoized results, dependency graphs and counts for a new build."""
+        self._results.clear()
+        self._graphs.clear()
+        self.hits = 0
+        self.misses = 0
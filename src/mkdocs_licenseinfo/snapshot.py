@@ -0,0 +1,212 @@
+"""Pre-generated license snapshots for offline builds.
+
+A snapshot is a JSON file with the resolved packages (the structure
+[`get_licenses`][mkdocs_licenseinfo.get_licenses.get_licenses] returns) for each of the license resolutions
+in the docs, keyed on a portable fingerprint of the resolution options and the contents of the requirement sources
+(see [`fingerprint`][mkdocs_licenseinfo.cache.fingerprint]):
+
+```json
+{
+    "version": "<mkdocs_licenseinfo version>",
+    "snapshots": {
+        "<fingerprint>": {"using": "PEP631", "backend": "licensecheck", "packages": [...]}
+    }
+}
+```
+
+When the ``snapshot_path`` option is set, a resolution whose fingerprint is in the snapshot uses its packages
+without resolving anything, so the docs can be built where fetching the package metadata is slow or impossible.
+If the requirements have changed since the snapshot was written, a warning is logged and the licenses are resolved.
+
+The snapshot for a project's docs can be written (or refreshed) with the ``mkdocs-licenseinfo`` command (see
+[`mkdocs_licenseinfo.cli`][mkdocs_licenseinfo.cli]), or ``python -m mkdocs_licenseinfo.snapshot``, which runs it
+with ``--snapshot``:
+
+```bash
+mkdocs-licenseinfo -f mkdocs.yml --snapshot
+```
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+import json
+from pathlib import Path
+import sys
+from typing import Any, Callable, Iterable, Sequence, TYPE_CHECKING
+
+from mkdocs_licenseinfo import get_version, logger
+from mkdocs_licenseinfo.cache import fingerprint
+
+if TYPE_CHECKING:
+    from mkdocs_licenseinfo.get_licenses import PackageLicense
+
+
+def snapshot_key(
+    using: str | None = 'PEP631',
+    ignore_packages: list[str] | None = None,
+    fail_packages: list[str] | None = None,
+    skip_packages: list[str] | None = None,
+    ignore_licenses: list[str] | None = None,
+    fail_licenses: list[str] | None = None,
+    path: str | Path | None = None,
+    backend: str | None = None,
+    graph: bool = False,
+) -> str:
+    """Get the snapshot key for a resolution (independent of the environment and the checkout location)."""
+    return fingerprint(
+        using, ignore_packages, fail_packages, skip_packages, ignore_licenses, fail_licenses, path,
+        include_environment=False, backend=backend, portable=True, graph=graph
+    )
+
+
+@lru_cache(maxsize=8)
+def _load_snapshot(path: str, mtime_ns: int, size: int) -> dict[str, list[PackageLicense]]:  # noqa: U100
+    """Load the snapshot file (cached while it is unchanged)."""
+    from mkdocs_licenseinfo.get_licenses import PackageLicense
+
+    if not size:
+        return {}
+    snapshot = json.loads(Path(path).read_bytes())
+    return {
+        key: [PackageLicense.from_dict(u) for u in entry['packages']]
+        for key, entry in snapshot.get('snapshots', {}).items()
+    }
+
+
+def read_snapshot(path: str | Path) -> dict[str, list[PackageLicense]]:
+    """Read the packages for each key in a snapshot file.
+
+    The parsed snapshot is reused until the file changes (its modification time or size).
+
+    Returns:
+        The package records for each snapshot key (empty if the file does not exist).
+    """
+    path = Path(path).resolve()
+    try:
+        stat = path.stat()
+    except OSError:
+        return {}
+    return _load_snapshot(str(path), stat.st_mtime_ns, stat.st_size)
+
+
+def get_snapshot_packages(
+    snapshot_path: str | Path,
+    using: str | None = 'PEP631',
+    ignore_packages: list[str] | None = None,
+    fail_packages: list[str] | None = None,
+    skip_packages: list[str] | None = None,
+    ignore_licenses: list[str] | None = None,
+    fail_licenses: list[str] | None = None,
+    path: str | Path | None = None,
+    backend: str | None = None,
+    graph: bool = False,
+) -> list[PackageLicense] | None:
+    """Get the packages for a resolution from the snapshot.
+
+    Returns:
+        The package records, or ``None`` if the snapshot doesn't have the resolution for the current requirements.
+    """
+    key = snapshot_key(
+        using, ignore_packages, fail_packages, skip_packages, ignore_licenses, fail_licenses, path, backend, graph
+    )
+    packages = read_snapshot(snapshot_path).get(key)
+    if packages is None:
+        logger.warning(f'No license snapshot for: {using or "PEP631"} in path: {path} in {snapshot_path} (the requirements may have changed), resolving the licenses')
+    else:
+        logger.debug(f'Using license snapshot for: {using or "PEP631"} in path: {path}')
+    return packages
+
+
+def resolve_with_snapshot(
+    snapshot_path: str | Path | None,
+    using: str | None = 'PEP631',
+    ignore_packages: list[str] | None = None,
+    fail_packages: list[str] | None = None,
+    skip_packages: list[str] | None = None,
+    ignore_licenses: list[str] | None = None,
+    fail_licenses: list[str] | None = None,
+    path: str | Path | None = None,
+    lookup: Any = None,
+    backend: str | None = None,
+    resolve: Callable[..., list[PackageLicense]] | None = None,
+) -> list[PackageLicense]:
+    """Get the packages from the snapshot if it has the resolution, otherwise resolve them."""
+    packages = None
+    if snapshot_path:
+        packages = get_snapshot_packages(
+            snapshot_path, using, ignore_packages, fail_packages, skip_packages, ignore_licenses, fail_licenses, path, backend,
+            graph=lookup is not None
+        )
+    if packages is None:
+        from mkdocs_licenseinfo.get_licenses import get_package_licenses
+
+        packages = (resolve or get_package_licenses)(
+            using, ignore_packages, fail_packages, skip_packages, ignore_licenses, fail_licenses,
+            path=path, lookup=lookup, backend=backend
+        )
+    return packages
+
+
+def write_snapshot(
+    snapshot_path: str | Path,
+    specs: Iterable[dict[str, Any]],
+    resolve: Callable[..., list[PackageLicense]] | None = None,
+    graph: bool = False,
+) -> Path:
+    """Resolve the licenses for the specs and write them to a snapshot file.
+
+    Arguments:
+        snapshot_path: The path to write the snapshot to.
+        specs: The keyword arguments for each resolution.
+        resolve: The function to resolve the licenses with (defaults to
+            [`get_package_licenses`][mkdocs_licenseinfo.get_licenses.get_package_licenses]).
+        graph: ``resolve`` uses the dependency graph rather than the ``licensecheck`` CLI (see
+            [`snapshot_key`][mkdocs_licenseinfo.snapshot.snapshot_key]).
+
+    Returns:
+        The snapshot path.
+    """
+    from mkdocs_licenseinfo.get_licenses import get_package_licenses
+
+    snapshots = {}
+    for spec in specs:
+        spec = {**spec, 'using': spec.get('using') or 'PEP631'}
+        key = snapshot_key(**spec, graph=graph)
+        if key in snapshots:
+            continue
+        packages = (resolve or get_package_licenses)(**spec)
+        snapshots[key] = {
+            'using': spec['using'],
+            'backend': spec.get('backend') or 'licensecheck',
+            'packages': [u.as_dict() for u in packages],
+        }
+    snapshot_path = Path(snapshot_path)
+    snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+    snapshot_path.write_text(json.dumps({'version': get_version(), 'snapshots': snapshots}, indent=2), encoding='utf-8')
+    return snapshot_path
+
+
+def select_snapshot_specs(specs: Iterable[dict[str, Any]], snapshot_path: Path | None) -> list[dict[str, Any]]:
+    """Select the specs that use the plugin's snapshot (rather than one set for the block), without their ``snapshot_path``."""
+    return [
+        {u: v for u, v in spec.items() if u != 'snapshot_path'}
+        for spec in specs if spec.get('snapshot_path') is None or spec['snapshot_path'] == snapshot_path
+    ]
+
+
+def main(args: Sequence[str] | None = None) -> int:
+    """Write (or refresh) the license snapshot for the docs of an ``mkdocs.yml``.
+
+    This is ``mkdocs-licenseinfo --snapshot`` (see [`cli.main`][mkdocs_licenseinfo.cli.main]), which also writes
+    the licenses to the plugin's cache.
+
+    Returns:
+        The exit code (1 if any of the resolutions failed).
+    """
+    from mkdocs_licenseinfo.cli import main as cli_main
+
+    return cli_main(['--snapshot', *(sys.argv[1:] if args is None else args)])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
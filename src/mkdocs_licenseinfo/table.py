@@ -0,0 +1,94 @@
+"""Client-side license tables.
+
+With ``render: table-json``, a block is rendered as an empty table container rather than the markdown for each
+package. The [`LicenseTables`][mkdocs_licenseinfo.table.LicenseTables] (owned by the plugin) collects the packages
+for each block, and after the build writes them to the ``site_dir`` as compact JSON files (named on a hash of their
+contents, so identical blocks share a file), along with the script that loads them:
+
+```json
+{"fields": ["name", "version", "licenses", "author", "homePage"], "rows": [["aenum", "3.1.15", ["BSD LICENSE"], ...]]}
+```
+
+The script fetches a table's rows when it is scrolled into view, and renders them a page at a time, sortable by
+column and filterable by text. As the rows are not in the page content, they are not in the search index either.
+"""
+from __future__ import annotations
+
+import hashlib
+from html import escape
+import json
+from pathlib import Path
+from typing import Iterable, TYPE_CHECKING
+
+from mkdocs.utils import get_relative_url
+
+if TYPE_CHECKING:
+    from mkdocs_licenseinfo.get_licenses import PackageLicense
+
+TABLE_DIR = 'assets/licenseinfo'
+TABLE_SCRIPT = 'licenseinfo-table.js'
+TABLE_FIELDS = ('name', 'version', 'licenses', 'author', 'homePage')
+# The number of rows the script renders at a time
+TABLE_PAGE_SIZE = 100
+
+
+class LicenseTables:
+    """Collect the packages for the table blocks in a build, and write them as JSON assets."""
+
+    def __init__(self, page_size: int = TABLE_PAGE_SIZE):
+        """Initialise the tables.
+
+        Arguments:
+            page_size: The number of rows to show at a time.
+        """
+        self.page_size = page_size
+        self.page_url = ''
+        self._tables: dict[str, bytes] = {}
+
+    def __len__(self) -> int:
+        """Get the number of table data files."""
+        return len(self._tables)
+
+    def add(self, packages: Iterable[PackageLicense]) -> str:
+        """Add the packages for a table.
+
+        Returns:
+            The path of the table data, relative to the site dir.
+        """
+        rows = [[getattr(package, u) for u in TABLE_FIELDS] for package in packages]
+        data = json.dumps({'fields': TABLE_FIELDS, 'rows': rows}, separators=(',', ':')).encode('utf-8')
+        path = f'{TABLE_DIR}/licenseinfo-{hashlib.sha256(data).hexdigest()[:16]}.json'
+        self._tables[path] = data
+        return path
+
+    def html(self, packages: Iterable[PackageLicense]) -> str:
+        """Add the packages for a table, and get the HTML for its container on the current page."""
+        src = get_relative_url(self.add(packages), self.page_url)
+        script = get_relative_url(f'{TABLE_DIR}/{TABLE_SCRIPT}', self.page_url)
+        return (
+            f'<div class="licenseinfo-table" data-src="{escape(src)}" data-page-size="{self.page_size}"></div>\n'
+            f'<script src="{escape(script)}" defer></script>'
+        )
+
+    def clear(self) -> None:
+        """Clear the tables for a new build."""
+        self._tables.clear()
+        self.page_url = ''
+
+    def write(self, site_dir: str | Path) -> list[Path]:
+        """Write the table data (and the script to load it) to the site dir.
+
+        Returns:
+            The paths of the written files.
+        """
+        if not self._tables:
+            return []
+        directory = Path(site_dir) / TABLE_DIR
+        directory.mkdir(parents=True, exist_ok=True)
+        script = directory / TABLE_SCRIPT
+        script.write_bytes(Path(__file__).with_name(TABLE_SCRIPT).read_bytes())
+        paths = [script]
+        for path, data in self._tables.items():
+            paths.append(Path(site_dir) / path)
+            paths[-1].write_bytes(data)
+        return paths
@@ -0,0 +1,142 @@
+"""Benchmarks for the build time cost of the plugin.
+
+These are skipped unless ``MKDOCS_LICENSEINFO_BENCHMARK=1`` is set (e.g. using ``nox -s benchmark``). The time and
+peak memory for each stage and dependency set size are written to a JSON report (``reports/benchmark.json`` or
+the ``MKDOCS_LICENSEINFO_BENCHMARK_REPORT`` path) that can be compared between commits.
+"""
+from datetime import datetime, timezone
+import gc
+import json
+import os
+from pathlib import Path
+from platform import platform, python_version
+import subprocess  # nosec B404
+import time
+import tracemalloc
+import unittest
+from unittest.mock import patch
+
+from click.testing import CliRunner
+from licensecheck.types import PackageInfo, ucstr
+from mkdocs.__main__ import build_command
+from nskit.common.contextmanagers import ChDir
+
+from mkdocs_licenseinfo import get_licenses
+from mkdocs_licenseinfo.get_licenses import get_licenses as get_licenses_func
+from mkdocs_licenseinfo.render_markdown import get_licenses_as_markdown
+
+BENCHMARK = os.environ.get('MKDOCS_LICENSEINFO_BENCHMARK', '0') == '1'
+SIZES = [int(u) for u in os.environ.get('MKDOCS_LICENSEINFO_BENCHMARK_SIZES', '10,100,1000,5000').split(',')]
+ROUNDS = int(os.environ.get('MKDOCS_LICENSEINFO_BENCHMARK_ROUNDS', '3'))
+REPORT = Path(os.environ.get('MKDOCS_LICENSEINFO_BENCHMARK_REPORT', 'reports/benchmark.json')).absolute()
+LICENSES = ['MIT LICENSE', 'BSD LICENSE', 'APACHE SOFTWARE LICENSE;; MIT LICENSE', 'MOZILLA PUBLIC LICENSE 2.0 (MPL 2.0)']
+
+
+def synthetic_packages(size):
+    """Get the package info for a synthetic dependency set (as an offline stand-in for licensecheck)."""
+    return {
+        PackageInfo(
+            name=f'package-{i}',
+            version=f'1.{i}.0',
+            size=1000 + i,
+            homePage=f'https://github.com/example/package-{i}',
+            author=f'Author {i}',
+            license=ucstr(LICENSES[i % len(LICENSES)]),
+            licenseCompat=True,
+        )
+        for i in range(size)
+    }
+
+
+def synthetic_project(size):
+    """Write a synthetic project with the dependencies and docs into the working directory."""
+    dependencies = ',\n'.join(f'    "package-{i}"' for i in range(size))
+    Path('pyproject.toml').write_text(f'[project]\nname = "synthetic"\nlicense = {{text = "MIT"}}\ndependencies = [\n{dependencies}\n]\n')
+    Path('mkdocs.yml').write_text("""
+site_name: benchmark
+docs_dir: ./source
+site_dir: ./html
+plugins:
+  - mkdocs_licenseinfo:
+      cache: false
+""")
+    Path('source').mkdir(exist_ok=True)
+    Path('source', 'index.md').write_text('# Licenses\n\n## ::licenseinfo\n')
+
+
+def measure(func, rounds=ROUNDS):
+    """Get the best time and peak traced memory for running the function."""
+    times = []
+    for _ in range(rounds):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'time': min(times), 'mean_time': sum(times)/len(times), 'peak_memory': peak, 'rounds': rounds}
+
+
+def _commit():
+    try:
+        return subprocess.run(  # nosec B603, B607
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@unittest.skipUnless(BENCHMARK, 'Set MKDOCS_LICENSEINFO_BENCHMARK=1 to run the benchmarks')
+class BenchmarkTestCase(unittest.TestCase):
+
+    results = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        REPORT.parent.mkdir(parents=True, exist_ok=True)
+        report = {
+            'commit': _commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': python_version(),
+            'platform': platform(),
+            'results': cls.results,
+        }
+        REPORT.write_text(json.dumps(report, indent=2))
+
+    def record(self, stage, size, func):
+        result = measure(func)
+        self.results.setdefault(stage, {})[str(size)] = result
+        print(f'{stage} [{size} packages]: {result["time"]:.4f}s, peak memory {result["peak_memory"]/1024:.1f} KiB')
+
+    def test_get_licenses(self):
+        for size in SIZES:
+            with self.subTest(size=size), ChDir():
+                synthetic_project(size)
+                with patch.object(get_licenses, '_get_licensecheck_package_infos', return_value=synthetic_packages(size)):
+                    self.record('get_licenses', size, get_licenses_func)
+
+    def test_get_licenses_as_markdown(self):
+        for size in SIZES:
+            with self.subTest(size=size), ChDir():
+                synthetic_project(size)
+                with patch.object(get_licenses, '_get_licensecheck_package_infos', return_value=synthetic_packages(size)):
+                    self.record('get_licenses_as_markdown', size, get_licenses_as_markdown)
+
+    def test_mkdocs_build(self):
+        for size in SIZES:
+            with self.subTest(size=size), ChDir():
+                synthetic_project(size)
+                runner = CliRunner()
+
+                def build():
+                    resp = runner.invoke(build_command, catch_exceptions=False)
+                    self.assertEqual(resp.exit_code, 0, resp.output)
+
+                with patch.object(get_licenses, '_get_licensecheck_package_infos', return_value=synthetic_packages(size)):
+                    self.record('mkdocs_build', size, build)
+                self.assertIn('package-0', Path('html', 'index.html').read_text(encoding='utf-8'))
@@ -1,6 +1,5 @@
 from datetime import datetime
 from functools import wraps
-import json
 from pathlib import Path
 import sys
 import traceback as tb
@@ -9,6 +8,7 @@ from unittest.mock import MagicMock, patch
 import webbrowser
 
 from click.testing import CliRunner
+from licensecheck.types import PackageInfo, ucstr
 from mkdocs.__main__ import build_command
 from nskit.common.contextmanagers import ChDir
 
@@ -21,36 +21,31 @@ from mkdocs_licenseinfo import get_licenses
 
 def mock_licensecheck(func):
 
-    @patch.object(get_licenses, 'licensecheck', autospec=True)
+    @patch.object(get_licenses, '_get_licensecheck_package_infos', autospec=True)
     @wraps(func)
-    def mocked_call(self, licensecheck):
+    def mocked_call(self, get_package_infos):
         # Patch licensecheck
-
-        def cli(*args, **kwargs):
-            licensecheck.stdout.write(json.dumps(
-                {'packages':[
-                    {"name": "orjson",
-                    "version": "3.9.10",
-                    "size": 594514,
-                    "homePage": "https://github.com/ijl/orjson",
-                    "author": "ijl <ijl@mailbox.org>",
-                    "license": "APACHE SOFTWARE LICENSE;; MIT LICENSE",
-                    "licenseCompat": True,
-                    "errorCode": 0,
-                    "namever": "orjson-3.9.10"},
-                    {'name': 'aenum',
-                    'version': '3.1.15',
-                    'size': 728565,
-                    'homePage': 'https://github.com/ethanfurman/aenum',
-                    'author': 'Ethan Furman',
-                    'license': 'BSD LICENSE',
-                    'licenseCompat': True,
-                    'errorCode': 0,
-                    'namever': 'aenum-3.1.15'}
-                ]}
-            ))
-        licensecheck.cli.side_effect = cli
-        return func(self, licensecheck)
+        get_package_infos.return_value = {
+            PackageInfo(
+                name="orjson",
+                version="3.9.10",
+                size=594514,
+                homePage="https://github.com/ijl/orjson",
+                author="ijl <ijl@mailbox.org>",
+                license=ucstr("APACHE SOFTWARE LICENSE;; MIT LICENSE"),
+                licenseCompat=True,
+                errorCode=0),
+            PackageInfo(
+                name='aenum',
+                version='3.1.15',
+                size=728565,
+                homePage='https://github.com/ethanfurman/aenum',
+                author='Ethan Furman',
+                license=ucstr('BSD LICENSE'),
+                licenseCompat=True,
+                errorCode=0)
+        }
+        return func(self, get_package_infos)
 
     return mocked_call
 
@@ -124,6 +119,8 @@ plugins:
             self.assertIn('<h3 id="aenum"><a href="https://github.com/ethanfurman/aenum">aenum</a></h3>\n<p><code>BSD LICENSE</code><br />', contents)
             self.assertIn('<h4 id="aenum_1"><a href="https://github.com/ethanfurman/aenum">aenum</a></h4>\n<p><code>BSD LICENSE</code><br />', contents)
             self.assertIn('<h1 id="aenum_2"><a href="https://github.com/ethanfurman/aenum">aenum</a></h1>\n<p><code>BSD LICENSE</code><br />', contents)
+            # The identical blocks are only resolved once
+            args[0].assert_called_once()
 
 
     @mock_licensecheck
@@ -0,0 +1,196 @@
+import os
+from pathlib import Path
+import time
+import unittest
+from unittest.mock import patch
+
+from nskit.common.contextmanagers import ChDir
+
+from mkdocs_licenseinfo import cache as cache_module
+from mkdocs_licenseinfo.cache import fingerprint, get_requirement_sources, LicenseCache, metadata_key, MetadataCache
+
+
+class RequirementSourcesTestCase(unittest.TestCase):
+
+    def test_default_sources(self):
+        with ChDir():
+            for filename in ['pyproject.toml', 'requirements.txt', 'requirements-dev.txt', 'poetry.lock', 'README.md']:
+                Path(filename).write_text('')
+            sources = [u.name for u in get_requirement_sources()]
+        self.assertEqual(sources, ['poetry.lock', 'pyproject.toml', 'requirements-dev.txt', 'requirements.txt'])
+
+    def test_requirements_using(self):
+        with ChDir():
+            Path('reqs').mkdir()
+            Path('reqs', 'a.txt').write_text('')
+            sources = [u.name for u in get_requirement_sources('requirements:reqs/a.txt;reqs/missing.txt')]
+        self.assertEqual(sources, ['a.txt'])
+
+    def test_path(self):
+        with ChDir():
+            Path('project').mkdir()
+            Path('project', 'pyproject.toml').write_text('')
+            Path('pyproject.toml').write_text('')
+            sources = get_requirement_sources(path='project')
+            self.assertEqual(sources, [Path('project', 'pyproject.toml').resolve()])
+
+
+@patch.object(cache_module, 'get_installed_distributions', return_value=['a==1'])
+class FingerprintTestCase(unittest.TestCase):
+
+    def test_stable(self, _):
+        with ChDir():
+            Path('pyproject.toml').write_text('a')
+            self.assertEqual(fingerprint(ignore_packages=['a', 'b']), fingerprint(ignore_packages=['b', 'a']))
+
+    def test_arguments_change(self, _):
+        with ChDir():
+            self.assertNotEqual(fingerprint(), fingerprint(using='PEP631:dev'))
+            self.assertNotEqual(fingerprint(), fingerprint(skip_packages=['a']))
+            self.assertNotEqual(fingerprint(), fingerprint(fail_licenses=['a']))
+            self.assertNotEqual(fingerprint(), fingerprint(backend='importlib'))
+
+    def test_sources_change(self, _):
+        with ChDir():
+            Path('pyproject.toml').write_text('a')
+            original = fingerprint()
+            Path('pyproject.toml').write_text('b')
+            self.assertNotEqual(original, fingerprint())
+
+    def test_portable(self, _):
+        with ChDir():
+            Path('a').mkdir()
+            Path('b').mkdir()
+            Path('a', 'pyproject.toml').write_text('x')
+            Path('b', 'pyproject.toml').write_text('x')
+            self.assertNotEqual(fingerprint(path='a'), fingerprint(path='b'))
+            self.assertEqual(fingerprint(path='a', portable=True), fingerprint(path='b', portable=True))
+
+    def test_environment_change(self, installed_distributions):
+        with ChDir():
+            original = fingerprint()
+            original_without_environment = fingerprint(include_environment=False)
+            installed_distributions.return_value = ['a==2']
+            self.assertNotEqual(original, fingerprint())
+            self.assertEqual(original_without_environment, fingerprint(include_environment=False))
+
+
+class LicenseCacheTestCase(unittest.TestCase):
+
+    def test_get_missing(self):
+        with ChDir():
+            cache = LicenseCache('cache')
+            self.assertIsNone(cache.get('abc'))
+
+    def test_set_get(self):
+        with ChDir():
+            cache = LicenseCache('cache')
+            cache.set('abc', [{'name': 'a'}])
+            self.assertTrue(Path('cache', 'abc.json').exists())
+            self.assertEqual(cache.get('abc'), [{'name': 'a'}])
+
+    def test_get_expired(self):
+        with ChDir():
+            cache = LicenseCache('cache', max_age=1)
+            cache.set('abc', [{'name': 'a'}])
+            old = time.time() - 2*86400
+            os.utime(Path('cache', 'abc.json'), (old, old))
+            self.assertIsNone(cache.get('abc'))
+            self.assertFalse(Path('cache', 'abc.json').exists())
+
+    def test_evict_max_entries(self):
+        with ChDir():
+            cache = LicenseCache('cache', max_entries=2)
+            for i, key in enumerate(['a', 'b', 'c']):
+                cache.set(key, [])
+                os.utime(Path('cache', f'{key}.json'), (time.time() - 10 + i, time.time() - 10 + i))
+            cache.evict()
+            self.assertEqual(sorted(u.stem for u in Path('cache').glob('*.json')), ['b', 'c'])
+
+    def test_get_touches_entry(self):
+        with ChDir():
+            cache = LicenseCache('cache', max_entries=2)
+            for i, key in enumerate(['a', 'b']):
+                cache.set(key, [])
+                os.utime(Path('cache', f'{key}.json'), (time.time() - 10 + i, time.time() - 10 + i))
+            cache.get('a')
+            cache.set('c', [])
+            self.assertEqual(sorted(u.stem for u in Path('cache').glob('*.json')), ['a', 'c'])
+
+    def test_clear(self):
+        with ChDir():
+            cache = LicenseCache('cache')
+            cache.set('abc', [])
+            cache.clear()
+            self.assertIsNone(cache.get('abc'))
+
+
+class MetadataCacheTestCase(unittest.TestCase):
+
+    def test_metadata_key(self):
+        self.assertEqual(metadata_key('Foo_Bar.baz', '1.0'), 'foo-bar-baz==1.0')
+
+    def test_default_path(self):
+        with patch.dict(os.environ, {'XDG_CACHE_HOME': 'xdg'}):
+            self.assertEqual(MetadataCache().path, Path('xdg', 'mkdocs_licenseinfo', 'metadata.sqlite3'))
+
+    def test_get_missing(self):
+        with ChDir():
+            cache = MetadataCache('cache/metadata.sqlite3')
+            self.assertEqual(cache.get(['a==1']), {})
+            self.assertEqual(cache.get([]), {})
+            cache.close()
+
+    def test_set_get(self):
+        with ChDir():
+            cache = MetadataCache('cache/metadata.sqlite3')
+            cache.set({'a==1': {'name': 'a', 'version': '1', 'license': 'MIT LICENSE', 'extra': 'x'}})
+            self.assertTrue(Path('cache', 'metadata.sqlite3').exists())
+            self.assertEqual(cache._connect().execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+            self.assertEqual(cache.get(['a==1', 'b==1']), {'a==1': {
+                'name': 'a', 'version': '1', 'homePage': None, 'author': None, 'size': None, 'license': 'MIT LICENSE'
+            }})
+            cache.close()
+            # Shared with other instances (e.g. for other projects)
+            other = MetadataCache('cache/metadata.sqlite3')
+            self.assertEqual(list(other.get(['a==1'])), ['a==1'])
+            self.assertEqual(len(other), 1)
+            other.close()
+
+    @patch.object(cache_module, '_QUERY_CHUNK_SIZE', 2)
+    def test_get_chunks(self):
+        with ChDir():
+            cache = MetadataCache('metadata.sqlite3')
+            keys = [f'{u}==1' for u in 'abcde']
+            cache.set({u: {'name': u} for u in keys})
+            self.assertEqual(sorted(cache.get(keys)), keys)
+            cache.close()
+
+    def test_evict_least_recently_used(self):
+        with ChDir():
+            cache = MetadataCache('metadata.sqlite3', max_entries=2)
+            with patch.object(cache_module.time, 'time', side_effect=[1, 2, 3, 4]):
+                cache.set({'a==1': {}})
+                cache.set({'b==1': {}})
+                cache.get(['a==1'])
+                cache.set({'c==1': {}})
+            self.assertEqual(sorted(cache.get(['a==1', 'b==1', 'c==1'])), ['a==1', 'c==1'])
+            cache.close()
+
+    def test_clear(self):
+        with ChDir():
+            cache = MetadataCache('metadata.sqlite3')
+            cache.set({'a==1': {}})
+            cache.clear()
+            self.assertEqual(len(cache), 0)
+            cache.close()
+
+    def test_errors_are_misses(self):
+        with ChDir():
+            Path('metadata.sqlite3').write_text('not a database')
+            cache = MetadataCache('metadata.sqlite3')
+            with self.assertLogs('mkdocs.plugins.mkdocs_licenseinfo', level='WARNING'):
+                self.assertEqual(cache.get(['a==1']), {})
+            with self.assertLogs('mkdocs.plugins.mkdocs_licenseinfo', level='WARNING'):
+                cache.set({'a==1': {}})
+            cache.close()
@@ -0,0 +1,85 @@
+from pathlib import Path
+import unittest
+from unittest.mock import patch
+
+from licensecheck.types import PackageInfo, ucstr
+from nskit.common.contextmanagers import ChDir
+
+from mkdocs_licenseinfo import get_licenses as gl_module
+from mkdocs_licenseinfo.cli import main
+from mkdocs_licenseinfo.resolver import LicenseResolver
+from mkdocs_licenseinfo.snapshot import read_snapshot, snapshot_key
+
+PACKAGE_INFOS = {PackageInfo(name='aenum', version='3.1.15', license=ucstr('BSD LICENSE'))}
+INDEX_MD = '## ::licenseinfo\n    using: PEP631:dev\n\n### ::licenseinfo\n    using: PEP631:dev\n'
+
+
+@patch.object(gl_module, '_get_licensecheck_package_infos', return_value=PACKAGE_INFOS)
+class MainTestCase(unittest.TestCase):
+
+    def _write_docs(self, plugin_config='metadata_cache: false'):
+        Path('pyproject.toml').write_text('[project]\ndependencies = ["aenum"]\n[project.optional-dependencies]\ndev = []')
+        Path('docs').mkdir()
+        Path('docs', 'index.md').write_text(INDEX_MD)
+        Path('mkdocs.yml').write_text(f'site_name: test\nplugins:\n  - mkdocs_licenseinfo:\n      {plugin_config}\n')
+
+    def test_main(self, get_package_infos):
+        with ChDir():
+            self._write_docs()
+            self.assertEqual(main(['-f', 'mkdocs.yml']), 0)
+            # The identical blocks are only resolved once
+            get_package_infos.assert_called_once()
+            self.assertEqual(len(list(Path('.cache', 'mkdocs_licenseinfo').glob('*.json'))), 1)
+            # The build (or another run) then uses the cache
+            get_package_infos.reset_mock()
+            self.assertEqual(main(['-f', 'mkdocs.yml']), 0)
+            get_package_infos.assert_not_called()
+
+    @patch.object(LicenseResolver, 'get_package_licenses', return_value=[])
+    def test_main_manifest_and_pages(self, get_package_licenses, get_package_infos):
+        with ChDir():
+            self._write_docs('{metadata_cache: false, manifest: true, manifest_using: "PEP631:test", pages: letter}')
+            self.assertEqual(main(['-f', 'mkdocs.yml']), 0)
+            self.assertEqual(
+                [u[1]['using'] for u in get_package_licenses.call_args_list], ['PEP631:dev', 'PEP631:test', None]
+            )
+
+    def test_main_failed(self, get_package_infos):
+        get_package_infos.side_effect = RuntimeError('failed')
+        with ChDir():
+            self._write_docs('{metadata_cache: false, snapshot_path: snapshot.json}')
+            self.assertEqual(main(['-f', 'mkdocs.yml', '--snapshot']), 1)
+            self.assertFalse(Path('snapshot.json').exists())
+
+    def test_main_snapshot(self, get_package_infos):
+        with ChDir():
+            self._write_docs('{cache: false, snapshot_path: snapshot.json}')
+            self.assertEqual(main(['-f', 'mkdocs.yml', '--snapshot']), 0)
+            get_package_infos.assert_called_once()
+            self.assertEqual(set(read_snapshot('snapshot.json')), {snapshot_key('PEP631:dev')})
+            self.assertEqual(main(['-f', 'mkdocs.yml', '-o', 'other.json']), 0)
+            self.assertTrue(Path('other.json').exists())
+
+    def test_main_no_cache(self, get_package_infos):
+        with ChDir():
+            self._write_docs('cache: false')
+            with self.assertRaises(SystemExit):
+                main(['-f', 'mkdocs.yml'])
+            get_package_infos.assert_not_called()
+
+    def test_main_not_configured(self, get_package_infos):
+        with ChDir():
+            Path('mkdocs.yml').write_text('site_name: test\n')
+            with self.assertRaises(SystemExit):
+                main(['-f', 'mkdocs.yml'])
+            get_package_infos.assert_not_called()
+
+    @patch.object(LicenseResolver, 'prefetch')
+    def test_main_workers(self, prefetch, get_package_infos):
+        with ChDir():
+            self._write_docs()
+            self.assertEqual(main(['-f', 'mkdocs.yml', '-w', '4', '--worker-pool', 'thread']), 0)
+            prefetch.assert_called_once()
+            self.assertEqual(len(prefetch.call_args[0][0]), 2)
+            self.assertEqual(prefetch.call_args[1], {'workers': 4, 'pool': 'thread'})
+            get_package_infos.assert_called_once()
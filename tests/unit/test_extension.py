@@ -1,8 +1,34 @@
+import json
 import unittest
+from unittest.mock import patch
 
+from licensecheck.types import PackageInfo, ucstr
 from markdown import Markdown
 
+from mkdocs_licenseinfo import get_licenses
 from mkdocs_licenseinfo.extension import LicenseInfoExtension, LicenseInfoProcessor
+from mkdocs_licenseinfo.table import LicenseTables
+
+PACKAGE_INFOS = {
+    PackageInfo(
+        name='orjson',
+        version='3.9.10',
+        size=594514,
+        homePage='https://github.com/ijl/orjson',
+        author='ijl <ijl@mailbox.org>',
+        license=ucstr('APACHE SOFTWARE LICENSE;; MIT LICENSE'),
+        licenseCompat=True
+    ),
+    PackageInfo(
+        name='my_package_',
+        version='1.0',
+        size=1,
+        homePage='UNKNOWN',
+        author='*Someone*',
+        license=ucstr('BSD LICENSE'),
+        licenseCompat=True
+    ),
+}
 
 
 class LicenseInfoExtensionTestCase(unittest.TestCase):
@@ -16,3 +42,59 @@ class LicenseInfoExtensionTestCase(unittest.TestCase):
         ext = LicenseInfoExtension({'a': 1})
         ext.extendMarkdown(md)
         self.assertTrue(any([isinstance(proc, LicenseInfoProcessor) for proc in md.parser.blockprocessors]))
+
+    def test_extendMarkdown_inactive(self):
+        md = Markdown()
+        ext = LicenseInfoExtension({'a': 1})
+        ext.active = False
+        ext.extendMarkdown(md)
+        self.assertFalse(any([isinstance(proc, LicenseInfoProcessor) for proc in md.parser.blockprocessors]))
+
+    @patch.object(get_licenses, '_get_licensecheck_package_infos', return_value=PACKAGE_INFOS)
+    def test_render_tree(self, _):
+        # Building the elements gives the same result as parsing the markdown for the default template
+        for source in ['# Licenses\n\n::licenseinfo\n\nAfter', 'Before\n\n### ::licenseinfo\n    skip_packages: []\nAfter']:
+            with self.subTest(source=source):
+                expected = Markdown(extensions=[LicenseInfoExtension({})]).convert(source)
+                result = Markdown(extensions=[LicenseInfoExtension({'render': 'tree'})]).convert(source)
+                self.assertEqual(result, expected)
+
+    @patch.object(get_licenses, '_get_licensecheck_package_infos', return_value=PACKAGE_INFOS)
+    def test_render_tree_group_by(self, _):
+        for config in [{'group_by': 'license', 'sort_by': 'name'}, {'group_by': 'license_family'}]:
+            with self.subTest(config=config):
+                source = '# Licenses\n\n::licenseinfo\n\nAfter'
+                expected = Markdown(extensions=[LicenseInfoExtension(config)]).convert(source)
+                result = Markdown(extensions=[LicenseInfoExtension({**config, 'render': 'tree'})]).convert(source)
+                self.assertEqual(result, expected)
+                self.assertIn('<h2>', result)
+
+    @patch.object(get_licenses, '_get_licensecheck_package_infos', return_value=PACKAGE_INFOS)
+    def test_render_tree_group_template(self, _):
+        # A custom group template is rendered as markdown
+        result = Markdown(extensions=[LicenseInfoExtension({
+            'render': 'tree', 'group_by': 'license_family', 'group_template': '# {{group.name}} ({{group|length}})'
+        })]).convert('::licenseinfo')
+        self.assertIn('<h1>Permissive (2)</h1>', result)
+
+    @patch.object(get_licenses, '_get_licensecheck_package_infos', return_value=PACKAGE_INFOS)
+    def test_render_table_json(self, _):
+        tables = LicenseTables()
+        tables.page_url = 'licenses/'
+        result = Markdown(extensions=[LicenseInfoExtension({'render': 'table-json'}, tables=tables)]).convert('# Licenses\n\n::licenseinfo\n\nAfter')
+        path = next(iter(tables._tables))
+        self.assertEqual(result, (
+            '<h1>Licenses</h1>\n'
+            f'<div class="licenseinfo-table" data-src="../{path}" data-page-size="100"></div>\n'
+            '<script src="../assets/licenseinfo/licenseinfo-table.js" defer></script>\n'
+            '<p>After</p>'
+        ))
+        # The packages are only in the table data
+        self.assertNotIn('orjson', result)
+        self.assertEqual([u[0] for u in json.loads(tables._tables[path])['rows']], ['my_package_', 'orjson'])
+
+    @patch.object(get_licenses, '_get_licensecheck_package_infos', return_value=PACKAGE_INFOS)
+    def test_render_table_json_no_tables(self, _):
+        with self.assertLogs('mkdocs.plugins.mkdocs_licenseinfo', 'WARNING'):
+            result = Markdown(extensions=[LicenseInfoExtension({'render': 'table-json'})]).convert('::licenseinfo')
+        self.assertEqual(result, Markdown(extensions=[LicenseInfoExtension({})]).convert('::licenseinfo'))
@@ -1,117 +1,534 @@
 from datetime import datetime
+from email.message import Message
 from functools import wraps
+import inspect
+from pathlib import Path
 import sys
+import threading
 import unittest
-from unittest.mock import call, DEFAULT, patch
+from unittest.mock import call, DEFAULT, MagicMock, patch
 
-import licensecheck
+from licensecheck import get_deps
+from licensecheck.types import PackageInfo, ucstr
+from nskit.common.contextmanagers import ChDir
 
 from mkdocs_licenseinfo import get_licenses as gl_module
+from mkdocs_licenseinfo.cache import MetadataCache
 from mkdocs_licenseinfo.get_licenses import (
-    _split_licenses,
+    _get_licensecheck_package_infos,
+    DependencyGraph,
+    DistributionIndex,
     get_licenses,
-    LicenseCheckArgs,
-    UnclosableIO,
+    get_package_licenses,
+    get_requirements,
+    PackageInfoLookup,
+    PackageLicense,
+    resolve_licenses,
+    resolve_package_licenses,
+    select_packages,
 )
 
 
-class UnclosableIOTestCase(unittest.TestCase):
-
-    def test_close(self):
-        output = UnclosableIO()
-        self.assertFalse(output.closed)
-        output.close()
-        self.assertFalse(output.closed)
-
-    def test_force_close(self):
-        output = UnclosableIO()
-        self.assertFalse(output.closed)
-        output.force_close()
-        self.assertTrue(output.closed)
-
-
-class LicenseCheckArgsTestCase(unittest.TestCase):
-
-    def test_init_no_args(self):
-        args = LicenseCheckArgs()
-        self.assertEqual(args._using, 'PEP631')
-        self.assertEqual(args._format, 'json')
-        self.assertEqual(args._ignore_packages, [])
-        self.assertEqual(args._fail_packages, [])
-        self.assertEqual(args._skip_packages, [])
-        self.assertEqual(args._ignore_licenses, [])
-        self.assertEqual(args._fail_licenses, [])
-        self.assertIsInstance(args._output, UnclosableIO)
-        self.assertIsNone(args._stdout)
-
-    def test_init_args(self):
-        args = LicenseCheckArgs('a', 'b', 'c', 'd', 'e', 'f', 'g', 'h')
-        self.assertEqual(args._using, 'a')
-        self.assertEqual(args._format, 'b')
-        self.assertEqual(args._ignore_packages, 'c')
-        self.assertEqual(args._fail_packages, 'd')
-        self.assertEqual(args._skip_packages, 'e')
-        self.assertEqual(args._ignore_licenses, 'f')
-        self.assertEqual(args._fail_licenses, 'g')
-        self.assertNotIsInstance(args._output, UnclosableIO)
-        self.assertEqual(args._output, 'h')
-        self.assertIsNone(args._stdout)
-
-    def test_contextmanager(self):
-        args = LicenseCheckArgs('a', 'b', ['c', 'd'], ['e', 'f'], ['g', 'h'], ['i', 'j'], ['k', 'l'])
-        expected_args = [
-            'licensecheck',
-            '-u',
-            'a',
-            '--format',
-            'b',
-            '--ignore-packages',
-            'c',
-            '--ignore-packages',
-            'd',
-            '--fail-packages',
-            'e',
-            '--fail-packages',
-            'f',
-            '--skip-dependencies',
-            'g',
-            '--skip-dependencies',
-            'h',
-            '--ignore-licenses',
-            'i',
-            '--ignore-licenses',
-            'j',
-            '--fail-licenses',
-            'k',
-            '--fail-licenses',
-            'l'
-        ]
-        self.assertNotEqual(sys.argv, expected_args)
-        original_stdout = licensecheck.stdout
-        self.assertNotIsInstance(licensecheck.stdout, UnclosableIO)
-        with args:
-            self.assertEqual(sys.argv, expected_args)
-            self.assertIsInstance(licensecheck.stdout, UnclosableIO)
-            self.assertEqual(args._stdout, original_stdout)
-        self.assertNotEqual(sys.argv, expected_args)
-        self.assertEqual(licensecheck.stdout, original_stdout)
-        self.assertNotIsInstance(licensecheck.stdout, UnclosableIO)
-        self.assertFalse(args._output.closed)
+class PackageLicenseTestCase(unittest.TestCase):
+
+    def test_from_package_info(self):
+        package = PackageLicense.from_package_info(
+            PackageInfo(name='orjson', version='3.9.10', license=ucstr('APACHE SOFTWARE LICENSE;; MIT LICENSE')))
+        self.assertEqual(package.name, 'orjson')
+        self.assertEqual(package.namever, 'orjson-3.9.10')
+        self.assertEqual(package.licenses, ('APACHE SOFTWARE LICENSE', 'MIT LICENSE'))
+        self.assertFalse(hasattr(package, '__dict__'))
+
+    def test_as_dict(self):
+        package = PackageLicense.from_package_info(PackageInfo(name='a', license=ucstr('mit')))
+        self.assertEqual(package.as_dict(), {
+            'name': 'a',
+            'version': 'UNKNOWN',
+            'namever': 'a-UNKNOWN',
+            'size': -1,
+            'homePage': 'UNKNOWN',
+            'author': 'UNKNOWN',
+            'license': 'MIT',
+            'licenses': ['MIT'],
+            'licenseCompat': False,
+            'errorCode': 0,
+            'spdx': ['MIT'],
+            'license_family': 'Permissive'
+        })
+        self.assertEqual(PackageLicense.from_dict(package.as_dict()), package)
+
+    def test_normalized(self):
+        package = PackageLicense.from_dict({'name': 'a', 'license': 'BSD LICENSE;; MIT LICENSE'})
+        self.assertEqual(package.spdx, ('NOASSERTION', 'MIT'))
+        self.assertEqual(package.license_family, 'Permissive')
+        # Normalized from the licenses, not read from the dict
+        package = PackageLicense.from_dict({'name': 'a', 'license': 'GPLV3', 'spdx': ['MIT'], 'license_family': 'Unknown'})
+        self.assertEqual(package.spdx, ('GPL-3.0-only',))
+        self.assertEqual(package.license_family, 'Copyleft')
+
+    def test_from_dict_split(self):
+        package = PackageLicense.from_dict({'name': 'a', 'license': 'abc;; 123'})
+        self.assertEqual(package.licenses, ('abc', '123'))
+        self.assertEqual(package.namever, 'a-UNKNOWN')
+
+
+class SelectPackagesTestCase(unittest.TestCase):
+
+    def _packages(self, *names):
+        return [PackageLicense.from_dict({'name': u}) for u in names]
+
+    def test_select(self):
+        packages = self._packages('zope.interface', 'Aenum', 'my_package', 'orjson')
+        self.assertEqual(select_packages(packages), packages)
+        selected = select_packages(packages, [self._packages('My-Package'), self._packages('aenum', 'Zope_Interface')])
+        # The order is kept
+        self.assertEqual([u.name for u in selected], ['orjson'])
+        self.assertEqual([u.name for u in select_packages(packages, [self._packages('ORJSON')])], ['zope.interface', 'Aenum', 'my_package'])
+
+    def test_select_duplicates(self):
+        packages = self._packages('b', 'a', 'B', 'c', 'a')
+        self.assertEqual([u.name for u in select_packages(packages)], ['b', 'a', 'c'])
+
+    def test_select_generators(self):
+        packages = self._packages('a', 'b')
+        self.assertEqual([u.name for u in select_packages(iter(packages), iter([iter(packages[:1])]))], ['b'])
+
+
+class LicensecheckPackageInfosTestCase(unittest.TestCase):
+
+    @patch.object(gl_module.get_deps, 'getDepsWithLicenses', autospec=True, return_value=(None, {PackageInfo(name='a')}))
+    def test_options(self, get_deps_with_licenses):
+        original_argv = sys.argv[:]
+        with ChDir():
+            Path('project').mkdir()
+            Path('project', 'pyproject.toml').write_text(
+                '[tool.licensecheck]\nfail_packages = ["x"]\nignore_licenses = ["y"]\nusing = "poetry"')
+            cwd = Path.cwd()
+            package_infos = _get_licensecheck_package_infos('PEP631:dev', ['a', 'b'], None, ['c'], [], None, 'project')
+            self.assertEqual(Path.cwd(), cwd)
+        self.assertEqual(sys.argv, original_argv)
+        self.assertEqual({(u.name, u.licenseCompat) for u in package_infos}, {('a', True)})
+        # The options override the config, but empty/unset options use the config
+        get_deps_with_licenses.assert_called_once_with('PEP631:dev', ['A', 'B'], ['X'], ['Y'], [], ['C'])
+
+    @patch.object(gl_module.get_deps, 'getDepsWithLicenses', autospec=True, side_effect=ValueError('error'))
+    def test_error_resets_directory(self, _):
+        with ChDir():
+            Path('project').mkdir()
+            cwd = Path.cwd()
+            with self.assertRaises(ValueError):
+                _get_licensecheck_package_infos('PEP631', path='project')
+            self.assertEqual(Path.cwd(), cwd)
+
+    def test_get_deps_signature(self):
+        # getDepsWithLicenses is called positionally with these arguments (licensecheck 2024.1 adds onlyLicenses)
+        self.assertEqual(
+            list(inspect.signature(get_deps.getDepsWithLicenses).parameters),
+            ['using', 'ignorePackages', 'failPackages', 'ignoreLicenses', 'failLicenses', 'skipDependencies']
+        )
 
 
 class GetLicensesTestCase(unittest.TestCase):
 
-    def test_split_licenses_no_split(self):
-        package = {'license': 'a'}
-        _split_licenses(package)
-        self.assertEqual(package, {'license': 'a', 'licenses': ['a']})
-
-    @patch.object(gl_module, 'licensecheck', autospec=True)
-    def test_get_licenses(self, lc):
-        # Patch licensecheck
-        def cli(*args, **kwargs):
-            lc.stdout.write('{"packages": [{"a": 1, "license": "abc;; 123"}, {"b": 2, "license": "mit"}]}')
-        lc.cli.side_effect = cli
+    @patch.object(gl_module, '_get_licensecheck_package_infos')
+    def test_get_licenses(self, get_package_infos):
+        get_package_infos.return_value = {PackageInfo(name='b', license=ucstr('mit')),
+                                          PackageInfo(name='a', license=ucstr('abc;; 123'))}
         packages = get_licenses()
-        self.assertEqual(packages, [{'a': 1, 'license': 'abc;; 123', 'licenses': ['abc', '123']},
-                                    {'b': 2, 'license': 'mit', 'licenses': ['mit']}])
+        get_package_infos.assert_called_once_with('PEP631', None, None, None, None, None, None)
+        self.assertEqual([(u['name'], u['licenses']) for u in packages], [('a', ['ABC', '123']), ('b', ['MIT'])])
+
+    @patch.object(gl_module, '_get_licensecheck_package_infos')
+    def test_get_package_licenses(self, get_package_infos):
+        get_package_infos.return_value = {PackageInfo(name='a', license=ucstr('mit'))}
+        packages = get_package_licenses('PEP631:dev', skip_packages=['x'], path='a')
+        get_package_infos.assert_called_once_with('PEP631:dev', None, None, ['x'], None, None, 'a')
+        self.assertIsInstance(packages[0], PackageLicense)
+        self.assertEqual(packages[0].licenses, ('MIT',))
+
+    @patch.object(gl_module.get_deps, 'getReqs', return_value={'ZOPE-INTERFACE', 'MY-PACKAGE'})
+    @patch.object(gl_module.packageinfo, 'getMyPackageLicense', return_value='MIT')
+    @patch.object(gl_module.packageinfo, 'getPackages')
+    def test_get_licenses_normalized_packages(self, get_packages, _, get_reqs):
+        get_packages.return_value = {
+            PackageInfo(name='zope.interface', license=ucstr('GPLV3')),
+            PackageInfo(name='My_Package', license=ucstr('MIT LICENSE')),
+        }
+        with ChDir():
+            packages = get_licenses(ignore_packages=['Zope_Interface'], fail_packages=['my-package'], skip_packages=['Other.Package'])
+        self.assertEqual({u['name']: u['licenseCompat'] for u in packages}, {'zope.interface': True, 'My_Package': False})
+        get_reqs.assert_called_once_with('PEP631', ['OTHER-PACKAGE'])
+
+    @patch.object(gl_module, '_get_licensecheck_package_infos')
+    def test_get_licenses_cached(self, get_package_infos):
+        get_package_infos.return_value = {PackageInfo(name='b', license=ucstr('mit'))}
+        cache = MagicMock()
+        cache.key.return_value = 'abc'
+        cache.get.return_value = None
+        packages = get_licenses(cache=cache)
+        self.assertEqual([(u['name'], u['licenses']) for u in packages], [('b', ['MIT'])])
+        cache.key.assert_called_once_with(using='PEP631', ignore_packages=None, fail_packages=None, skip_packages=None,
+                                          ignore_licenses=None, fail_licenses=None, path=None, backend='licensecheck',
+                                          graph=False)
+        cache.set.assert_called_once_with('abc', packages)
+        get_package_infos.assert_called_once()
+        # Now a cache hit
+        cache.get.return_value = [{'name': 'c', 'license': 'MIT'}]
+        self.assertEqual(get_package_licenses(cache=cache), [PackageLicense.from_dict({'name': 'c', 'license': 'MIT'})])
+        get_package_infos.assert_called_once()
+
+    @patch.object(gl_module, 'resolve_package_licenses')
+    @patch.object(gl_module, '_get_licensecheck_package_infos')
+    def test_get_licenses_lookup(self, get_package_infos, resolve_package_licenses):
+        resolve_package_licenses.return_value = [PackageLicense.from_dict({'name': 'b', 'license': 'MIT'})]
+        lookup = PackageInfoLookup()
+        cache = MagicMock()
+        cache.key.return_value = 'abc'
+        cache.get.return_value = None
+        packages = get_licenses('PEP631:dev', skip_packages=['a'], lookup=lookup, cache=cache)
+        self.assertEqual([u['name'] for u in packages], ['b'])
+        resolve_package_licenses.assert_called_once_with('PEP631:dev', None, None, ['a'], None, None, path=None,
+                                                          lookup=lookup, backend='licensecheck', graph=None)
+        cache.set.assert_called_once_with('abc', packages)
+        get_package_infos.assert_not_called()
+
+    @patch.object(gl_module, 'resolve_package_licenses')
+    @patch.object(gl_module, '_get_licensecheck_package_infos')
+    def test_get_licenses_importlib(self, get_package_infos, resolve_package_licenses):
+        resolve_package_licenses.return_value = []
+        self.assertEqual(get_licenses(backend='importlib'), [])
+        resolve_package_licenses.assert_called_once_with('PEP631', None, None, None, None, None, path=None,
+                                                          lookup=None, backend='importlib', graph=None)
+        get_package_infos.assert_not_called()
+
+
+@patch.object(gl_module.packageinfo, 'getPackages', side_effect=lambda reqs: {PackageInfo(name=u) for u in reqs})
+class PackageInfoLookupTestCase(unittest.TestCase):
+
+    def test_get_shared(self, get_packages):
+        lookup = PackageInfoLookup()
+        first = lookup.get({ucstr('A'), ucstr('B')})
+        second = lookup.get({ucstr('B'), ucstr('C')})
+        self.assertEqual({u.name for u in first}, {'A', 'B'})
+        self.assertEqual({u.name for u in second}, {'B', 'C'})
+        self.assertEqual(get_packages.call_count, 3)
+        # Copies are returned
+        first_b, = [u for u in first if u.name == 'B']
+        first_b.licenseCompat = True
+        self.assertFalse([u for u in second if u.name == 'B'][0].licenseCompat)
+
+    def test_get_concurrent(self, get_packages):
+        lookup = PackageInfoLookup()
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_get_packages(reqs):
+            started.set()
+            release.wait(5)
+            return {PackageInfo(name=u) for u in reqs}
+        get_packages.side_effect = slow_get_packages
+        results = {}
+        thread = threading.Thread(target=lambda: results.update(first=lookup.get({ucstr('A')})))
+        thread.start()
+        started.wait(5)
+        waiting = threading.Thread(target=lambda: results.update(second=lookup.get({ucstr('A')})))
+        waiting.start()
+        release.set()
+        thread.join(5)
+        waiting.join(5)
+        get_packages.assert_called_once_with({'A'})
+        self.assertEqual([u.name for u in results['second']], ['A'])
+
+    def test_get_failed(self, get_packages):
+        lookup = PackageInfoLookup()
+        get_packages.side_effect = ModuleNotFoundError()
+        with self.assertRaises(ModuleNotFoundError):
+            lookup.get({ucstr('A')})
+        get_packages.side_effect = lambda reqs: {PackageInfo(name=u) for u in reqs}
+        self.assertEqual([u.name for u in lookup.get({ucstr('A')})], ['A'])
+
+    @patch.object(gl_module.metadata, 'distributions')
+    def test_get_metadata_cache(self, distributions, get_packages):
+        distributions.return_value = [_distribution('orjson'), _distribution('aenum', version='2.0')]
+        get_packages.side_effect = lambda reqs: {
+            PackageInfo(name=u.lower(), version={'ORJSON': '1.0', 'AENUM': '3.0'}.get(u, '0.1'), license=ucstr('MIT LICENSE'))
+            for u in reqs
+        }
+        with ChDir():
+            metadata_cache = MetadataCache('metadata.sqlite3')
+            first = PackageInfoLookup(metadata_cache).get({ucstr('ORJSON'), ucstr('AENUM'), ucstr('MISSING')})
+            self.assertEqual(get_packages.call_count, 3)
+            # Only the installed version is cached (aenum was looked up as a different version)
+            self.assertEqual(list(metadata_cache.get(['orjson==1.0', 'aenum==2.0', 'aenum==3.0'])), ['orjson==1.0'])
+            get_packages.reset_mock()
+            second = PackageInfoLookup(metadata_cache).get({ucstr('ORJSON')})
+            get_packages.assert_not_called()
+            self.assertEqual(second, {u for u in first if u.name == 'orjson'})
+            self.assertEqual(next(iter(second)).license, 'MIT LICENSE')
+            metadata_cache.close()
+
+
+def _distribution(name, version='1.0', requires_dist=(), classifiers=(), license=None, size=10):
+    distribution = MagicMock()
+    distribution.metadata = Message()
+    distribution.metadata['Name'] = name
+    distribution.metadata['Version'] = version
+    distribution.metadata['Home-page'] = f'https://{name}.com'
+    distribution.metadata['Author'] = 'Someone'
+    for requirement in requires_dist:
+        distribution.metadata['Requires-Dist'] = requirement
+    for classifier in classifiers:
+        distribution.metadata['Classifier'] = classifier
+    if license:
+        distribution.metadata['License'] = license
+    distribution.files = [MagicMock(size=size), MagicMock(size=None)]
+    return distribution
+
+
+class DistributionIndexTestCase(unittest.TestCase):
+
+    @patch.object(gl_module.metadata, 'distributions')
+    def test_index(self, distributions):
+        distributions.return_value = [
+            _distribution('Typing_Extensions', classifiers=['License :: OSI Approved :: Python Software Foundation License']),
+            _distribution('orjson', requires_dist=['a; extra == "x"'], license='MIT'),
+            _distribution('orjson', version='0.1'),
+        ]
+        index = DistributionIndex()
+        distributions.assert_called_once_with()
+        self.assertEqual(index.requires_dist('ORJSON'), ['a; extra == "x"'])
+        self.assertEqual(index.requires_dist('missing'), [])
+        package_infos = {u.name: u for u in index.get({ucstr('ORJSON'), ucstr('TYPING-EXTENSIONS'), ucstr('MISSING')})}
+        self.assertEqual(package_infos['orjson'].version, '1.0')
+        self.assertEqual(package_infos['orjson'].license, 'MIT')
+        self.assertEqual(package_infos['orjson'].homePage, 'https://orjson.com')
+        self.assertEqual(package_infos['orjson'].size, 10)
+        self.assertEqual(package_infos['Typing_Extensions'].license, 'PYTHON SOFTWARE FOUNDATION LICENSE')
+        self.assertEqual(package_infos['MISSING'].errorCode, 1)
+
+    @patch.object(gl_module.metadata, 'distributions')
+    def test_metadata_cache(self, distributions):
+        distributions.return_value = [_distribution('orjson', license='MIT')]
+        with ChDir():
+            metadata_cache = MetadataCache('metadata.sqlite3')
+            first = DistributionIndex(metadata_cache).get({ucstr('ORJSON'), ucstr('MISSING')})
+            self.assertEqual(len(metadata_cache), 1)
+            distributions.return_value[0].files = None
+            with patch.object(DistributionIndex, '_get_package_info') as get_package_info:
+                second = DistributionIndex(metadata_cache).get({ucstr('ORJSON')})
+            get_package_info.assert_not_called()
+            self.assertEqual(second, {u for u in first if u.name == 'orjson'})
+            self.assertEqual(next(iter(second)).size, 10)
+            metadata_cache.close()
+
+
+class DependencyGraphTestCase(unittest.TestCase):
+
+    @patch.object(gl_module, '_get_requires_dist')
+    def test_select(self, get_requires_dist):
+        get_requires_dist.side_effect = lambda name: {'ORJSON[EXTRA]': ['a', 'b; extra == "extra"']}.get(name, [])
+        with ChDir():
+            Path('project').mkdir()
+            Path('project', 'pyproject.toml').write_text(
+                '[project]\ndependencies = ["orjson[extra]"]\n[project.optional-dependencies]\ndev = ["nox"]\ntest = ["orjson"]')
+            graph = DependencyGraph('project')
+            self.assertEqual(graph.path, Path('project').resolve())
+            self.assertIsInstance(graph.lookup, PackageInfoLookup)
+            self.assertEqual(graph.select(), {'ORJSON', 'A', 'B'})
+            self.assertEqual(graph.select('PEP631:dev'), {'ORJSON', 'A', 'B', 'NOX'})
+            self.assertEqual(graph.select('PEP631:dev;test', ['NOX']), {'ORJSON', 'A', 'B'})
+        # Each edge is only read once
+        self.assertEqual(sorted(u[0][0] for u in get_requires_dist.call_args_list), ['NOX', 'ORJSON', 'ORJSON[EXTRA]'])
+
+    @patch.object(gl_module.metadata, 'distributions')
+    def test_importlib(self, distributions):
+        distributions.return_value = [_distribution('orjson', requires_dist=['aenum'])]
+        with ChDir():
+            Path('pyproject.toml').write_text('[project]\ndependencies = ["orjson"]')
+            graph = DependencyGraph(backend='importlib')
+            self.assertIsInstance(graph.lookup, DistributionIndex)
+            self.assertEqual(graph.select(), {'ORJSON', 'AENUM'})
+            with self.assertRaises(ValueError):
+                DependencyGraph(backend='other')
+
+    @patch.object(gl_module.packageinfo, 'getPackages')
+    def test_resolve_licenses_graph(self, get_packages):
+        graph = MagicMock()
+        graph.path = Path.cwd()
+        graph.pyproject = {'project': {'license': 'MIT'}}
+        graph.backend = 'licensecheck'
+        graph.select.return_value = {'ORJSON'}
+        graph.lookup.get.return_value = {PackageInfo(name='orjson', license=ucstr('MIT LICENSE'))}
+        packages = resolve_licenses('PEP631:dev', path='ignored', graph=graph)
+        graph.select.assert_called_once_with('PEP631:dev', [])
+        graph.lookup.get.assert_called_once_with({'ORJSON'})
+        get_packages.assert_not_called()
+        self.assertEqual(packages[0]['name'], 'orjson')
+
+
+class GetRequirementsTestCase(unittest.TestCase):
+
+    @property
+    def pyproject_toml(self):
+        return """
+[project]
+dependencies = ['aenum==3.1.15', 'orjson[extra]', 'other; python_version < "3"']
+[project.optional-dependencies]
+dev = ['nox']
+"""
+
+    @patch.object(gl_module, '_get_requires_dist')
+    def test_pep631(self, get_requires_dist):
+        get_requires_dist.side_effect = lambda name: {
+            'ORJSON[EXTRA]': ['a', 'b; extra == "extra"', 'c; extra == "other"', 'd; sys_platform == "win32"'],
+        }.get(name, [])
+        with ChDir():
+            Path('project').mkdir()
+            Path('project', 'pyproject.toml').write_text(self.pyproject_toml)
+            # As for licensecheck, only the extra markers are used
+            self.assertEqual(get_requirements(path='project'), {'AENUM', 'ORJSON', 'OTHER', 'A', 'B', 'D'})
+            self.assertEqual(
+                get_requirements('PEP631:dev', path='project'), {'AENUM', 'ORJSON', 'OTHER', 'A', 'B', 'D', 'NOX'}
+            )
+            # Requirements with extras aren't skipped (as they aren't by licensecheck)
+            self.assertEqual(
+                get_requirements('PEP631:dev', ['ORJSON', 'aenum'], path='project'), {'ORJSON', 'OTHER', 'A', 'B', 'D', 'NOX'}
+            )
+
+    @patch.object(gl_module, '_get_requires_dist', return_value=[])
+    def test_skip_normalized(self, _):
+        with ChDir():
+            Path('pyproject.toml').write_text("[project]\ndependencies = ['zope.interface', 'My_Package', 'aenum']")
+            self.assertEqual(get_requirements(), {'ZOPE-INTERFACE', 'MY-PACKAGE', 'AENUM'})
+            self.assertEqual(get_requirements(skip_packages=['Zope_Interface', 'my.package']), {'AENUM'})
+
+    @patch.object(gl_module, '_get_requires_dist', return_value=[])
+    def test_requirements(self, _):
+        with ChDir():
+            Path('project').mkdir()
+            Path('project', 'requirements.txt').write_text('# Comment\n-e .\naenum\n\norjson')
+            Path('project', 'requirements-dev.txt').write_text('nox')
+            self.assertEqual(get_requirements('requirements', path='project'), {'AENUM', 'ORJSON'})
+            self.assertEqual(get_requirements('requirements:requirements.txt;requirements-dev.txt', path='project'),
+                             {'AENUM', 'ORJSON', 'NOX'})
+            with self.assertRaises(RuntimeError):
+                get_requirements('requirements:missing.txt', path='project')
+
+    def test_missing_pyproject(self):
+        with ChDir():
+            with self.assertRaises(RuntimeError):
+                get_requirements()
+
+    def test_matches_licensecheck(self):
+        # Compare with licensecheck on this project (with the packages that aren't installed given fake PyPI metadata)
+        project = Path(__file__).parents[2]
+        response = MagicMock()
+        response.json.return_value = {'info': {'requires_dist': [
+            'x-dep', 'x-marker; python_version < "3"', 'x-extra; extra == "toml"', 'x-other; extra == "other"'
+        ]}}
+        with patch.object(gl_module.packageinfo.session, 'get', return_value=response):
+            for using in ['PEP631', 'PEP631:dev', 'PEP631:dev;dev-test;dev-docs', 'PEP631:dev-lint']:
+                with self.subTest(using=using), gl_module._working_directory(project):
+                    self.assertEqual(get_requirements(using, ['nox'], path=project), get_deps.getReqs(using, ['NOX']))
+
+
+class ResolveLicensesTestCase(unittest.TestCase):
+
+    def test_licensecheck_internals(self):
+        # The graph path calls these licensecheck internals directly (licensecheck is pinned for them)
+        def parameters(function):
+            return list(inspect.signature(function).parameters)
+
+        self.assertEqual(parameters(gl_module.license_matrix.licenseType), ['lice', 'ignoreLicenses'])
+        self.assertEqual(
+            parameters(gl_module.license_matrix.depCompatWMyLice), ['myLicense', 'depLice', 'ignoreLicenses', 'failLicenses']
+        )
+        self.assertEqual(parameters(gl_module.packageinfo.getPackages), ['reqs'])
+        self.assertEqual(parameters(gl_module.packageinfo.licenseFromClassifierlist), ['classifiers'])
+        self.assertTrue(callable(gl_module.packageinfo.session.get))
+        self.assertEqual(gl_module.JOINS, ';; ')
+        self.assertEqual(ucstr('mit'), 'MIT')
+
+    @patch.object(gl_module, 'get_requirements', return_value={'AENUM', 'ORJSON'})
+    @patch.object(gl_module.packageinfo, 'getPackages')
+    def test_resolve_licenses(self, get_packages, get_requirements):
+        get_packages.return_value = {
+            PackageInfo(name='orjson', version='3.9.10', license=ucstr('APACHE SOFTWARE LICENSE;; MIT LICENSE')),
+            PackageInfo(name='aenum', version='3.1.15', license=ucstr('GPLV3')),
+        }
+        original_argv = sys.argv[:]
+        with ChDir():
+            Path('project').mkdir()
+            Path('project', 'pyproject.toml').write_text(
+                '[project]\nlicense = {text="MIT"}\n[tool.licensecheck]\nfail_packages = ["orjson"]')
+            cwd = Path.cwd()
+            packages = resolve_licenses(path='project')
+            self.assertEqual(Path.cwd(), cwd)
+        self.assertEqual(sys.argv, original_argv)
+        get_requirements.assert_called_once()
+        self.assertEqual([u['name'] for u in packages], ['aenum', 'orjson'])
+        self.assertEqual(packages[1]['licenses'], ['APACHE SOFTWARE LICENSE', 'MIT LICENSE'])
+        self.assertEqual(packages[1]['namever'], 'orjson-3.9.10')
+        # orjson set to fail in the pyproject and GPL is incompatible with MIT
+        self.assertFalse(packages[0]['licenseCompat'])
+        self.assertFalse(packages[1]['licenseCompat'])
+
+    @patch.object(gl_module, 'get_requirements', return_value={'ORJSON'})
+    @patch.object(gl_module.packageinfo, 'getPackages')
+    def test_resolve_licenses_args(self, get_packages, get_requirements):
+        get_packages.return_value = {PackageInfo(name='orjson', license=ucstr('MIT LICENSE'))}
+        with ChDir():
+            Path('pyproject.toml').write_text('[project]\nlicense = {text="MIT"}\n[tool.licensecheck]\nfail_packages = ["orjson"]')
+            packages = resolve_licenses(using='PEP631:dev', fail_packages=[], skip_packages=['x'])
+        self.assertTrue(packages[0]['licenseCompat'])
+        self.assertEqual(get_requirements.call_args[0][:2], ('PEP631:dev', ['X']))
+
+    @patch.object(gl_module, 'get_requirements', return_value={'ZOPE-INTERFACE', 'MY-PACKAGE'})
+    @patch.object(gl_module.packageinfo, 'getPackages')
+    def test_resolve_licenses_normalized_packages(self, get_packages, get_requirements):
+        get_packages.return_value = {
+            PackageInfo(name='zope.interface', license=ucstr('GPLV3')),
+            PackageInfo(name='My_Package', license=ucstr('MIT LICENSE')),
+        }
+        with ChDir():
+            Path('pyproject.toml').write_text('[project]\nlicense = {text="MIT"}')
+            packages = resolve_licenses(ignore_packages=['Zope_Interface'], fail_packages=['my-package'])
+        self.assertEqual({u['name']: u['licenseCompat'] for u in packages}, {'zope.interface': True, 'My_Package': False})
+
+    @patch.object(gl_module, 'get_requirements', return_value={'ORJSON'})
+    @patch.object(gl_module.packageinfo, 'getPackages')
+    def test_resolve_licenses_lookup(self, get_packages, get_requirements):
+        lookup = MagicMock()
+        lookup.get.return_value = {PackageInfo(name='orjson', license=ucstr('MIT LICENSE'))}
+        with ChDir():
+            Path('pyproject.toml').write_text('[project]\nlicense = {text="MIT"}')
+            packages = resolve_licenses(lookup=lookup)
+        lookup.get.assert_called_once_with({'ORJSON'})
+        get_packages.assert_not_called()
+        self.assertEqual(packages[0]['name'], 'orjson')
+
+    @patch.object(gl_module, '_get_requires_dist')
+    @patch.object(gl_module.packageinfo, 'getPackages')
+    @patch.object(gl_module.metadata, 'distributions')
+    def test_resolve_licenses_importlib(self, distributions, get_packages, get_requires_dist):
+        distributions.return_value = [
+            _distribution('orjson', requires_dist=['aenum'], license='MIT'),
+            _distribution('aenum', classifiers=['License :: OSI Approved :: BSD License']),
+            _distribution('nox', license='Apache'),
+        ]
+        with ChDir():
+            Path('pyproject.toml').write_text('[project]\nlicense = {text="MIT"}\ndependencies = ["orjson", "missing"]')
+            packages = resolve_licenses(backend='importlib')
+        distributions.assert_called_once_with()
+        get_packages.assert_not_called()
+        get_requires_dist.assert_not_called()
+        self.assertEqual([(u['name'], u['licenses'], u['errorCode']) for u in packages],
+                         [('MISSING', ['UNKNOWN'], 1), ('aenum', ['BSD LICENSE'], 0), ('orjson', ['MIT'], 0)])
+        self.assertEqual(set(packages[1]), {'name', 'version', 'namever', 'size', 'homePage', 'author', 'license',
+                                            'licenseCompat', 'errorCode', 'licenses', 'spdx', 'license_family'})
+
+    def test_resolve_licenses_unknown_backend(self):
+        with ChDir():
+            Path('pyproject.toml').write_text('[project]\ndependencies = []')
+            with self.assertRaises(ValueError):
+                resolve_licenses(backend='other')
@@ -0,0 +1,84 @@
+import unittest
+
+from mkdocs_licenseinfo.get_licenses import PackageLicense
+from mkdocs_licenseinfo.grouping import group_packages, PackageGroup, sort_packages
+
+PACKAGES = [
+    PackageLicense.from_dict({'name': 'orjson', 'license': 'APACHE SOFTWARE LICENSE;; MIT LICENSE', 'author': 'ijl'}),
+    PackageLicense.from_dict({'name': 'Aenum', 'license': 'BSD LICENSE', 'author': 'Ethan Furman'}),
+    PackageLicense.from_dict({'name': 'chardet', 'license': 'LGPL', 'author': 'Dan Blanchard'}),
+    PackageLicense.from_dict({'name': 'b_pkg', 'license': 'mit license', 'author': ''}),
+    PackageLicense.from_dict({'name': 'b.pkg2', 'license': ''}),
+]
+
+
+def names(packages):
+    return [u.name for u in packages]
+
+
+class SortPackagesTestCase(unittest.TestCase):
+
+    def test_sort_none(self):
+        self.assertEqual(names(sort_packages(PACKAGES)), names(PACKAGES))
+
+    def test_sort_name(self):
+        self.assertEqual(names(sort_packages(PACKAGES, 'name')), ['Aenum', 'b_pkg', 'b.pkg2', 'chardet', 'orjson'])
+
+    def test_sort_license(self):
+        # Sorted on the (casefolded) licenses, then the normalized name
+        self.assertEqual(names(sort_packages(PACKAGES, 'license')), ['orjson', 'Aenum', 'chardet', 'b_pkg', 'b.pkg2'])
+
+    def test_sort_author(self):
+        self.assertEqual(names(sort_packages(PACKAGES, 'author')), ['chardet', 'Aenum', 'orjson', 'b_pkg', 'b.pkg2'])
+
+    def test_sort_license_family(self):
+        self.assertEqual(names(sort_packages(PACKAGES, 'license_family')), ['Aenum', 'b_pkg', 'orjson', 'b.pkg2', 'chardet'])
+
+    def test_sort_stable(self):
+        self.assertEqual(
+            names(sort_packages(reversed(PACKAGES), 'license_family')),
+            names(sort_packages(PACKAGES, 'license_family'))
+        )
+
+    def test_sort_unknown_key(self):
+        with self.assertRaises(ValueError):
+            sort_packages(PACKAGES, 'size')
+
+
+class GroupPackagesTestCase(unittest.TestCase):
+
+    def test_group_license(self):
+        groups = group_packages(PACKAGES, 'license', 'name')
+        self.assertEqual([(u.name, names(u.packages)) for u in groups], [
+            ('APACHE SOFTWARE LICENSE', ['orjson']),
+            ('BSD LICENSE', ['Aenum']),
+            ('LGPL', ['chardet']),
+            ('MIT LICENSE', ['orjson']),
+            ('mit license', ['b_pkg']),
+            ('UNKNOWN', ['b.pkg2']),
+        ])
+
+    def test_group_license_family(self):
+        groups = group_packages(PACKAGES, 'license_family', 'name')
+        self.assertEqual([(u.name, names(u.packages)) for u in groups], [
+            ('Permissive', ['Aenum', 'b_pkg', 'orjson']),
+            ('Unknown', ['b.pkg2']),
+            ('Weak Copyleft', ['chardet']),
+        ])
+        self.assertEqual(len(groups[0]), 3)
+
+    def test_group_keeps_order(self):
+        groups = group_packages(PACKAGES, 'license_family')
+        self.assertEqual(names(groups[0].packages), ['orjson', 'Aenum', 'b_pkg'])
+
+    def test_group_author(self):
+        groups = group_packages(PACKAGES, 'author')
+        self.assertEqual([u.name for u in groups], ['Dan Blanchard', 'Ethan Furman', 'ijl', 'UNKNOWN'])
+
+    def test_group_empty(self):
+        self.assertEqual(group_packages([], 'name'), [])
+
+    def test_group(self):
+        group = PackageGroup('MIT')
+        self.assertEqual(group.packages, [])
+        self.assertEqual(len(group), 0)
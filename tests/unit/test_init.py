@@ -0,0 +1,25 @@
+import unittest
+from unittest.mock import patch
+
+import mkdocs_licenseinfo
+
+
+class VersionTestCase(unittest.TestCase):
+
+    def test_version_lazy(self):
+        self.assertNotIn('__version__', vars(mkdocs_licenseinfo))
+        self.assertEqual(mkdocs_licenseinfo.__version__, mkdocs_licenseinfo.get_version())
+
+    def test_version_cached(self):
+        mkdocs_licenseinfo.get_version.cache_clear()
+        try:
+            with patch.object(mkdocs_licenseinfo, '__get_version', return_value='1.2.3') as get_version:
+                self.assertEqual(mkdocs_licenseinfo.__version__, '1.2.3')
+                self.assertEqual(mkdocs_licenseinfo.get_version(), '1.2.3')
+            get_version.assert_called_once_with()
+        finally:
+            mkdocs_licenseinfo.get_version.cache_clear()
+
+    def test_missing_attribute(self):
+        with self.assertRaises(AttributeError):
+            mkdocs_licenseinfo.missing
@@ -0,0 +1,96 @@
+import unittest
+
+from mkdocs_licenseinfo.licenses import license_family, LICENSE_FAMILIES, normalize_licenses, spdx_id
+
+
+class LicenseFamilyTestCase(unittest.TestCase):
+
+    def test_license_family(self):
+        for license, family in [
+            ('MIT LICENSE', 'Permissive'),
+            ('BSD-3-Clause', 'Permissive'),
+            ('APACHE SOFTWARE LICENSE', 'Permissive'),
+            ('PYTHON SOFTWARE FOUNDATION LICENSE', 'Permissive'),
+            ('ISC LICENSE (ISCL)', 'Permissive'),
+            ('GNU LESSER GENERAL PUBLIC LICENSE V3 (LGPLV3)', 'Weak Copyleft'),
+            ('MOZILLA PUBLIC LICENSE 2.0 (MPL 2.0)', 'Weak Copyleft'),
+            ('LGPL-2.1-or-later', 'Weak Copyleft'),
+            ('GNU GENERAL PUBLIC LICENSE V3 (GPLV3)', 'Copyleft'),
+            ('AGPL-3.0', 'Copyleft'),
+            ('THE UNLICENSE (UNLICENSE)', 'Public Domain'),
+            ('PUBLIC DOMAIN', 'Public Domain'),
+            ('CC0 1.0 UNIVERSAL', 'Public Domain'),
+            ('OTHER/PROPRIETARY LICENSE', 'Proprietary'),
+            ('UNKNOWN', 'Unknown'),
+            ('', 'Unknown'),
+            (None, 'Unknown'),
+        ]:
+            with self.subTest(license=license):
+                self.assertEqual(license_family(license), family)
+                self.assertIn(family, LICENSE_FAMILIES)
+
+    def test_license_family_words(self):
+        # Terms match whole words (with an optional version), not inside them
+        self.assertEqual(license_family('SUBMITTED LICENSE'), 'Unknown')
+        self.assertEqual(license_family('BSD3'), 'Permissive')
+        self.assertEqual(license_family('LGPLV2+'), 'Weak Copyleft')
+        self.assertEqual(license_family('UNLICENSED'), 'Proprietary')
+        self.assertEqual(license_family('MITRE'), 'Unknown')
+
+    def test_license_family_or(self):
+        # A choice of licenses takes the most permissive, as for normalize_licenses
+        self.assertEqual(license_family('MIT OR GPL-2.0-ONLY'), 'Permissive')
+        self.assertEqual(license_family('GPL-2.0-ONLY OR MIT'), normalize_licenses(('GPL-2.0-ONLY', 'MIT'))[1])
+        self.assertEqual(license_family('LGPL-3.0-ONLY OR SOMETHING ELSE'), 'Weak Copyleft')
+        self.assertEqual(license_family('(MIT OR APACHE-2.0) AND GPL-3.0-ONLY'), 'Copyleft')
+
+
+class SpdxIdTestCase(unittest.TestCase):
+
+    def test_spdx_id(self):
+        for license, expected in [
+            ('MIT LICENSE', 'MIT'),
+            ('MIT', 'MIT'),
+            ('BSD-3-CLAUSE', 'BSD-3-Clause'),
+            ('APACHE LICENSE 2.0', 'Apache-2.0'),
+            ('PYTHON SOFTWARE FOUNDATION LICENSE', 'PSF-2.0'),
+            ('GPL-3.0-OR-LATER', 'GPL-3.0-or-later'),
+            ('GNU LESSER GENERAL PUBLIC LICENSE V3 (LGPLV3)', 'LGPL-3.0-only'),
+            ('MOZILLA PUBLIC LICENSE 2.0 (MPL 2.0)', 'MPL-2.0'),
+            ('ISC LICENSE (ISCL)', 'ISC'),
+            ('CC0 1.0 UNIVERSAL (CC0 1.0) PUBLIC DOMAIN DEDICATION', 'CC0-1.0'),
+            # Trove classifier names
+            ('APACHE SOFTWARE LICENSE', 'Apache-2.0'),
+            ('ZLIB/LIBPNG LICENSE', 'Zlib'),
+            ('UNIVERSITY OF ILLINOIS/NCSA OPEN SOURCE LICENSE', 'NCSA'),
+            ('GNU AFFERO GENERAL PUBLIC LICENSE V3', 'AGPL-3.0-only'),
+            ('GNU AFFERO GENERAL PUBLIC LICENSE V3 OR LATER (AGPLV3+)', 'AGPL-3.0-or-later'),
+            ('BOOST SOFTWARE LICENSE 1.0 (BSL-1.0)', 'BSL-1.0'),
+            ('MIT OR APACHE-2.0', 'MIT OR Apache-2.0'),
+            ('(MIT OR APACHE-2.0) AND BSD-3-CLAUSE', '(MIT OR Apache-2.0) AND BSD-3-Clause'),
+            # Names that don't identify a version, or aren't known
+            ('BSD LICENSE', 'NOASSERTION'),
+            ('MIT OR SOMETHING ELSE', 'NOASSERTION'),
+            ('UNKNOWN', 'NOASSERTION'),
+            ('', 'NOASSERTION'),
+            (None, 'NOASSERTION'),
+        ]:
+            with self.subTest(license=license):
+                self.assertEqual(spdx_id(license), expected)
+
+    def test_spdx_id_memoized(self):
+        spdx_id.cache_clear()
+        spdx_id('MIT LICENSE')
+        spdx_id('MIT LICENSE')
+        self.assertEqual(spdx_id.cache_info().hits, 1)
+
+
+class NormalizeLicensesTestCase(unittest.TestCase):
+
+    def test_normalize_licenses(self):
+        self.assertEqual(normalize_licenses(('APACHE LICENSE 2.0', 'MIT LICENSE')), (('Apache-2.0', 'MIT'), 'Permissive'))
+
+    def test_normalize_licenses_most_permissive(self):
+        self.assertEqual(normalize_licenses(('GPLV3', 'MIT LICENSE'))[1], 'Permissive')
+        self.assertEqual(normalize_licenses(('GPLV3', 'UNKNOWN'))[1], 'Copyleft')
+        self.assertEqual(normalize_licenses(('UNKNOWN',)), (('NOASSERTION',), 'Unknown'))
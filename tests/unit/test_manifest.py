@@ -0,0 +1,86 @@
+import json
+from pathlib import Path
+import unittest
+
+from nskit.common.contextmanagers import ChDir
+
+from mkdocs_licenseinfo.get_licenses import PackageLicense
+from mkdocs_licenseinfo.manifest import LicenseManifest
+
+
+PACKAGES = [
+    PackageLicense.from_dict({
+        'name': 'Zope.Interface',
+        'version': '6.0',
+        'license': 'ZOPE PUBLIC LICENSE',
+        'homePage': 'https://github.com/zopefoundation/zope.interface',
+        'author': 'Zope Foundation',
+    }),
+    PackageLicense.from_dict({'name': 'aenum', 'version': '3.1.15', 'license': 'BSD LICENSE;; MIT LICENSE'}),
+]
+
+
+class LicenseManifestTestCase(unittest.TestCase):
+
+    def test_as_json(self):
+        manifest = LicenseManifest(PACKAGES, name='docs')
+        result = manifest.as_json()
+        self.assertEqual(result['name'], 'docs')
+        self.assertEqual([u['name'] for u in result['packages']], ['aenum', 'Zope.Interface'])
+        self.assertEqual(result['packages'][0]['licenses'], ['BSD LICENSE', 'MIT LICENSE'])
+
+    def test_sorted_normalized(self):
+        # Sorted on the PEP 503 normalized names (zope-a < zope-interface)
+        packages = [PackageLicense.from_dict({'name': 'zope_a'}), *PACKAGES]
+        manifest = LicenseManifest(packages)
+        self.assertEqual([u.name for u in manifest.packages], ['aenum', 'zope_a', 'Zope.Interface'])
+
+    def test_as_cyclonedx(self):
+        result = LicenseManifest(PACKAGES).as_cyclonedx()
+        self.assertEqual(result['bomFormat'], 'CycloneDX')
+        self.assertEqual(result['specVersion'], '1.5')
+        aenum, zope = result['components']
+        self.assertEqual(aenum['purl'], 'pkg:pypi/aenum@3.1.15')
+        # The SPDX identifier where it is known
+        self.assertEqual(aenum['licenses'], [{'license': {'name': 'BSD LICENSE'}}, {'license': {'id': 'MIT'}}])
+        self.assertNotIn('author', aenum)
+        self.assertNotIn('externalReferences', aenum)
+        self.assertEqual(zope['purl'], 'pkg:pypi/zope-interface@6.0')
+        self.assertEqual(zope['author'], 'Zope Foundation')
+        self.assertEqual(zope['externalReferences'], [{'type': 'website', 'url': 'https://github.com/zopefoundation/zope.interface'}])
+
+    def test_as_spdx(self):
+        result = LicenseManifest(PACKAGES, name='my docs').as_spdx()
+        self.assertEqual(result['spdxVersion'], 'SPDX-2.3')
+        self.assertTrue(result['documentNamespace'].startswith('https://spdx.org/spdxdocs/my-docs-'))
+        aenum, zope = result['packages']
+        self.assertEqual(aenum['SPDXID'], 'SPDXRef-Package-aenum-3.1.15')
+        self.assertEqual(aenum['licenseComments'], 'BSD LICENSE, MIT LICENSE')
+        self.assertEqual(aenum['licenseDeclared'], 'NOASSERTION')
+        self.assertEqual(zope['homepage'], 'https://github.com/zopefoundation/zope.interface')
+        self.assertEqual(zope['supplier'], 'Person: Zope Foundation')
+
+    def test_spdx_ids(self):
+        packages = [
+            PackageLicense.from_dict({'name': 'a', 'license': 'MIT LICENSE'}),
+            PackageLicense.from_dict({'name': 'b', 'license': 'MIT OR APACHE-2.0'}),
+        ]
+        manifest = LicenseManifest(packages)
+        a, b = manifest.as_cyclonedx()['components']
+        self.assertEqual(a['licenses'], [{'license': {'id': 'MIT'}}])
+        self.assertEqual(b['licenses'], [{'expression': 'MIT OR Apache-2.0'}])
+        a, b = manifest.as_spdx()['packages']
+        self.assertEqual(a['licenseDeclared'], 'MIT')
+        self.assertEqual(b['licenseDeclared'], 'MIT OR Apache-2.0')
+
+    def test_write(self):
+        manifest = LicenseManifest(PACKAGES)
+        with ChDir():
+            paths = manifest.write('site')
+            self.assertEqual([u.name for u in paths], ['licenseinfo.json', 'licenseinfo.cdx.json', 'licenseinfo.spdx.json'])
+            self.assertEqual(json.loads(Path('site', 'licenseinfo.json').read_text()), manifest.as_json())
+
+    def test_write_unknown_format(self):
+        with ChDir():
+            with self.assertRaises(ValueError):
+                LicenseManifest(PACKAGES).write('site', ['xml'])
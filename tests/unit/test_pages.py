@@ -0,0 +1,112 @@
+from pathlib import Path
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from mkdocs.config.defaults import MkDocsConfig
+from mkdocs.structure.files import File
+
+from mkdocs_licenseinfo.get_licenses import PackageLicense
+from mkdocs_licenseinfo.pages import generated_file, render_pages, split_packages
+
+
+def _package(name, *licenses):
+    return PackageLicense.from_dict({'name': name, 'version': '1.0', 'license': ';; '.join(licenses)})
+
+
+class SplitPackagesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.packages = [_package('orjson', 'MIT LICENSE', 'APACHE SOFTWARE LICENSE'), _package('aenum', 'BSD LICENSE'),
+                         _package('_private'), _package('Attrs', 'MIT LICENSE')]
+
+    def _names(self, pages):
+        return {slug: (title, [u.name for u in packages]) for slug, (title, packages) in pages.items()}
+
+    def test_letter(self):
+        pages = split_packages(self.packages, 'letter')
+        self.assertEqual(list(pages), ['a', 'o', 'other'])
+        self.assertEqual(self._names(pages)['a'], ('A', ['aenum', 'Attrs']))
+        self.assertEqual(self._names(pages)['other'], ('Other', ['_private']))
+
+    def test_license(self):
+        pages = self._names(split_packages(self.packages, 'license'))
+        self.assertEqual(list(pages), ['apache-software-license', 'bsd-license', 'mit-license', 'unknown'])
+        self.assertEqual(pages['mit-license'], ('MIT LICENSE', ['Attrs', 'orjson']))
+        self.assertEqual(pages['unknown'], ('UNKNOWN', ['_private']))
+
+    def test_license_slug_collision(self):
+        packages = [_package('a', 'APACHE 2.0'), _package('b', 'APACHE-2.0'), _package('c', 'INDEX')]
+        pages = self._names(split_packages(packages, 'license'))
+        self.assertEqual(pages, {
+            'apache-2-0': ('APACHE 2.0', ['a']),
+            'apache-2-0-2': ('APACHE-2.0', ['b']),
+            # Not the index page
+            'index-2': ('INDEX', ['c']),
+        })
+        self.assertEqual(len(render_pages(packages, 'license')), 4)
+
+    def test_license_family(self):
+        packages = [*self.packages, _package('gpl', 'GPLV3'), _package('either', 'MIT OR GPL-2.0-ONLY')]
+        pages = self._names(split_packages(packages, 'license_family'))
+        self.assertEqual(list(pages), ['permissive', 'copyleft', 'unknown'])
+        self.assertEqual(pages['permissive'], ('Permissive', ['aenum', 'Attrs', 'either', 'orjson']))
+        self.assertEqual(pages['copyleft'], ('Copyleft', ['gpl']))
+        self.assertEqual(pages['unknown'], ('Unknown', ['_private']))
+
+    def test_count(self):
+        pages = self._names(split_packages(self.packages, 'count', 3))
+        self.assertEqual(pages, {
+            'page-1': ('Packages 1-3', ['_private', 'aenum', 'Attrs']),
+            'page-2': ('Packages 4-4', ['orjson'])
+        })
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            split_packages(self.packages, 'size')
+
+
+class RenderPagesTestCase(unittest.TestCase):
+
+    def test_render_pages(self):
+        packages = [_package(f'p{u:03d}', 'MIT LICENSE') for u in range(150)]
+        pages = render_pages(packages, 'count', 120, title='Deps', package_template='# {{package.name}}')
+        self.assertEqual(list(pages), ['index.md', 'page-1.md', 'page-2.md'])
+        self.assertEqual(pages['index.md'], '# Deps\n\n* [Packages 1-120](page-1.md) (120 packages)\n* [Packages 121-150](page-2.md) (30 packages)\n')
+        # Rendered in chunks, joined in the same way as the blocks
+        self.assertEqual(pages['page-1.md'], '# Packages 1-120\n\n' + '\n\n'.join(f'## p{u:03d}' for u in range(120)) + '\n')
+
+    def test_render_pages_other(self):
+        pages = render_pages([_package('_private', 'MIT LICENSE')], package_template='# {{package.name}}')
+        self.assertEqual(pages['index.md'], '# Licenses\n\n* [Other](other.md) (1 package)\n')
+        self.assertEqual(pages['other.md'], '# Other\n\n## _private\n')
+
+    def test_render_pages_sort_by(self):
+        packages = [_package('a', 'MIT LICENSE'), _package('b', 'BSD LICENSE'), _package('c', 'APACHE LICENSE')]
+        pages = render_pages(packages, 'count', package_template='{{package.name}}', sort_by='license')
+        self.assertEqual(pages['page-1.md'], '# Packages 1-3\n\nc\n\nb\n\na\n')
+
+
+class GeneratedFileTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.config = MkDocsConfig()
+        self.config.load_dict({'site_name': 'test', 'docs_dir': '.', 'site_dir': 'site'})
+        self.config.validate()
+        # Set when the plugin events are run
+        self.config.plugins._current_plugin = 'mkdocs_licenseinfo'
+
+    @unittest.skipUnless(hasattr(File, 'generated'), 'mkdocs < 1.6')
+    def test_generated(self):
+        file = generated_file(self.config, 'licenses/index.md', '# Licenses')
+        self.assertEqual(file.content_string, '# Licenses')
+        self.assertIsNone(file.abs_src_path)
+
+    def test_fallback(self):
+        with tempfile.TemporaryDirectory() as tmp, patch.object(File, 'generated', create=True):
+            del File.generated
+            file = generated_file(self.config, 'licenses/index.md', '# Licenses', tmp)
+            self.assertEqual(Path(file.abs_src_path).read_text(), '# Licenses')
+            self.assertEqual(file.src_uri, 'licenses/index.md')
+            with self.assertRaises(ValueError):
+                generated_file(self.config, 'licenses/index.md', '# Licenses')
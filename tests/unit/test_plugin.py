@@ -1,9 +1,18 @@
+import json
+from pathlib import Path
+import subprocess  # nosec: B404
+import sys
 import unittest
+from unittest.mock import MagicMock, patch
 
 from mkdocs.config.base import ValidationError
 from mkdocs.config.defaults import MkDocsConfig
+from mkdocs.structure.files import get_files
 from nskit.common.contextmanagers import ChDir, Env
 
+from mkdocs_licenseinfo import get_licenses as gl_module
+from mkdocs_licenseinfo.cache import LicenseCache, MetadataCache
+from mkdocs_licenseinfo.get_licenses import PackageLicense
 from mkdocs_licenseinfo.plugin import LicenseInfoExtension, MkdocsLicenseInfoPlugin
 
 
@@ -20,7 +29,34 @@ class MkdocsLicenseInfoPluginTestCase(unittest.TestCase):
             'fail_licenses': None,
             'requirements_path': None,
             'package_template': None,
-            'enabled': True}
+            'enabled': True,
+            'cache': True,
+            'cache_dir': None,
+            'cache_max_age': 7,
+            'cache_max_entries': 64,
+            'metadata_cache': True,
+            'metadata_cache_path': None,
+            'metadata_cache_max_entries': 10000,
+            'workers': 1,
+            'worker_pool': 'process',
+            'backend': 'licensecheck',
+            'profile': False,
+            'profile_report': None,
+            'manifest': False,
+            'manifest_using': None,
+            'manifest_formats': ['json', 'cyclonedx'],
+            'snapshot_path': None,
+            'render': 'markdown',
+            'table_page_size': 100,
+            'scan_pages': True,
+            'sort_by': None,
+            'group_by': None,
+            'group_template': None,
+            'pages': None,
+            'pages_size': 200,
+            'pages_dir': 'licenses',
+            'pages_using': None,
+            'pages_title': 'Licenses'}
         self.assertEqual(plugin.config, expected)
         self.assertEqual(resp, ([], []))
 
@@ -34,7 +70,34 @@ class MkdocsLicenseInfoPluginTestCase(unittest.TestCase):
             'fail_licenses': ['i', 'j'],
             'requirements_path': 'x',
             'package_template': 'a',
-            'enabled': False})
+            'enabled': False,
+            'cache': False,
+            'cache_dir': 'y',
+            'cache_max_age': 1,
+            'cache_max_entries': 2,
+            'metadata_cache': False,
+            'metadata_cache_path': 'm.sqlite3',
+            'metadata_cache_max_entries': 3,
+            'workers': 4,
+            'worker_pool': 'thread',
+            'backend': 'importlib',
+            'profile': True,
+            'profile_report': 'z',
+            'manifest': True,
+            'manifest_using': 'PEP631:dev',
+            'manifest_formats': ['spdx'],
+            'snapshot_path': 's',
+            'render': 'table-json',
+            'table_page_size': 50,
+            'scan_pages': False,
+            'sort_by': 'license',
+            'group_by': 'license_family',
+            'group_template': '# {{group.name}} ({{group.packages|length}})',
+            'pages': 'count',
+            'pages_size': 10,
+            'pages_dir': 'deps',
+            'pages_using': 'PEP631:dev',
+            'pages_title': 'Dependencies'})
         expected = {
             'ignore_packages': ['a', 'b'],
             'fail_packages': ['c', 'd'],
@@ -43,7 +106,34 @@ class MkdocsLicenseInfoPluginTestCase(unittest.TestCase):
             'fail_licenses': ['i', 'j'],
             'requirements_path': 'x',
             'package_template': 'a',
-            'enabled': False}
+            'enabled': False,
+            'cache': False,
+            'cache_dir': 'y',
+            'cache_max_age': 1,
+            'cache_max_entries': 2,
+            'metadata_cache': False,
+            'metadata_cache_path': 'm.sqlite3',
+            'metadata_cache_max_entries': 3,
+            'workers': 4,
+            'worker_pool': 'thread',
+            'backend': 'importlib',
+            'profile': True,
+            'profile_report': 'z',
+            'manifest': True,
+            'manifest_using': 'PEP631:dev',
+            'manifest_formats': ['spdx'],
+            'snapshot_path': 's',
+            'render': 'table-json',
+            'table_page_size': 50,
+            'scan_pages': False,
+            'sort_by': 'license',
+            'group_by': 'license_family',
+            'group_template': '# {{group.name}} ({{group.packages|length}})',
+            'pages': 'count',
+            'pages_size': 10,
+            'pages_dir': 'deps',
+            'pages_using': 'PEP631:dev',
+            'pages_title': 'Dependencies'}
         self.assertEqual(plugin.config, expected)
         self.assertEqual(resp, ([], []))
 
@@ -92,8 +182,316 @@ class MkdocsLicenseInfoPluginTestCase(unittest.TestCase):
             'fail_licenses': None,
             'requirements_path': None,
             'package_template': None,
-            'enabled': True}
+            'enabled': True,
+            'cache': True,
+            'cache_dir': None,
+            'cache_max_age': 7,
+            'cache_max_entries': 64,
+            'metadata_cache': True,
+            'metadata_cache_path': None,
+            'metadata_cache_max_entries': 10000,
+            'workers': 1,
+            'worker_pool': 'process',
+            'backend': 'licensecheck',
+            'profile': False,
+            'profile_report': None,
+            'manifest': False,
+            'manifest_using': None,
+            'manifest_formats': ['json', 'cyclonedx'],
+            'snapshot_path': None,
+            'render': 'markdown',
+            'table_page_size': 100,
+            'scan_pages': True,
+            'sort_by': None,
+            'group_by': None,
+            'group_template': None,
+            'pages': None,
+            'pages_size': 200,
+            'pages_dir': 'licenses',
+            'pages_using': None,
+            'pages_title': 'Licenses'}
         self.assertEqual(ext._config, expected)
+        self.assertIs(ext._resolver, plugin._resolver)
+        self.assertIsInstance(ext._resolver.cache, LicenseCache)
+        self.assertEqual(ext._resolver.cache.directory, Path.cwd() / '.cache' / 'mkdocs_licenseinfo')
+
+    def test_on_config_no_cache(self):
+        plugin = MkdocsLicenseInfoPlugin()
+        config = MkDocsConfig()
+        plugin.load_config({'cache': False})
+        plugin.on_config(config)
+        self.assertIsNone(config.markdown_extensions[-1]._resolver.cache)
+        self.assertIsNone(plugin._resolver.metadata_cache)
+
+    def test_on_config_metadata_cache(self):
+        with ChDir():
+            config = MkDocsConfig()
+            plugin = MkdocsLicenseInfoPlugin()
+            plugin.load_config({'metadata_cache_path': 'm.sqlite3', 'metadata_cache_max_entries': 3})
+            plugin.on_config(config)
+            metadata_cache = plugin._resolver.metadata_cache
+            self.assertIsInstance(metadata_cache, MetadataCache)
+            self.assertEqual(metadata_cache.path, Path.cwd() / 'm.sqlite3')
+            self.assertEqual(metadata_cache.max_entries, 3)
+            metadata_cache.set({'a==1': {'name': 'a'}})
+            # The previous connection is closed on the next build
+            plugin.on_config(config)
+            self.assertIsNone(metadata_cache._connection)
+            self.assertIsNot(plugin._resolver.metadata_cache, metadata_cache)
+            plugin._resolver.metadata_cache.close()
+
+    def test_metadata_cache_graph_only(self):
+        with ChDir():
+            config = MkDocsConfig()
+            config.load_dict({'site_name': 'test'})
+            config.validate()
+            plugin = MkdocsLicenseInfoPlugin()
+            plugin.load_config({'cache_dir': 'cache', 'metadata_cache_path': 'm.sqlite3'})
+            plugin.on_config(config)
+            plugin.on_pre_build(config)
+            # The licensecheck CLI path doesn't use the metadata cache, so the database isn't created
+            with patch.object(gl_module, '_get_licensecheck_package_infos', return_value=set()):
+                self.assertEqual(plugin._resolver.get_package_licenses(), [])
+            plugin.on_config(config)
+            self.assertFalse(Path('m.sqlite3').exists())
+
+    def test_on_config_metadata_cache_disabled(self):
+        plugin = MkdocsLicenseInfoPlugin()
+        config = MkDocsConfig()
+        plugin.load_config({'metadata_cache': False})
+        plugin.on_config(config)
+        self.assertIsInstance(plugin._resolver.cache, LicenseCache)
+        self.assertIsNone(plugin._resolver.metadata_cache)
+
+    def test_on_pre_build(self):
+        plugin = MkdocsLicenseInfoPlugin()
+        plugin._resolver._results[('a',)] = []
+        plugin._resolver.hits = 1
+        plugin.on_pre_build(MkDocsConfig())
+        self.assertEqual(plugin._resolver._results, {})
+        self.assertEqual(plugin._resolver.hits, 0)
+
+    def test_on_post_build(self):
+        plugin = MkdocsLicenseInfoPlugin()
+        plugin._resolver.hits = 2
+        plugin._resolver.misses = 1
+        with self.assertLogs('mkdocs.plugins.mkdocs_licenseinfo', level='DEBUG') as logs:
+            plugin.on_post_build(MkDocsConfig())
+        self.assertIn('2 hits, 1 misses', logs.output[0])
+
+    def test_on_config_replaces_extension(self):
+        plugin = MkdocsLicenseInfoPlugin()
+        config = MkDocsConfig()
+        plugin.load_config({})
+        plugin.on_config(config)
+        plugin.on_config(config)
+        self.assertEqual(len([u for u in config.markdown_extensions if isinstance(u, LicenseInfoExtension)]), 1)
+
+    def test_on_serve(self):
+        with ChDir():
+            Path('docs').mkdir()
+            plugin = MkdocsLicenseInfoPlugin()
+            config = MkDocsConfig()
+            config.docs_dir = 'docs'
+            plugin.load_config({})
+            plugin.on_config(config)
+            plugin._resolver._previous_results[('a',)] = ({
+                str(Path('pyproject.toml').resolve()): (0, 0, ''),
+                str(Path('docs', 'requirements.txt').resolve()): (0, 0, '')
+            }, [])
+            server = MagicMock()
+            self.assertEqual(plugin.on_serve(server, config=config, builder=None), server)
+            server.watch.assert_called_once_with(str(Path('pyproject.toml').resolve()), recursive=False)
+            # New sources are watched after the build
+            plugin._resolver._previous_results[('b',)] = ({str(Path('requirements.txt').resolve()): (0, 0, '')}, [])
+            plugin.on_post_build(config)
+            self.assertEqual(server.watch.call_count, 2)
+            server.watch.assert_called_with(str(Path('requirements.txt').resolve()), recursive=False)
+            plugin.on_post_build(config)
+            self.assertEqual(server.watch.call_count, 2)
+
+    def test_on_files(self):
+        with ChDir():
+            Path('docs').mkdir()
+            Path('docs', 'index.md').write_text('# Index\n\n::licenseinfo\n    using: PEP631:dev\n    diff: PEP631\n\n::licenseinfo\n    using: [')
+            Path('docs', 'other.md').write_text('## ::licenseinfo\n\n::licenseinfo\n    diff: [requirements, poetry]')
+            config = MkDocsConfig()
+            config.load_dict({'site_name': 'test', 'docs_dir': 'docs'})
+            config.validate()
+            files = get_files(config)
+            plugin = MkdocsLicenseInfoPlugin()
+            plugin.load_config({'workers': 2, 'worker_pool': 'thread', 'skip_packages': ['a']})
+            with patch.object(plugin._resolver, 'prefetch') as prefetch:
+                self.assertEqual(plugin.on_files(files, config), files)
+            specs = sorted(prefetch.call_args[0][0], key=lambda u: str(u['using']))
+            spec = {'ignore_packages': None, 'fail_packages': None, 'skip_packages': ['a'], 'ignore_licenses': None, 'fail_licenses': None, 'path': None, 'backend': 'licensecheck', 'snapshot_path': None}
+            self.assertEqual(specs, [
+                {**spec, 'using': None}, {**spec, 'using': None}, {**spec, 'using': 'PEP631'}, {**spec, 'using': 'PEP631:dev'},
+                {**spec, 'using': 'poetry'}, {**spec, 'using': 'requirements'}
+            ])
+            self.assertEqual(prefetch.call_args[1], {'workers': 2, 'pool': 'thread'})
+
+    def test_on_config_use_graph(self):
+        for options, use_graph in [
+            ({}, False),
+            ({'workers': 2}, False),
+            ({'workers': 2, 'worker_pool': 'thread'}, True),
+            ({'worker_pool': 'thread'}, False),
+        ]:
+            with self.subTest(options=options), ChDir():
+                config = MkDocsConfig()
+                config.load_dict({'site_name': 'test'})
+                config.validate()
+                plugin = MkdocsLicenseInfoPlugin()
+                plugin.load_config({'cache': False, **options})
+                plugin.on_config(config)
+                self.assertEqual(plugin._resolver.use_graph, use_graph)
+
+    def test_on_post_build_profile(self):
+        with ChDir():
+            Path('mkdocs.yml').write_text('')
+            config = MkDocsConfig(config_file_path='mkdocs.yml')
+            config.load_dict({'site_name': 'test'})
+            config.validate()
+            plugin = MkdocsLicenseInfoPlugin()
+            plugin.load_config({'cache': False, 'profile': True, 'profile_report': 'reports/profile.json'})
+            plugin.on_config(config)
+            plugin.on_pre_build(config)
+            page = MagicMock()
+            page.file.src_uri = 'index.md'
+            self.assertEqual(plugin.on_page_markdown('abc', page, config, None), 'abc')
+            plugin._profiler.block()
+            plugin._profiler.record('resolve', 0.5, 'index.md')
+            plugin.on_post_build(config)
+            profile = json.loads(Path('reports', 'profile.json').read_text())
+            self.assertEqual(profile['pages']['index.md'], {'blocks': 1, 'stages': {'resolve': 0.5}})
+
+    def test_on_post_build_profile_disabled(self):
+        with ChDir():
+            config = MkDocsConfig()
+            config.load_dict({'site_name': 'test'})
+            config.validate()
+            plugin = MkdocsLicenseInfoPlugin()
+            plugin.load_config({'cache': False, 'profile_report': 'profile.json'})
+            plugin.on_config(config)
+            self.assertFalse(plugin._profiler.enabled)
+            plugin.on_post_build(config)
+            self.assertFalse(Path('profile.json').exists())
+
+    def test_manifest(self):
+        with ChDir():
+            Path('docs').mkdir()
+            config = MkDocsConfig()
+            config.load_dict({'site_name': 'test', 'docs_dir': 'docs', 'site_dir': 'site'})
+            config.validate()
+            plugin = MkdocsLicenseInfoPlugin()
+            plugin.load_config({'cache': False, 'manifest': True, 'manifest_using': 'PEP631:dev', 'skip_packages': ['b'], 'manifest_formats': ['json', 'spdx']})
+            plugin.on_config(config)
+            self.assertTrue(plugin._resolver.use_graph)
+            plugin.on_pre_build(config)
+            packages = [PackageLicense.from_dict({'name': 'a', 'license': 'MIT LICENSE'})]
+            with patch.object(plugin._resolver, 'get_package_licenses', return_value=packages) as get_package_licenses:
+                plugin.on_files(get_files(config), config)
+            self.assertEqual(get_package_licenses.call_args[1]['using'], 'PEP631:dev')
+            self.assertEqual(get_package_licenses.call_args[1]['skip_packages'], ['b'])
+            plugin.on_post_build(config)
+            self.assertEqual(json.loads(Path('site', 'licenseinfo.json').read_text())['packages'], [packages[0].as_dict()])
+            self.assertTrue(Path('site', 'licenseinfo.spdx.json').exists())
+            self.assertFalse(Path('site', 'licenseinfo.cdx.json').exists())
+
+    def test_pages(self):
+        with ChDir():
+            Path('docs').mkdir()
+            Path('docs', 'index.md').write_text('# Home')
+            config = MkDocsConfig()
+            config.load_dict({'site_name': 'test', 'docs_dir': 'docs', 'site_dir': 'site'})
+            config.validate()
+            config.plugins._current_plugin = 'mkdocs_licenseinfo'
+            plugin = MkdocsLicenseInfoPlugin()
+            plugin.load_config({'cache': False, 'pages': 'letter', 'pages_using': 'PEP631:dev', 'package_template': '# {{package.name}}'})
+            plugin.on_config(config)
+            plugin.on_pre_build(config)
+            packages = [PackageLicense.from_dict({'name': u, 'license': 'MIT LICENSE'}) for u in ('b', 'a', 'ab')]
+            with patch.object(plugin._resolver, 'get_package_licenses', return_value=packages) as get_package_licenses:
+                files = plugin.on_files(get_files(config), config)
+            get_package_licenses.assert_called_once()
+            self.assertEqual(get_package_licenses.call_args[1]['using'], 'PEP631:dev')
+            self.assertEqual(
+                [u.src_uri for u in files.documentation_pages()],
+                ['index.md', 'licenses/index.md', 'licenses/a.md', 'licenses/b.md']
+            )
+            self.assertEqual(files.get_file_from_path('licenses/a.md').content_string, '# A\n\n## a\n\n## ab\n')
+            self.assertIn('* [B](b.md) (1 package)', files.get_file_from_path('licenses/index.md').content_string)
+
+    def test_pages_existing(self):
+        with ChDir():
+            Path('docs', 'licenses').mkdir(parents=True)
+            Path('docs', 'licenses', 'index.md').write_text('# Mine')
+            config = MkDocsConfig()
+            config.load_dict({'site_name': 'test', 'docs_dir': 'docs', 'site_dir': 'site'})
+            config.validate()
+            config.plugins._current_plugin = 'mkdocs_licenseinfo'
+            plugin = MkdocsLicenseInfoPlugin()
+            plugin.load_config({'cache': False, 'pages': 'count'})
+            plugin.on_config(config)
+            packages = [PackageLicense.from_dict({'name': 'a', 'license': 'MIT LICENSE'})]
+            with patch.object(plugin._resolver, 'get_package_licenses', return_value=packages):
+                with self.assertLogs('mkdocs.plugins.mkdocs_licenseinfo', 'WARNING'):
+                    files = plugin.on_files(get_files(config), config)
+            self.assertEqual(files.get_file_from_path('licenses/index.md').content_string, '# Mine')
+            self.assertIsNotNone(files.get_file_from_path('licenses/page-1.md'))
+
+    def test_tables(self):
+        with ChDir():
+            config = MkDocsConfig()
+            config.load_dict({'site_name': 'test', 'site_dir': 'site'})
+            plugin = MkdocsLicenseInfoPlugin()
+            plugin.load_config({'cache': False, 'table_page_size': 20})
+            plugin.on_config(config)
+            self.assertEqual(plugin._tables.page_size, 20)
+            self.assertIs(config.markdown_extensions[-1]._tables, plugin._tables)
+            plugin.on_post_build(config)
+            self.assertFalse(Path('site').exists())
+            page = MagicMock(url='sub/')
+            plugin.on_page_markdown('', page, config, None)
+            self.assertEqual(plugin._tables.page_url, 'sub/')
+            path = plugin._tables.add([PackageLicense.from_dict({'name': 'a'})])
+            plugin.on_post_build(config)
+            self.assertTrue(Path('site', path).exists())
+            plugin.on_pre_build(config)
+            self.assertEqual(len(plugin._tables), 0)
+
+    def test_on_page_markdown_scan(self):
+        config = MkDocsConfig()
+        config.load_dict({'site_name': 'test'})
+        page = MagicMock(url='')
+        for scan_pages, markdown, active in [
+            (True, '# Title\n\nText', False),
+            (True, '# Title\n\n## ::licenseinfo', True),
+            (False, '# Title\n\nText', True),
+        ]:
+            with self.subTest(scan_pages=scan_pages, markdown=markdown):
+                plugin = MkdocsLicenseInfoPlugin()
+                plugin.load_config({'cache': False, 'scan_pages': scan_pages})
+                plugin.on_config(config)
+                self.assertEqual(plugin.on_page_markdown(markdown, page, config, None), markdown)
+                self.assertIs(plugin._extension.active, active)
+
+    def test_on_page_markdown_disabled(self):
+        config = MkDocsConfig()
+        config.load_dict({'site_name': 'test'})
+        plugin = MkdocsLicenseInfoPlugin()
+        plugin.load_config({'enabled': False})
+        plugin.on_config(config)
+        self.assertIsNone(plugin._extension)
+        self.assertEqual(plugin.on_page_markdown('Text', MagicMock(url=''), config, None), 'Text')
+
+    def test_on_files_serial(self):
+        plugin = MkdocsLicenseInfoPlugin()
+        plugin.load_config({})
+        with patch.object(plugin._resolver, 'prefetch') as prefetch:
+            self.assertEqual(plugin.on_files('files', MkDocsConfig()), 'files')
+        prefetch.assert_not_called()
 
     def test_on_config_from_env(self):
         with Env(override={'PACKAGE_TEMPLATE': 'abc'}):
@@ -118,5 +516,68 @@ class MkdocsLicenseInfoPluginTestCase(unittest.TestCase):
                     'fail_licenses': None,
                     'requirements_path': 'x',
                     'package_template': 'abc',
-                    'enabled': True}
+                    'enabled': True,
+                    'cache': True,
+                    'cache_dir': None,
+                    'cache_max_age': 7,
+                    'cache_max_entries': 64,
+                    'metadata_cache': True,
+                    'metadata_cache_path': None,
+                    'metadata_cache_max_entries': 10000,
+                    'workers': 1,
+                    'worker_pool': 'process',
+                    'backend': 'licensecheck',
+            'profile': False,
+            'profile_report': None,
+            'manifest': False,
+            'manifest_using': None,
+            'manifest_formats': ['json', 'cyclonedx'],
+            'snapshot_path': None,
+            'render': 'markdown',
+            'table_page_size': 100,
+            'scan_pages': True,
+            'sort_by': None,
+            'group_by': None,
+            'group_template': None,
+            'pages': None,
+            'pages_size': 200,
+            'pages_dir': 'licenses',
+            'pages_using': None,
+            'pages_title': 'Licenses'}
                 self.assertEqual(ext._config, expected)
+
+
+class PluginImportTestCase(unittest.TestCase):
+
+    # Only needed when a block is processed (or the licenses are resolved)
+    DEFERRED = (
+        'licensecheck',
+        'requests_cache',
+        'setuptools_scm',
+        'mkdocs_licenseinfo.get_licenses',
+        'mkdocs_licenseinfo.render_markdown',
+    )
+
+    def _import_times(self, statement):
+        result = subprocess.run(  # nosec: B603
+            [sys.executable, '-X', 'importtime', '-c', statement], capture_output=True, text=True, check=True
+        )
+        times = {}
+        # Each line is "import time: <self us> | <cumulative us> | <module>" (after a header line)
+        for line in result.stderr.splitlines():
+            if line.startswith('import time:') and 'cumulative' not in line:
+                self_time, cumulative, name = line[len('import time:'):].split('|')
+                times[name.strip()] = (int(self_time), int(cumulative))
+        return times
+
+    def test_import_time(self):
+        times = self._import_times('import mkdocs_licenseinfo.plugin')
+        self.assertIn('mkdocs_licenseinfo.plugin', times)
+        self.assertEqual([u for u in self.DEFERRED if u in times], [])
+
+    def test_processing_imports(self):
+        times = self._import_times(
+            'import markdown; from mkdocs_licenseinfo.plugin import LicenseInfoExtension; '
+            'markdown.Markdown(extensions=[LicenseInfoExtension({})]).convert("# Title")'
+        )
+        self.assertNotIn('mkdocs_licenseinfo.render_markdown', times)
@@ -1,13 +1,24 @@
 from pathlib import Path
 import unittest
 from unittest.mock import patch
+from xml.etree.ElementTree import Element
 
 from markdown import Markdown
 from markdown.blockparser import BlockParser
 from nskit.common.contextmanagers import Env
 
-from mkdocs_licenseinfo import extension
-from mkdocs_licenseinfo.extension import LicenseInfoProcessor
+from mkdocs_licenseinfo import extension, render_markdown
+from mkdocs_licenseinfo.extension import LicenseInfoProcessor, RENDER_CHUNK_SIZE
+from mkdocs_licenseinfo.profiler import NULL_PROFILER, Profiler
+from mkdocs_licenseinfo.table import LicenseTables
+
+
+def run_block(processor: LicenseInfoProcessor, yaml_block: str = '', heading_level: int = 0) -> str:
+    """Run the processor on a licenseinfo block, returning the markdown inserted for it."""
+    heading = f'{"#" * heading_level} ' if heading_level else ''
+    blocks = ['\n'.join([f'{heading}::licenseinfo', *(f'    {u}' for u in yaml_block.split('\n') if u)])]
+    processor.run(None, blocks)
+    return blocks[0]
 
 
 class ProccesorTestCase(unittest.TestCase):
@@ -36,15 +47,15 @@ class ProccesorTestCase(unittest.TestCase):
                 result = LicenseInfoProcessor.regex.match(test_string)
                 self.assertIsNone(result)
 
-    # Patch get_licenses_as_markdown to return the release info
-    @patch.object(extension, 'get_licenses_as_markdown')
-    def test_process_block_simple(self, get_licenses_as_markdown):
+    # Patch iter_licenses_as_markdown to return the release info
+    @patch.object(render_markdown, 'iter_licenses_as_markdown')
+    def test_run_block_simple(self, iter_licenses_as_markdown):
         packages = 'Abacus'
-        get_licenses_as_markdown.return_value = [packages]
+        iter_licenses_as_markdown.return_value = iter([packages])
         processor = LicenseInfoProcessor(BlockParser(Markdown()), {})
-        result = processor._process_block('')
+        result = run_block(processor, '')
         self.assertEqual(result, packages)
-        get_licenses_as_markdown.assert_called_once_with(
+        iter_licenses_as_markdown.assert_called_once_with(
             using=None,
             ignore_packages=None,
             fail_packages=None,
@@ -53,13 +64,22 @@ class ProccesorTestCase(unittest.TestCase):
             fail_licenses=None,
             diff=None,
             package_template=None,
-            path=None
+            path=None,
+            resolver=None,
+            backend=None,
+            profiler=NULL_PROFILER,
+            snapshot_path=None,
+            base_indent=0,
+            chunk_size=RENDER_CHUNK_SIZE,
+            sort_by=None,
+            group_by=None,
+            group_template=None
         )
 
-    @patch.object(extension, 'get_licenses_as_markdown')
-    def test_process_block_with_global_config(self, get_licenses_as_markdown):
+    @patch.object(render_markdown, 'iter_licenses_as_markdown')
+    def test_run_block_with_global_config(self, iter_licenses_as_markdown):
         packages = 'Ipsum'
-        get_licenses_as_markdown.return_value = [packages]
+        iter_licenses_as_markdown.return_value = iter([packages])
         global_config = {
             'ignore_packages': ['a', 'b'],
             'fail_packages': ['c', 'd'],
@@ -72,9 +92,9 @@ class ProccesorTestCase(unittest.TestCase):
             'docs_dir': 'docs'
         }
         processor = LicenseInfoProcessor(BlockParser(Markdown()), global_config)
-        result = processor._process_block('')
+        result = run_block(processor, '')
         self.assertEqual(result, packages)
-        get_licenses_as_markdown.assert_called_once_with(
+        iter_licenses_as_markdown.assert_called_once_with(
             using=None,
             ignore_packages=['a', 'b'],
             fail_packages=['c', 'd'],
@@ -83,13 +103,22 @@ class ProccesorTestCase(unittest.TestCase):
             fail_licenses=['i', 'j'],
             diff=None,
             package_template='abc',
-            path=Path('.').resolve()
+            path=Path('.').resolve(),
+            resolver=None,
+            backend=None,
+            profiler=NULL_PROFILER,
+            snapshot_path=None,
+            base_indent=0,
+            chunk_size=RENDER_CHUNK_SIZE,
+            sort_by=None,
+            group_by=None,
+            group_template=None
         )
 
-    @patch.object(extension, 'get_licenses_as_markdown')
-    def test_process_block_with_local_config(self, get_licenses_as_markdown):
+    @patch.object(render_markdown, 'iter_licenses_as_markdown')
+    def test_run_block_with_local_config(self, iter_licenses_as_markdown):
         packages = '# Ipsum'
-        get_licenses_as_markdown.return_value = [packages]
+        iter_licenses_as_markdown.return_value = iter([packages])
         global_config = {
             'ignore_packages': ['a', 'b'],
             'fail_packages': ['c', 'd'],
@@ -102,9 +131,9 @@ class ProccesorTestCase(unittest.TestCase):
             'docs_dir': 'docs'
         }
         processor = LicenseInfoProcessor(BlockParser(Markdown()), global_config)
-        result = processor._process_block('requirements_path: ../random\nbase_indent: 3\nusing: xyz\ndiff: ghi\nignore_packages:\n  - k\n  - l\nfail_packages:\n  - m\n  - n\nskip_packages:\n  - o\n  - p\nignore_licenses:\n  - q\n  - r\nfail_licenses:\n  - s\n  - t\npackage_template: mno')
-        self.assertEqual(result, '###'+packages)
-        get_licenses_as_markdown.assert_called_once_with(
+        result = run_block(processor, 'requirements_path: ../random\nbase_indent: 3\nusing: xyz\ndiff: ghi\nignore_packages:\n  - k\n  - l\nfail_packages:\n  - m\n  - n\nskip_packages:\n  - o\n  - p\nignore_licenses:\n  - q\n  - r\nfail_licenses:\n  - s\n  - t\npackage_template: mno')
+        self.assertEqual(result, packages)
+        iter_licenses_as_markdown.assert_called_once_with(
             using='xyz',
             ignore_packages=['k', 'l'],
             fail_packages=['m', 'n'],
@@ -113,14 +142,23 @@ class ProccesorTestCase(unittest.TestCase):
             fail_licenses=['s', 't'],
             diff='ghi',
             package_template='mno',
-            path=Path('random').absolute()
+            path=Path('random').absolute(),
+            resolver=None,
+            backend=None,
+            profiler=NULL_PROFILER,
+            snapshot_path=None,
+            base_indent=3,
+            chunk_size=RENDER_CHUNK_SIZE,
+            sort_by=None,
+            group_by=None,
+            group_template=None
         )
 
 
-    @patch.object(extension, 'get_licenses_as_markdown')
-    def test_process_block_with_env(self, get_licenses_as_markdown):
+    @patch.object(render_markdown, 'iter_licenses_as_markdown')
+    def test_run_block_with_env(self, iter_licenses_as_markdown):
         packages = 'Sit'
-        get_licenses_as_markdown.return_value = [packages]
+        iter_licenses_as_markdown.return_value = iter([packages])
         global_config = {
             'ignore_packages': ['a', 'b'],
             'fail_packages': ['c', 'd'],
@@ -134,9 +172,9 @@ class ProccesorTestCase(unittest.TestCase):
         }
         processor = LicenseInfoProcessor(BlockParser(Markdown()), global_config)
         with Env(override={'PACKAGE_TEMPLATE': 'abcdef'}):
-            result = processor._process_block('using: xyz\ndiff: ghi\nignore_packages:\n  - k\n  - l\nfail_packages:\n  - m\n  - n\nskip_packages:\n  - o\n  - p\nignore_licenses:\n  - q\n  - r\nfail_licenses:\n  - s\n  - t\npackage_template: !ENV PACKAGE_TEMPLATE')
+            result = run_block(processor, 'using: xyz\ndiff: ghi\nignore_packages:\n  - k\n  - l\nfail_packages:\n  - m\n  - n\nskip_packages:\n  - o\n  - p\nignore_licenses:\n  - q\n  - r\nfail_licenses:\n  - s\n  - t\npackage_template: !ENV PACKAGE_TEMPLATE')
         self.assertEqual(result, packages)
-        get_licenses_as_markdown.assert_called_once_with(
+        iter_licenses_as_markdown.assert_called_once_with(
             using='xyz',
             ignore_packages=['k', 'l'],
             fail_packages=['m', 'n'],
@@ -145,16 +183,81 @@ class ProccesorTestCase(unittest.TestCase):
             fail_licenses=['s', 't'],
             diff='ghi',
             package_template='abcdef',
-            path=Path('.').resolve()
+            path=Path('.').resolve(),
+            resolver=None,
+            backend=None,
+            profiler=NULL_PROFILER,
+            snapshot_path=None,
+            base_indent=0,
+            chunk_size=RENDER_CHUNK_SIZE,
+            sort_by=None,
+            group_by=None,
+            group_template=None
         )
 
-    @patch.object(extension, 'get_licenses_as_markdown')
-    def test_process_block_with_heading_level(self, get_licenses_as_markdown):
+    @patch.object(render_markdown, 'iter_licenses_as_markdown')
+    def test_run_block_with_heading_level(self, iter_licenses_as_markdown):
         packages = '# Amet'
-        get_licenses_as_markdown.return_value = [packages]
+        iter_licenses_as_markdown.return_value = iter([packages])
+        processor = LicenseInfoProcessor(BlockParser(Markdown()), {})
+        result = run_block(processor, '', 2)
+        self.assertEqual(result, packages)
+        self.assertEqual(iter_licenses_as_markdown.call_args[1]['base_indent'], 2)
+
+    @patch.object(render_markdown, 'iter_licenses_as_markdown')
+    def test_run_block_profiled(self, iter_licenses_as_markdown):
+        iter_licenses_as_markdown.return_value = iter(['# Amet'])
+        profiler = Profiler()
+        profiler.page = 'index.md'
+        processor = LicenseInfoProcessor(BlockParser(Markdown()), {}, profiler=profiler)
+        run_block(processor, 'using: PEP631:dev', 2)
+        self.assertIs(iter_licenses_as_markdown.call_args[1]['profiler'], profiler)
+        profile = profiler.as_dict()
+        self.assertEqual(profile['pages']['index.md']['blocks'], 1)
+        self.assertEqual(list(profile['stages']), ['parse'])
+        self.assertEqual([(u['page'], u['using'], list(u['stages'])) for u in profile['blocks']], [('index.md', 'PEP631:dev', ['parse'])])
+
+    @patch.object(render_markdown, 'get_licenses_as_elements')
+    @patch.object(render_markdown, 'iter_licenses_as_markdown')
+    def test_run_tree(self, iter_licenses_as_markdown, get_licenses_as_elements):
+        elements = [Element('h3'), Element('p')]
+        get_licenses_as_elements.return_value = elements
+        parent = Element('div')
+        blocks = ['## ::licenseinfo\n    render: tree', 'b']
         processor = LicenseInfoProcessor(BlockParser(Markdown()), {})
-        result = processor._process_block('', 2)
-        self.assertEqual(result, '##'+packages)
+        processor.run(parent, blocks)
+        self.assertEqual(list(parent), elements)
+        self.assertEqual(blocks, ['b'])
+        self.assertEqual(get_licenses_as_elements.call_args[1]['base_indent'], 2)
+        self.assertNotIn('package_template', get_licenses_as_elements.call_args[1])
+        iter_licenses_as_markdown.assert_not_called()
+
+    @patch.object(render_markdown, 'get_licenses_as_table', return_value='<div></div>')
+    @patch.object(render_markdown, 'iter_licenses_as_markdown')
+    def test_run_table_json(self, iter_licenses_as_markdown, get_licenses_as_table):
+        parent = Element('div')
+        blocks = ['## ::licenseinfo\n    render: table-json', 'b']
+        tables = LicenseTables()
+        processor = LicenseInfoProcessor(BlockParser(Markdown()), {}, tables=tables)
+        processor.run(parent, blocks)
+        self.assertEqual(blocks, ['b'])
+        self.assertEqual(get_licenses_as_table.call_args[0], (tables,))
+        self.assertNotIn('base_indent', get_licenses_as_table.call_args[1])
+        self.assertNotIn('package_template', get_licenses_as_table.call_args[1])
+        self.assertEqual(processor.parser.md.htmlStash.rawHtmlBlocks, ['<div></div>'])
+        self.assertEqual(parent[0].text, processor.parser.md.htmlStash.get_placeholder(0))
+        iter_licenses_as_markdown.assert_not_called()
+
+    @patch.object(render_markdown, 'get_licenses_as_elements')
+    @patch.object(render_markdown, 'iter_licenses_as_markdown')
+    def test_run_tree_custom_template(self, iter_licenses_as_markdown, get_licenses_as_elements):
+        iter_licenses_as_markdown.return_value = iter(['!! a'])
+        parent = Element('div')
+        blocks = ['::licenseinfo', 'b']
+        processor = LicenseInfoProcessor(BlockParser(Markdown()), {'render': 'tree', 'package_template': '!! {{package.name}}'})
+        processor.run(parent, blocks)
+        self.assertEqual(blocks[0], '!! a')
+        get_licenses_as_elements.assert_not_called()
 
     def test_test_matching(self):
         test_strings = [
@@ -180,17 +283,113 @@ class ProccesorTestCase(unittest.TestCase):
             with self.subTest(test_string=test_string):
                 self.assertFalse(processor.test(None, test_string))
 
-    @patch.object(extension, 'get_licenses_as_markdown')
-    def test_run_matching_block(self, get_licenses_as_markdown):
+    def test_test_without_marker(self):
+        processor = LicenseInfoProcessor(BlockParser(Markdown()), {})
+        with patch.object(LicenseInfoProcessor, 'regex') as regex:
+            self.assertFalse(processor.test(None, 'Some text\nwith several lines'))
+        regex.search.assert_not_called()
+
+    @patch.object(render_markdown, 'iter_licenses_as_markdown')
+    def test_run_matching_block(self, iter_licenses_as_markdown):
         packages = '# Consectetur'
-        get_licenses_as_markdown.return_value = [packages]
+        iter_licenses_as_markdown.return_value = iter([packages])
         blocks = ['::licenseinfo', 'b']
         processor = LicenseInfoProcessor(BlockParser(Markdown()), {})
         processor.run(None, blocks)
-        self.assertEqual(blocks, [packages, 'b'])
+        self.assertEqual(blocks[0], packages)
+        self.assertEqual(blocks[2], 'b')
+        # The marker inserts the next chunk (and is then removed when there are no more chunks)
+        self.assertTrue(processor.test(None, blocks[1]))
+        processor.run(None, blocks[1:])
+        self.assertEqual(processor._pending, {})
+
+    @patch.object(render_markdown, 'iter_licenses_as_markdown')
+    def test_run_chunks(self, iter_licenses_as_markdown):
+        iter_licenses_as_markdown.return_value = iter(['# a\n\nb', '# c'])
+        blocks = ['::licenseinfo', 'd']
+        processor = LicenseInfoProcessor(BlockParser(Markdown()), {})
+        processor.run(None, blocks)
+        self.assertEqual(blocks[:2], ['# a', 'b'])
+        marker = blocks[2]
+        self.assertEqual(blocks[3:], ['d'])
+        remaining = blocks[2:]
+        processor.run(None, remaining)
+        self.assertEqual(remaining, ['# c', marker, 'd'])
+        remaining = remaining[1:]
+        processor.run(None, remaining)
+        self.assertEqual(remaining, ['d'])
+        self.assertEqual(processor._pending, {})
 
     def test_run_no_matching_block(self):
         blocks = ['a', 'b']
         processor = LicenseInfoProcessor(BlockParser(Markdown()), {})
         processor.run(None, blocks)
         self.assertEqual(blocks, ['a', 'b'])
+
+
+class BlockOptionsTestCase(unittest.TestCase):
+
+    def test_get_block_options_defaults(self):
+        options = extension.get_block_options('', {}, None)
+        self.assertEqual(options, {
+            'base_indent': 0,
+            'using': None,
+            'ignore_packages': None,
+            'fail_packages': None,
+            'skip_packages': None,
+            'ignore_licenses': None,
+            'fail_licenses': None,
+            'diff': None,
+            'package_template': None,
+            'path': None,
+            'backend': None,
+            'snapshot_path': None,
+            'render': 'markdown',
+            'sort_by': None,
+            'group_by': None,
+            'group_template': None,
+        })
+
+    def test_get_block_options(self):
+        options = extension.get_block_options('using: xyz\ndiff: abc\nrequirements_path: ..\nskip_packages:\n  - a', {'fail_packages': ['b'], 'skip_packages': ['c']}, 2)
+        self.assertEqual(options['base_indent'], 2)
+        self.assertEqual(options['using'], 'xyz')
+        self.assertEqual(options['diff'], 'abc')
+        self.assertEqual(options['skip_packages'], ['a'])
+        self.assertEqual(options['fail_packages'], ['b'])
+        self.assertEqual(options['path'], Path('..').resolve())
+        self.assertIsNone(options['snapshot_path'])
+
+    def test_get_block_options_snapshot_path(self):
+        options = extension.get_block_options('snapshot_path: snapshot.json', {'docs_dir': 'docs', 'snapshot_path': 'other.json'})
+        self.assertEqual(options['snapshot_path'], Path('docs', 'snapshot.json').resolve())
+        options = extension.get_block_options('', {'docs_dir': 'docs', 'snapshot_path': 'other.json'})
+        self.assertEqual(options['snapshot_path'], Path('docs', 'other.json').resolve())
+
+    def test_find_blocks(self):
+        markdown = '\n'.join([
+            '# Title',
+            '',
+            '## ::licenseinfo',
+            '',
+            'Text',
+            '',
+            '::licenseinfo',
+            '    using: PEP631:dev',
+            '    skip_packages:',
+            '      - a',
+            'More text',
+            '',
+            '```',
+            '::licenseinfo',
+            '    using: ignored',
+            '```',
+            '',
+            '### ::licenseinfo',
+            '\tusing: tabbed',
+        ])
+        self.assertEqual(extension.find_blocks(markdown), [
+            ('', 2),
+            ('using: PEP631:dev\nskip_packages:\n  - a', 0),
+            ('using: tabbed', 3)
+        ])
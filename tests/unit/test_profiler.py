@@ -0,0 +1,97 @@
+import json
+from pathlib import Path
+import unittest
+
+from nskit.common.contextmanagers import ChDir
+
+from mkdocs_licenseinfo.profiler import NULL_PROFILER, Profiler
+
+
+class ProfilerTestCase(unittest.TestCase):
+
+    def test_stage(self):
+        profiler = Profiler()
+        profiler.page = 'index.md'
+        with profiler.stage('render'):
+            pass
+        profile = profiler.as_dict()
+        self.assertEqual(profile['stages']['render']['count'], 1)
+        self.assertIn('render', profile['pages']['index.md']['stages'])
+
+    def test_stage_raises(self):
+        profiler = Profiler()
+        with self.assertRaises(ValueError):
+            with profiler.stage('resolve'):
+                raise ValueError('a')
+        self.assertEqual(profiler.as_dict()['stages']['resolve']['count'], 1)
+
+    def test_disabled(self):
+        profiler = Profiler(enabled=False)
+        with profiler.stage('render'):
+            pass
+        profiler.block()
+        self.assertEqual(profiler.as_dict(), {'stages': {}, 'pages': {}, 'blocks': []})
+        self.assertIs(profiler.stage('parse'), NULL_PROFILER.stage('render'))
+
+    def test_aggregate(self):
+        profiler = Profiler()
+        profiler.page = 'a.md'
+        profiler.block()
+        profiler.block()
+        profiler.record('render', 0.5, 'a.md')
+        profiler.record('resolve', 1.0, 'a.md')
+        profiler.record('resolve', 3.0, 'b.md')
+        profiler.record('prefetch', 2.0)
+        profile = profiler.as_dict()
+        self.assertEqual(list(profile['stages']), ['prefetch', 'resolve', 'render'])
+        self.assertEqual(profile['stages']['resolve'], {'count': 2, 'total': 4.0, 'mean': 2.0, 'max': 3.0})
+        self.assertEqual(profile['pages']['a.md'], {'blocks': 2, 'stages': {'resolve': 1.0, 'render': 0.5}})
+        self.assertEqual(profile['pages']['b.md'], {'blocks': 0, 'stages': {'resolve': 3.0}})
+        self.assertEqual(profile['pages'][''], {'blocks': 0, 'stages': {'prefetch': 2.0}})
+
+    def test_blocks(self):
+        profiler = Profiler()
+        profiler.record('prefetch', 2.0)
+        profiler.page = 'a.md'
+        profiler.block()
+        profiler.record('parse', 0.25, 'a.md')
+        profiler.label_block('PEP631:dev')
+        profiler.record('resolve', 1.0, 'a.md')
+        profiler.record('render', 0.5, 'a.md')
+        profiler.record('render', 0.25, 'a.md')
+        profiler.block('requirements')
+        profiler.record('resolve', 3.0, 'a.md')
+        profiler.page = 'b.md'
+        profiler.record('resolve', 4.0, 'b.md')
+        self.assertEqual(profiler.as_dict()['blocks'], [
+            {'page': 'a.md', 'using': 'PEP631:dev', 'total': 2.0, 'stages': {'parse': 0.25, 'resolve': 1.0, 'render': 0.75}},
+            {'page': 'a.md', 'using': 'requirements', 'total': 3.0, 'stages': {'resolve': 3.0}},
+        ])
+        summary = profiler.summary().split('\n')
+        self.assertEqual(summary[-3:], ['Slowest blocks:', '  a.md (requirements): 3.0000s', '  a.md (PEP631:dev): 2.0000s'])
+
+    def test_summary(self):
+        profiler = Profiler()
+        profiler.page = 'a.md'
+        profiler.block()
+        profiler.record('resolve', 1.0, 'a.md')
+        summary = profiler.summary().split('\n')
+        self.assertEqual(summary[0].split(), ['Stage', 'Count', 'Total', '(s)', 'Mean', '(ms)', 'Max', '(ms)'])
+        self.assertEqual(summary[1].split(), ['resolve', '1', '1.0000', '1000.00', '1000.00'])
+        self.assertEqual(summary[2], '1 blocks on 1 pages')
+
+    def test_clear(self):
+        profiler = Profiler()
+        profiler.page = 'a.md'
+        profiler.block()
+        profiler.record('resolve', 1.0, 'a.md')
+        profiler.clear()
+        self.assertIsNone(profiler.page)
+        self.assertEqual(profiler.as_dict(), {'stages': {}, 'pages': {}, 'blocks': []})
+
+    def test_write(self):
+        profiler = Profiler()
+        profiler.record('resolve', 1.0, 'a.md')
+        with ChDir():
+            profiler.write(Path('reports', 'profile.json'))
+            self.assertEqual(json.loads(Path('reports', 'profile.json').read_text()), profiler.as_dict())
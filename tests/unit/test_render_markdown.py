@@ -5,12 +5,15 @@ import unittest
 from unittest.mock import call, DEFAULT, MagicMock, patch
 
 from jinja2 import Environment
+from licensecheck.types import PackageInfo, ucstr
 from nskit.common.contextmanagers import Env, TestExtension
 
 from mkdocs_licenseinfo import get_licenses
+from mkdocs_licenseinfo.get_licenses import PackageLicense
 from mkdocs_licenseinfo.render_markdown import (
     _EnvironmentFactory,
     get_licenses_as_markdown,
+    iter_licenses_as_markdown,
 )
 
 
@@ -112,49 +115,61 @@ class EnvironmentFactoryTestCase(unittest.TestCase):
         environment = _EnvironmentFactory.default_environment()
         self.assertIsInstance(environment, Environment)
 
+    def test_get_template_cached(self):
+        factory = _EnvironmentFactory()
+        factory._environment = Environment()
+        template = factory.get_template('{{package.name}}')
+        self.assertIs(factory.get_template('{{package.name}}'), template)
+        self.assertIsNot(factory.get_template('{{package.version}}'), template)
+        # A different environment compiles its own template
+        other_factory = _EnvironmentFactory()
+        other_factory._environment = Environment()
+        self.assertIsNot(other_factory.get_template('{{package.name}}'), template)
+
+    def test_get_list_template(self):
+        factory = _EnvironmentFactory()
+        factory._environment = Environment()
+        packages = [{'name': 'a'}, {'name': 'b'}]
+        for package_template in ['# {{package.name}}', '# {{package.name}}\n', '{% if package.name == "a" %}A{% endif %}']:
+            with self.subTest(package_template=package_template):
+                expected = '\n\n'.join(factory.get_template(package_template).render(package=u) for u in packages)
+                result = factory.get_list_template(package_template).render(packages=packages, separator='\n\n')
+                self.assertEqual(result, expected)
+        self.assertIs(factory.get_list_template('{{package.name}}'), factory.get_list_template('{{package.name}}'))
+
+
+ORJSON = PackageInfo(
+    name='orjson',
+    version='3.9.10',
+    size=594514,
+    homePage='https://github.com/ijl/orjson',
+    author='ijl <ijl@mailbox.org>',
+    license=ucstr('APACHE SOFTWARE LICENSE;; MIT LICENSE'),
+    licenseCompat=True
+)
+AENUM = PackageInfo(
+    name='aenum',
+    version='3.1.15',
+    size=728565,
+    homePage='https://github.com/ethanfurman/aenum',
+    author='Ethan Furman',
+    license=ucstr('BSD LICENSE'),
+    licenseCompat=True
+)
+
 
 def patch_licensecheck(func):
 
     @wraps(func)
-    @patch.object(get_licenses, 'licensecheck', autospec=True)
-    def wrapped(self, lc, *args):
+    @patch.object(get_licenses, '_get_licensecheck_package_infos', autospec=True)
+    def wrapped(self, get_package_infos, *args):
         # Patch licensecheck
-        def cli(*args, **kwargs):
-            if 'diff' in sys.argv:
-                lc.stdout.write(json.dumps({
-                    "packages": [
-                        {"name": "orjson",
-                        "version": "3.9.10",
-                        "size": 594514,
-                        "homePage": "https://github.com/ijl/orjson",
-                        "author": "ijl <ijl@mailbox.org>",
-                        "license": "APACHE SOFTWARE LICENSE;; MIT LICENSE",
-                        "licenseCompat": True,
-                        "errorCode": 0,
-                        "namever": "orjson-3.9.10"}]}))
-            else:
-                lc.stdout.write(json.dumps({
-                    "packages": [
-                        {"name": "orjson",
-                        "version": "3.9.10",
-                        "size": 594514,
-                        "homePage": "https://github.com/ijl/orjson",
-                        "author": "ijl <ijl@mailbox.org>",
-                        "license": "APACHE SOFTWARE LICENSE;; MIT LICENSE",
-                        "licenseCompat": True,
-                        "errorCode": 0,
-                        "namever": "orjson-3.9.10"},
-                       {'name': 'aenum',
-                        'version': '3.1.15',
-                        'size': 728565,
-                        'homePage': 'https://github.com/ethanfurman/aenum',
-                        'author': 'Ethan Furman',
-                        'license': 'BSD LICENSE',
-                        'licenseCompat': True,
-                        'errorCode': 0,
-                        'namever': 'aenum-3.1.15'}]}))
-        lc.cli.side_effect = cli
-        return func(self, lc, *args)
+        def package_infos(using, *args, **kwargs):
+            if using == 'diff':
+                return {ORJSON}
+            return {ORJSON, AENUM}
+        get_package_infos.side_effect = package_infos
+        return func(self, get_package_infos, *args)
 
     return wrapped
 
@@ -165,18 +180,106 @@ class GetLicensesAsMarkdownTestCase(unittest.TestCase):
     def test_simple(self, lc):
         result = get_licenses_as_markdown()
         self.assertEqual(len(result), 2)
-        self.assertEqual(result[0], '# [orjson](https://github.com/ijl/orjson)\n``APACHE SOFTWARE LICENSE`` ``MIT LICENSE``  \n*Version Checked: 3.9.10*  \nAuthor: ijl <ijl@mailbox.org>')
-        self.assertEqual(result[1], '# [aenum](https://github.com/ethanfurman/aenum)\n``BSD LICENSE``  \n*Version Checked: 3.1.15*  \nAuthor: Ethan Furman')
+        self.assertEqual(result[0], '# [aenum](https://github.com/ethanfurman/aenum)\n``BSD LICENSE``  \n*Version Checked: 3.1.15*  \nAuthor: Ethan Furman')
+        self.assertEqual(result[1], '# [orjson](https://github.com/ijl/orjson)\n``APACHE SOFTWARE LICENSE`` ``MIT LICENSE``  \n*Version Checked: 3.9.10*  \nAuthor: ijl <ijl@mailbox.org>')
 
     @patch_licensecheck
     def test_custom_template(self, lc):
         result = get_licenses_as_markdown(package_template='!! {{package.name}}')
         self.assertEqual(len(result), 2)
-        self.assertEqual(result[0], '!! orjson')
-        self.assertEqual(result[1], '!! aenum')
+        self.assertEqual(result[0], '!! aenum')
+        self.assertEqual(result[1], '!! orjson')
 
-    @patch_licensecheck
-    def test_with_diff(self, lc):
+    @patch.object(get_licenses, 'resolve_package_licenses')
+    def test_with_diff(self, resolve_package_licenses):
+        def resolve(using, *args, **kwargs):
+            if using == 'diff':
+                return [PackageLicense.from_package_info(ORJSON)]
+            return [PackageLicense.from_package_info(u) for u in sorted([ORJSON, AENUM])]
+        resolve_package_licenses.side_effect = resolve
         result = get_licenses_as_markdown(diff='diff')
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0], '# [aenum](https://github.com/ethanfurman/aenum)\n``BSD LICENSE``  \n*Version Checked: 3.1.15*  \nAuthor: Ethan Furman')
+        # Both resolutions share the package lookup
+        self.assertEqual(resolve_package_licenses.call_count, 2)
+        self.assertEqual({u[0][0] for u in resolve_package_licenses.call_args_list}, {'PEP631', 'diff'})
+        lookups = {id(u[1]['lookup']) for u in resolve_package_licenses.call_args_list}
+        self.assertEqual(len(lookups), 1)
+
+    def test_with_diff_list(self):
+        resolver = MagicMock()
+        packages = {
+            'PEP631': ['c', 'a_b', 'd', 'E'],
+            'diff1': ['A-B'],
+            'diff2': ['e', 'x'],
+        }
+        resolver.get_package_licenses.side_effect = lambda using, *args, **kwargs: [
+            PackageLicense.from_dict({'name': u}) for u in packages[using]
+        ]
+        with self.assertLogs('mkdocs.plugins.mkdocs_licenseinfo', 'INFO') as logs:
+            result = get_licenses_as_markdown(diff=['diff1', 'diff2'], package_template='{{package.name}}', resolver=resolver)
+        # The order is kept, and the names are compared normalized
+        self.assertEqual(result, ['c', 'd'])
+        self.assertEqual(sorted(u[0][0] for u in resolver.get_package_licenses.call_args_list), ['PEP631', 'diff1', 'diff2'])
+        self.assertIn('Found 3 diff packages', '\n'.join(logs.output))
+
+    def test_with_diff_resolver(self):
+        resolver = MagicMock()
+        resolver.get_package_licenses.side_effect = lambda using, *args, **kwargs: [PackageLicense.from_dict({'name': using})]
+        result = get_licenses_as_markdown(diff='diff', package_template='{{package.name}}', resolver=resolver)
+        self.assertEqual(result, ['PEP631'])
+        self.assertEqual(resolver.get_package_licenses.call_count, 2)
+        # The resolver looks up the packages itself, so no lookup is built for it
+        for resolve_call in resolver.get_package_licenses.call_args_list:
+            self.assertNotIn('lookup', resolve_call[1])
+
+    @patch_licensecheck
+    def test_dict_template(self, _):
+        result = get_licenses_as_markdown(package_template="{{package['name']}} {{package['licenses'] | join(',')}}")
+        self.assertEqual(result, ['aenum BSD LICENSE', 'orjson APACHE SOFTWARE LICENSE,MIT LICENSE'])
+
+    @patch_licensecheck
+    def test_iter_licenses_as_markdown_separator(self, lc):
+        self.assertEqual('\n'.join(iter_licenses_as_markdown(package_template='!! {{package.name}}', separator='\n', chunk_size=1)),
+                         '!! aenum\n!! orjson')
+
+    @patch_licensecheck
+    def test_iter_licenses_as_markdown(self, lc):
+        chunks = iter_licenses_as_markdown(chunk_size=1)
+        self.assertEqual(lc.call_count, 0)
+        self.assertEqual(list(chunks), get_licenses_as_markdown())
+        self.assertEqual(list(iter_licenses_as_markdown()), ['\n\n'.join(get_licenses_as_markdown())])
+
+    @patch_licensecheck
+    def test_iter_licenses_as_markdown_base_indent(self, lc):
+        result = list(iter_licenses_as_markdown(package_template='# {{package.name}}\n## C# {{package.version}}', base_indent=2))
+        self.assertEqual(result, ['### aenum\n#### C### 3.1.15\n\n### orjson\n#### C### 3.9.10'])
+
+    @patch_licensecheck
+    def test_iter_licenses_as_markdown_sort_by(self, lc):
+        result = list(iter_licenses_as_markdown(package_template='{{package.name}}', separator=',', sort_by='license'))
+        self.assertEqual(result, ['orjson,aenum'])
+
+    @patch_licensecheck
+    def test_iter_licenses_as_markdown_group_by(self, lc):
+        result = list(iter_licenses_as_markdown(group_by='license', package_template='# {{package.name}} ({{group.name}})', base_indent=1))
+        self.assertEqual(result, [
+            '## APACHE SOFTWARE LICENSE', '### orjson (APACHE SOFTWARE LICENSE)',
+            '## BSD LICENSE', '### aenum (BSD LICENSE)',
+            '## MIT LICENSE', '### orjson (MIT LICENSE)',
+        ])
+
+    @patch_licensecheck
+    def test_iter_licenses_as_markdown_group_template(self, lc):
+        result = list(iter_licenses_as_markdown(
+            group_by='license_family', group_template='# {{group.name}} ({{group|length}} {{group_by}})',
+            package_template='{{package.name}}', separator=', ', chunk_size=1
+        ))
+        self.assertEqual(result, ['# Permissive (2 license_family)', 'aenum', 'orjson'])
+
+    @patch_licensecheck
+    def test_iter_licenses_as_markdown_group_by_joined(self, lc):
+        self.assertEqual(
+            '\n'.join(iter_licenses_as_markdown(group_by='license_family', package_template='{{package.name}}', separator='\n')),
+            '# Permissive\naenum\norjson'
+        )
@@ -0,0 +1,265 @@
+import os
+from pathlib import Path
+import unittest
+from unittest.mock import MagicMock, patch
+
+from nskit.common.contextmanagers import ChDir
+
+from mkdocs_licenseinfo import get_licenses as gl_module
+from mkdocs_licenseinfo import resolver as resolver_module
+from mkdocs_licenseinfo.get_licenses import PackageLicense
+from mkdocs_licenseinfo.render_markdown import get_licenses_as_markdown
+from mkdocs_licenseinfo.resolver import LicenseResolver
+from mkdocs_licenseinfo.snapshot import write_snapshot
+
+
+class LicenseResolverTestCase(unittest.TestCase):
+
+    def test_key_normalised(self):
+        self.assertEqual(LicenseResolver.key(), LicenseResolver.key(using=None))
+        self.assertEqual(LicenseResolver.key(ignore_packages=['a', 'b']), LicenseResolver.key(ignore_packages=['b', 'a']))
+        self.assertEqual(LicenseResolver.key(skip_packages=[]), LicenseResolver.key(skip_packages=None))
+        self.assertEqual(LicenseResolver.key(path='.'), LicenseResolver.key(path=Path.cwd()))
+        self.assertNotEqual(LicenseResolver.key(), LicenseResolver.key(using='PEP631:dev'))
+        self.assertEqual(LicenseResolver.key(), LicenseResolver.key(backend='licensecheck'))
+        self.assertNotEqual(LicenseResolver.key(), LicenseResolver.key(backend='importlib'))
+        self.assertNotEqual(LicenseResolver.key(), LicenseResolver.key(graph=True))
+        self.assertEqual(LicenseResolver.key(backend='importlib'), LicenseResolver.key(backend='importlib', graph=True))
+
+    def test_uses_graph(self):
+        resolver = LicenseResolver()
+        self.assertFalse(resolver.uses_graph())
+        self.assertTrue(resolver.uses_graph('importlib'))
+        resolver.use_graph = True
+        self.assertTrue(resolver.uses_graph())
+
+    @patch.object(gl_module, 'get_package_licenses')
+    def test_get_licenses_memoized(self, get_package_licenses):
+        get_package_licenses.return_value = [{'name': 'a'}]
+        resolver = LicenseResolver(cache='cache')
+        self.assertEqual(resolver.get_package_licenses(), [{'name': 'a'}])
+        self.assertEqual(resolver.get_package_licenses(using='PEP631'), [{'name': 'a'}])
+        get_package_licenses.assert_called_once_with('PEP631', None, None, None, None, None, path=None, cache='cache',
+                                                     backend=None, graph=None)
+        self.assertEqual(resolver.hits, 1)
+        self.assertEqual(resolver.misses, 1)
+        resolver.get_package_licenses(using='PEP631:dev')
+        self.assertEqual(get_package_licenses.call_count, 2)
+        self.assertEqual(resolver.misses, 2)
+
+    @patch.object(gl_module, 'get_package_licenses')
+    def test_clear(self, get_package_licenses):
+        resolver = LicenseResolver()
+        resolver.get_package_licenses()
+        resolver.get_graph()
+        resolver.clear()
+        self.assertEqual((resolver.hits, resolver.misses), (0, 0))
+        self.assertEqual(resolver._results, {})
+        self.assertEqual(resolver._graphs, {})
+
+    @patch.object(gl_module, 'DependencyGraph')
+    def test_get_graph(self, dependency_graph):
+        dependency_graph.side_effect = lambda path, backend, metadata_cache: MagicMock(
+            path=path, backend=backend, metadata_cache=metadata_cache
+        )
+        resolver = LicenseResolver(metadata_cache='metadata_cache')
+        graph = resolver.get_graph()
+        self.assertEqual(graph.metadata_cache, 'metadata_cache')
+        self.assertIs(resolver.get_graph('.', 'licensecheck'), graph)
+        self.assertIsNot(resolver.get_graph(backend='importlib'), graph)
+        self.assertIsNot(resolver.get_graph('..'), graph)
+        self.assertEqual(dependency_graph.call_count, 3)
+
+    @patch.object(gl_module, 'get_package_licenses')
+    def test_get_licenses_graph(self, get_package_licenses):
+        resolver = LicenseResolver()
+        with patch.object(resolver, 'get_graph') as get_graph:
+            resolver.get_package_licenses()
+            self.assertIsNone(get_package_licenses.call_args[1]['graph'])
+            get_graph.assert_not_called()
+            resolver.get_package_licenses('PEP631:dev', backend='importlib')
+            get_graph.assert_called_once_with(None, 'importlib')
+            self.assertEqual(get_package_licenses.call_args[1]['graph'], get_graph.return_value)
+
+    @patch.object(gl_module, 'get_package_licenses')
+    @patch.object(resolver_module, 'get_snapshot_packages')
+    def test_get_licenses_snapshot(self, get_snapshot_packages, get_package_licenses):
+        packages = [PackageLicense.from_dict({'name': 'a'})]
+        get_snapshot_packages.return_value = packages
+        resolver = LicenseResolver()
+        self.assertEqual(resolver.get_package_licenses(snapshot_path='snapshot.json'), packages)
+        get_snapshot_packages.assert_called_once_with(
+            'snapshot.json', 'PEP631', None, None, None, None, None, None, None, graph=False
+        )
+        get_package_licenses.assert_not_called()
+        get_snapshot_packages.return_value = None
+        resolver.get_package_licenses('PEP631:dev', snapshot_path='snapshot.json')
+        get_package_licenses.assert_called_once()
+
+    @patch.object(gl_module, 'get_package_licenses')
+    def test_get_licenses_use_graph(self, get_package_licenses):
+        resolver = LicenseResolver(use_graph=True)
+        with patch.object(resolver, 'get_graph') as get_graph:
+            resolver.get_package_licenses()
+            get_graph.assert_called_once_with(None, None)
+            self.assertEqual(get_package_licenses.call_args[1]['graph'], get_graph.return_value)
+
+
+@patch.object(gl_module, 'get_package_licenses')
+class LicenseResolverIncrementalTestCase(unittest.TestCase):
+
+    def test_reuse_unchanged(self, get_package_licenses):
+        with ChDir():
+            Path('pyproject.toml').write_text('a')
+            resolver = LicenseResolver()
+            resolver.get_package_licenses()
+            resolver.clear()
+            resolver.get_package_licenses()
+            get_package_licenses.assert_called_once()
+            self.assertEqual(resolver.requirement_sources, {Path('pyproject.toml').resolve()})
+
+    def test_reuse_touched(self, get_package_licenses):
+        with ChDir():
+            Path('pyproject.toml').write_text('a')
+            resolver = LicenseResolver()
+            resolver.get_package_licenses()
+            resolver.clear()
+            os.utime('pyproject.toml', (1, 1))
+            resolver.get_package_licenses()
+            get_package_licenses.assert_called_once()
+
+    def test_resolve_changed(self, get_package_licenses):
+        with ChDir():
+            Path('pyproject.toml').write_text('a')
+            resolver = LicenseResolver()
+            resolver.get_package_licenses()
+            resolver.clear()
+            Path('pyproject.toml').write_text('ab')
+            resolver.get_package_licenses()
+            self.assertEqual(get_package_licenses.call_count, 2)
+
+    def test_resolve_new_source(self, get_package_licenses):
+        with ChDir():
+            Path('pyproject.toml').write_text('a')
+            resolver = LicenseResolver()
+            resolver.get_package_licenses()
+            resolver.clear()
+            Path('requirements.txt').write_text('b')
+            resolver.get_package_licenses()
+            self.assertEqual(get_package_licenses.call_count, 2)
+            self.assertEqual(len(resolver.requirement_sources), 2)
+
+
+class LicenseResolverPrefetchTestCase(unittest.TestCase):
+
+    @patch.object(gl_module, 'get_package_licenses')
+    @patch.object(gl_module, 'resolve_package_licenses')
+    def test_prefetch_thread(self, resolve_package_licenses, get_package_licenses):
+        resolve_package_licenses.side_effect = lambda using, **kwargs: [{'name': using}]
+        resolver = LicenseResolver(use_graph=True)
+        resolver.prefetch([{'using': None}, {'using': 'PEP631'}, {'using': 'PEP631:dev', 'skip_packages': ['a']}],
+                          workers=2, pool='thread')
+        self.assertEqual(resolve_package_licenses.call_count, 2)
+        self.assertEqual(resolver.misses, 2)
+        self.assertEqual(resolver.get_package_licenses(), [{'name': 'PEP631'}])
+        self.assertEqual(resolver.get_package_licenses('PEP631:dev', skip_packages=['a']), [{'name': 'PEP631:dev'}])
+        self.assertEqual(resolver.hits, 2)
+        get_package_licenses.assert_not_called()
+        # Already resolved
+        resolver.prefetch([{'using': 'PEP631'}], workers=2, pool='thread')
+        self.assertEqual(resolve_package_licenses.call_count, 2)
+
+    @patch.object(gl_module, 'get_package_licenses')
+    @patch.object(gl_module, 'resolve_package_licenses')
+    def test_prefetch_failure(self, resolve_package_licenses, get_package_licenses):
+        resolve_package_licenses.side_effect = RuntimeError('Could not find specification')
+        get_package_licenses.return_value = [{'name': 'a'}]
+        resolver = LicenseResolver(use_graph=True)
+        resolver.prefetch([{'using': 'PEP631'}], workers=2, pool='thread')
+        self.assertEqual(resolver._results, {})
+        # Resolved when requested instead
+        self.assertEqual(resolver.get_package_licenses(), [{'name': 'a'}])
+
+    @patch.object(gl_module, 'resolve_package_licenses')
+    def test_prefetch_cache(self, resolve_package_licenses):
+        resolve_package_licenses.return_value = [PackageLicense.from_dict({'name': 'b'})]
+        cache = MagicMock()
+        cache.key.side_effect = lambda using, **kwargs: using
+        cache.get.side_effect = lambda key: [{'name': 'a'}] if key == 'PEP631' else None
+        resolver = LicenseResolver(cache, use_graph=True)
+        resolver.prefetch([{'using': 'PEP631'}, {'using': 'PEP631:dev'}], workers=2, pool='thread')
+        resolve_package_licenses.assert_called_once_with(using='PEP631:dev', graph=resolver.get_graph())
+        cache.set.assert_called_once_with('PEP631:dev', [PackageLicense.from_dict({'name': 'b'}).as_dict()])
+        self.assertEqual(resolver.get_package_licenses(), [PackageLicense.from_dict({'name': 'a'})])
+
+    @patch.object(gl_module, 'get_package_licenses')
+    @patch.object(gl_module, 'resolve_package_licenses')
+    def test_prefetch_same_resolution(self, resolve_package_licenses, get_package_licenses):
+        # The pool doesn't change how the licenses are resolved (or the keys they are stored under)
+        cli_packages = [PackageLicense.from_dict({'name': 'cli'})]
+        graph_packages = [PackageLicense.from_dict({'name': 'graph'})]
+        get_package_licenses.return_value = cli_packages
+        resolve_package_licenses.return_value = graph_packages
+        cache = MagicMock()
+        cache.get.return_value = None
+        resolver = LicenseResolver(cache)
+        resolver.prefetch([{'using': 'PEP631'}], workers=2, pool='thread')
+        resolve_package_licenses.assert_not_called()
+        get_package_licenses.assert_called_once_with(using='PEP631')
+        self.assertFalse(cache.key.call_args[1]['graph'])
+        resolver.prefetch([{'using': 'PEP631', 'backend': 'importlib'}], workers=2, pool='thread')
+        resolve_package_licenses.assert_called_once()
+        self.assertEqual(resolver.get_package_licenses(), cli_packages)
+        self.assertEqual(resolver.get_package_licenses(backend='importlib'), graph_packages)
+        self.assertEqual(resolver.hits, 2)
+
+    @patch.object(resolver_module, 'ProcessPoolExecutor')
+    def test_prefetch_process_graph(self, executor_class):
+        executor = executor_class.return_value.__enter__.return_value
+        executor.submit.return_value = future = MagicMock()
+        future.result.return_value = [{'name': 'a'}]
+        with patch.object(resolver_module, 'as_completed', side_effect=lambda futures: list(futures)):
+            resolver = LicenseResolver(use_graph=True)
+            resolver.prefetch([{'using': 'PEP631'}], workers=3)
+        executor.submit.assert_called_once_with(gl_module.resolve_package_licenses, using='PEP631')
+        with patch.object(resolver, 'get_graph'):
+            self.assertEqual(resolver.get_package_licenses(), [{'name': 'a'}])
+        self.assertEqual(resolver.hits, 1)
+
+    @patch.object(resolver_module, 'ProcessPoolExecutor')
+    def test_prefetch_process(self, executor_class):
+        executor = executor_class.return_value.__enter__.return_value
+        executor.submit.return_value = future = MagicMock()
+        future.result.return_value = [{'name': 'a'}]
+        with patch.object(resolver_module, 'as_completed', side_effect=lambda futures: list(futures)):
+            resolver = LicenseResolver()
+            resolver.prefetch([{'using': 'PEP631'}], workers=3)
+        executor_class.assert_called_once_with(max_workers=3)
+        executor.submit.assert_called_once_with(gl_module.get_package_licenses, using='PEP631')
+        self.assertEqual(resolver.get_package_licenses(), [{'name': 'a'}])
+
+    @patch.object(gl_module, 'get_package_licenses')
+    def test_prefetch_diff_block(self, get_package_licenses):
+        # A block with a diff renders from the prefetched results for both specs
+        get_package_licenses.side_effect = lambda using, *args, **kwargs: [PackageLicense.from_dict({'name': using})]
+        resolver = LicenseResolver()
+        resolver.prefetch([{'using': 'PEP631'}, {'using': 'diff'}], workers=2, pool='thread')
+        self.assertEqual(get_package_licenses.call_count, 2)
+        result = get_licenses_as_markdown(diff='diff', package_template='{{package.name}}', resolver=resolver)
+        self.assertEqual(result, ['PEP631'])
+        self.assertEqual(get_package_licenses.call_count, 2)
+        self.assertEqual(resolver.hits, 2)
+
+    @patch.object(gl_module, 'get_package_licenses')
+    def test_snapshot_diff_block(self, get_package_licenses):
+        # A block with a diff renders from a snapshot written with the resolver
+        get_package_licenses.side_effect = lambda using, *args, **kwargs: [PackageLicense.from_dict({'name': using})]
+        with ChDir():
+            write_snapshot('snapshot.json', [{'using': 'PEP631'}, {'using': 'diff'}], graph=LicenseResolver().use_graph)
+            self.assertEqual(get_package_licenses.call_count, 2)
+            resolver = LicenseResolver()
+            result = get_licenses_as_markdown(
+                diff='diff', package_template='{{package.name}}', resolver=resolver, snapshot_path='snapshot.json'
+            )
+        self.assertEqual(result, ['PEP631'])
+        self.assertEqual(get_package_licenses.call_count, 2)
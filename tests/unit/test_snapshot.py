@@ -0,0 +1,92 @@
+import json
+from pathlib import Path
+import unittest
+from unittest.mock import MagicMock, patch
+
+from nskit.common.contextmanagers import ChDir
+
+from mkdocs_licenseinfo import get_licenses as gl_module
+from mkdocs_licenseinfo.get_licenses import PackageLicense
+from mkdocs_licenseinfo.snapshot import (
+    get_snapshot_packages,
+    main,
+    read_snapshot,
+    resolve_with_snapshot,
+    snapshot_key,
+    write_snapshot,
+)
+
+PACKAGES = [PackageLicense.from_dict({'name': 'aenum', 'version': '3.1.15', 'license': 'BSD LICENSE'})]
+
+
+class SnapshotTestCase(unittest.TestCase):
+
+    def test_snapshot_key_portable(self):
+        with ChDir():
+            Path('a').mkdir()
+            Path('b').mkdir()
+            Path('a', 'pyproject.toml').write_text('x')
+            Path('b', 'pyproject.toml').write_text('x')
+            self.assertEqual(snapshot_key(path='a'), snapshot_key(path='b'))
+            self.assertNotEqual(snapshot_key(path='a'), snapshot_key(path='a', using='PEP631:dev'))
+            Path('b', 'pyproject.toml').write_text('y')
+            self.assertNotEqual(snapshot_key(path='a'), snapshot_key(path='b'))
+
+    def test_write_read(self):
+        with ChDir():
+            Path('pyproject.toml').write_text('x')
+            resolve = MagicMock(return_value=PACKAGES)
+            write_snapshot('snapshot.json', [{'using': None}, {'using': 'PEP631'}, {'using': 'PEP631:dev'}], resolve=resolve)
+            self.assertEqual(resolve.call_count, 2)
+            snapshot = json.loads(Path('snapshot.json').read_text())
+            self.assertEqual(snapshot['snapshots'][snapshot_key()]['packages'], [PACKAGES[0].as_dict()])
+            result = read_snapshot('snapshot.json')
+            self.assertEqual(set(result), {snapshot_key(), snapshot_key('PEP631:dev')})
+            self.assertEqual(result[snapshot_key()], PACKAGES)
+
+    def test_read_missing_or_empty(self):
+        with ChDir():
+            self.assertEqual(read_snapshot('snapshot.json'), {})
+            Path('snapshot.json').write_text('')
+            self.assertEqual(read_snapshot('snapshot.json'), {})
+
+    def test_get_snapshot_packages_changed_requirements(self):
+        with ChDir():
+            Path('pyproject.toml').write_text('x')
+            write_snapshot('snapshot.json', [{}], resolve=MagicMock(return_value=PACKAGES))
+            self.assertEqual(get_snapshot_packages('snapshot.json'), PACKAGES)
+            Path('pyproject.toml').write_text('y')
+            with self.assertLogs('mkdocs.plugins.mkdocs_licenseinfo', level='WARNING'):
+                self.assertIsNone(get_snapshot_packages('snapshot.json'))
+
+    def test_resolve_with_snapshot(self):
+        with ChDir():
+            Path('pyproject.toml').write_text('x')
+            write_snapshot('snapshot.json', [{}], resolve=MagicMock(return_value=PACKAGES))
+            resolve = MagicMock(return_value=[])
+            self.assertEqual(resolve_with_snapshot('snapshot.json', resolve=resolve), PACKAGES)
+            resolve.assert_not_called()
+            with self.assertLogs('mkdocs.plugins.mkdocs_licenseinfo', level='WARNING'):
+                self.assertEqual(resolve_with_snapshot('snapshot.json', 'PEP631:dev', resolve=resolve), [])
+            resolve.assert_called_once_with('PEP631:dev', None, None, None, None, None, path=None, lookup=None, backend=None)
+
+    @patch.object(gl_module, 'get_package_licenses', return_value=PACKAGES)
+    def test_main(self, get_package_licenses):
+        with ChDir():
+            Path('pyproject.toml').write_text('x')
+            Path('docs').mkdir()
+            Path('docs', 'index.md').write_text('## ::licenseinfo\n\n::licenseinfo\n    using: PEP631:dev\n    snapshot_path: other.json\n')
+            Path('mkdocs.yml').write_text('site_name: test\nplugins:\n  - mkdocs_licenseinfo:\n      snapshot_path: snapshot.json\n')
+            self.assertEqual(main(['-f', 'mkdocs.yml']), 0)
+            # All the blocks are resolved (to the cache), but only those using the plugin's snapshot are written to it
+            self.assertEqual(get_package_licenses.call_count, 2)
+            self.assertEqual(set(read_snapshot('snapshot.json')), {snapshot_key()})
+            self.assertEqual(main(['-f', 'mkdocs.yml', '-o', 'all.json']), 0)
+            self.assertEqual(set(read_snapshot('all.json')), {snapshot_key()})
+
+    def test_main_not_configured(self):
+        with ChDir():
+            Path('docs').mkdir()
+            Path('mkdocs.yml').write_text('site_name: test\n')
+            with self.assertRaises(SystemExit):
+                main(['-f', 'mkdocs.yml'])
@@ -0,0 +1,59 @@
+import json
+from pathlib import Path
+import tempfile
+import unittest
+
+from mkdocs_licenseinfo.get_licenses import PackageLicense
+from mkdocs_licenseinfo.table import LicenseTables, TABLE_DIR, TABLE_FIELDS, TABLE_SCRIPT
+
+
+class LicenseTablesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.packages = [
+            PackageLicense.from_dict({'name': 'a', 'version': '1.0', 'license': 'MIT LICENSE;; BSD LICENSE', 'homePage': 'https://a.org'}),
+            PackageLicense.from_dict({'name': 'b', 'version': '2.0', 'license': 'MIT LICENSE', 'author': 'B'})
+        ]
+
+    def test_add(self):
+        tables = LicenseTables()
+        path = tables.add(self.packages)
+        self.assertTrue(path.startswith(f'{TABLE_DIR}/licenseinfo-'))
+        self.assertEqual(json.loads(tables._tables[path]), {
+            'fields': list(TABLE_FIELDS),
+            'rows': [['a', '1.0', ['MIT LICENSE', 'BSD LICENSE'], 'UNKNOWN', 'https://a.org'], ['b', '2.0', ['MIT LICENSE'], 'B', 'UNKNOWN']]
+        })
+        # Identical tables share the data
+        self.assertEqual(tables.add(list(self.packages)), path)
+        self.assertEqual(len(tables), 1)
+        self.assertNotEqual(tables.add(self.packages[:1]), path)
+        self.assertEqual(len(tables), 2)
+
+    def test_html(self):
+        tables = LicenseTables(page_size=10)
+        for page_url, prefix in [('', ''), ('licenses/', '../'), ('a/b.html', '../')]:
+            with self.subTest(page_url=page_url):
+                tables.page_url = page_url
+                html = tables.html(self.packages)
+                self.assertIn(f'data-src="{prefix}{TABLE_DIR}/licenseinfo-', html)
+                self.assertIn('data-page-size="10"', html)
+                self.assertIn(f'<script src="{prefix}{TABLE_DIR}/{TABLE_SCRIPT}" defer></script>', html)
+
+    def test_write(self):
+        tables = LicenseTables()
+        with tempfile.TemporaryDirectory() as site_dir:
+            self.assertEqual(tables.write(site_dir), [])
+            self.assertFalse(Path(site_dir, TABLE_DIR).exists())
+            path = tables.add(self.packages)
+            paths = tables.write(site_dir)
+            self.assertEqual(paths, [Path(site_dir, TABLE_DIR, TABLE_SCRIPT), Path(site_dir, path)])
+            self.assertIn('licenseinfo-table', Path(site_dir, TABLE_DIR, TABLE_SCRIPT).read_text())
+            self.assertEqual(len(json.loads(Path(site_dir, path).read_text())['rows']), 2)
+
+    def test_clear(self):
+        tables = LicenseTables()
+        tables.page_url = 'a/'
+        tables.add(self.packages)
+        tables.clear()
+        self.assertEqual(len(tables), 0)
+        self.assertEqual(tables.page_url, '')